@@ -2,20 +2,27 @@
 Text-to-SQL Chatbot CLI Tool using OpenAI and SQLite.
 
 Modules:
-- DynamicDatabase: Singleton for managing a persistent SQLite engine.
-- DatabaseHandler: Executes SQL queries using SQLAlchemy.
+- DynamicDatabase: Singleton holding the SQLite reader pool and writer connection (src.mcp.run_query).
+- DatabaseHandler: Executes SQL queries using SQLAlchemy (src.mcp.run_query).
+- VisualizationEngine: Chooses text/table/plot output and draws charts (src.mcp.generate_plot).
 - LLMChatBot: Classifies input, generates SQL, and returns query results.
-- main(): CLI interface for interactive usage.
+  `arun` is the non-blocking variant used by the FastAPI chat router.
+  Questions matching a SQL template (src.mcp.sql_templates) skip the LLM entirely.
+- single_flight: Coalesces identical concurrent stages (classify, sql, plan, execute,
+  summarize); `single_flight.stats()` reports per-stage coalesced counts.
+- main(): CLI interface for interactive usage; `--batch questions.jsonl` runs a
+  question file concurrently and streams JSONL results (src.mcp.batch_runner).
 """
 
+import argparse
+import asyncio
+import hashlib
+import json
 import os
 import sys
 import pandas as pd
-from openai import OpenAI
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
 from tabulate import tabulate
-from typing import List, Union, Tuple
+from typing import Any, AsyncIterator, List, Optional, Union, Tuple
 
 # Enable imports from parent directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
@@ -24,12 +31,34 @@ from src.utils.constant import (
     History_Approach,
     UI_constants,
     DBConstant,
-    OpenAIConfig
+    OpenAIConfig,
+    PipelineConfig,
+    SQLCacheConfig,
+    FewShotConfig,
+    TemplateConfig
 )
-from src.codes.sql_query_generation import SQLQueryGenerator
-
-# Global OpenAI client for LLM responses
-llm_client = OpenAI(api_key=OpenAIConfig.OpenAI_API_KEY)
+from src.mcp.sql_query_generation import SQLQueryGenerator
+from src.mcp.query_cache import SQLQueryCache, normalize_question
+from src.mcp.example_index import ExampleIndex
+from src.mcp.sql_history import SQLHistory
+from src.mcp.intent_classifier import IntentClassifier, GREETING, QUESTION
+from src.mcp.run_query import DynamicDatabase, DatabaseHandler
+from src.mcp.sql_templates import TemplateEngine, TemplateMatch
+from src.mcp.generate_plot import VisualizationEngine
+from src.mcp.result_digest import digest_result
+from src.mcp.result_summarizer import summarize_locally
+from src.mcp.single_flight import SingleFlight
+from src.mcp.llm_backend import create_llm_client
+from src.mcp.batch_runner import add_batch_arguments, chatbot_runner, run_batch_file
+from src.mcp.telemetry import annotate, result_size, stage, trace
+from src.mcp.resilient_llm import LLMUnavailableError, guard_async_llm, guard_llm
+
+# Global OpenAI clients for LLM responses, behind the shared deadline/retry/circuit-breaker wrapper
+llm_client = guard_llm(create_llm_client())
+async_llm_client = guard_async_llm(create_llm_client(is_async=True))
+
+# Coalesces identical concurrent pipeline stages across all chatbot instances
+single_flight = SingleFlight(enabled=PipelineConfig.SINGLE_FLIGHT)
 
 # Before any code that writes to '/home/shahbaz/Project/ChatBOT_Walmart/logs/sql_query_generator'
 log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../logs/sql_query_generator')
@@ -38,22 +67,99 @@ os.makedirs(log_dir, exist_ok=True)
 # -------------------------------------------------------------------------
 # Utility Functions
 # -------------------------------------------------------------------------
+def _llm_response_request(query, value):
+    """
+    `value` is the query result (usually a DataFrame); only a size-capped digest
+    (all rows when small, otherwise stats plus a sample) goes into the prompt.
+    """
+    digest = digest_result(value)
+    prompt = (
+        f"The user asked: '{query}'. The result from the database is '{digest}'. "
+        "If it has 'stats' and 'sample' instead of 'rows', it summarizes 'row_count' rows. "
+        "If it has 'truncated', the query returned more rows than the first 'row_limit' shown; "
+        "say the answer is partial and do not present counts or totals as complete. "
+        "Provide a simple summary in plain english"
+    )
+    return dict(
+        model=OpenAIConfig.OpenAI_model,
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant providing insights based on database query results. Expect the user is non technical."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=OpenAIConfig.OpenAI_max_tokens,
+        temperature=OpenAIConfig.OpenAI_temperature,
+        top_p=OpenAIConfig.OpenAI_top_p
+    )
+
+def _degraded_summary(value):
+    """
+    Answer used when the LLM is unavailable (circuit open or deadline spent).
+    """
+    if isinstance(value, pd.DataFrame):
+        columns = ", ".join(str(col) for col in value.columns[:5])
+        return f"The summary service is busy right now. The query returned {len(value)} rows ({columns})."
+    return "The summary service is busy right now. Please try again shortly."
+
+def _request_key(request):
+    """
+    Single-flight key for a summary request: identical prompts share one completion.
+    """
+    return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
 def get_llm_response(query, value):
-    prompt = f"The user asked: '{query}'. The result from the database is '{value}'. Provide a simple summary in plain english"
+    local = summarize_locally(query, value)
+    if local is not None:
+        return local
+    request = _llm_response_request(query, value)
+
+    def summarize():
+        try:
+            response = llm_client.chat.completions.create(**request)
+            return response.choices[0].message.content.strip()
+        except LLMUnavailableError:
+            return _degraded_summary(value)
+        except Exception as e:
+            return f"Failed to generate insight: {e}"
+
+    summary, _ = single_flight.do("summarize", _request_key(request), summarize)
+    return summary
+
+async def aget_llm_response(query, value):
+    local = summarize_locally(query, value)
+    if local is not None:
+        return local
+    request = _llm_response_request(query, value)
+
+    async def summarize():
+        try:
+            response = await async_llm_client.chat.completions.create(**request)
+            return response.choices[0].message.content.strip()
+        except LLMUnavailableError:
+            return _degraded_summary(value)
+        except Exception as e:
+            return f"Failed to generate insight: {e}"
+
+    summary, _ = await single_flight.ado("summarize", _request_key(request), summarize)
+    return summary
+
+async def astream_llm_response(query, value):
+    """
+    Yield the summary text as the completion streams in.
+    Simple results are answered locally in a single chunk.
+    """
+    local = summarize_locally(query, value)
+    if local is not None:
+        yield local
+        return
     try:
-        response = llm_client.chat.completions.create(
-            model=OpenAIConfig.OpenAI_model,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant providing insights based on database query results. Expect the user is non technical."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=OpenAIConfig.OpenAI_max_tokens,
-            temperature=OpenAIConfig.OpenAI_temperature,
-            top_p=OpenAIConfig.OpenAI_top_p
-        )
-        return response.choices[0].message.content.strip()
+        stream = await async_llm_client.chat.completions.create(**_llm_response_request(query, value), stream=True)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except LLMUnavailableError:
+        yield _degraded_summary(value)
     except Exception as e:
-        return f"Failed to generate insight: {e}"
+        yield f"Failed to generate insight: {e}"
 
 def remove_sensitive_columns(result):
     columns_to_remove = {
@@ -67,150 +173,283 @@ def remove_sensitive_columns(result):
     return result
 
 # -------------------------------------------------------------------------
-# Singleton Class: DynamicDatabase
-# -------------------------------------------------------------------------
-class DynamicDatabase:
-    _instance = None
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
-
-    def __init__(self):
-        if self._initialized:
-            return
-        self.engine = None
-        self.db_path = 'Database/manufacturing_projects.db'
-        self._initialized = True
-
-    def connect(self):
-        if not self.engine:
-            self.engine = create_engine(f'sqlite:///{self.db_path}')
-
-    def get_engine(self):
-        if not self.engine:
-            self.connect()
-        return self.engine
-
-# -------------------------------------------------------------------------
-# DatabaseHandler
-# -------------------------------------------------------------------------
-class DatabaseHandler:
-    def __init__(self):
-        self.engine = DynamicDatabase().get_engine()
-
-    def execute_query(self, query: str) -> Union[pd.DataFrame, dict]:
-        if query is None:
-            return {"message": "The requested information does not exist in the database schema."}
-        try:
-            df = pd.read_sql(sql=text(query), con=self.engine)
-            return df
-        except SQLAlchemyError:
-            return {"message": "Sorry, cannot answer with the current database information."}
-        except Exception as e:
-            return {"error": f"Unexpected error: {str(e)}"}
-
-# -------------------------------------------------------------------------
-# VisualizationEngine
+# LLMChatBot
 # -------------------------------------------------------------------------
-class VisualizationEngine:
-    def __init__(self, llm=None):
-        self.supported_types = ['line', 'bar', 'scatter', 'histogram', 'pie', 'trend']
-        self.llm = llm or OpenAI(api_key=OpenAIConfig.OpenAI_API_KEY)
-
-    def suggest_output_type(self, df: pd.DataFrame, user_query: str) -> str:
-        if df.empty:
-            return 'text'
-
-        column_info = ", ".join([f"{col} ({str(dtype)})" for col, dtype in df.dtypes.items()])
-        prompt = (
-            f"Data columns: {column_info}\n"
-            f"User query: '{user_query}'\n"
-            "Suggest output type: 'text', 'table', or 'plot'."
+class LLMChatBot:
+    def __init__(self, fused: bool = None, tenant: Optional[str] = None):
+        cache = SQLQueryCache(namespace=OpenAIConfig.OpenAI_model) if SQLCacheConfig.ENABLED else None
+        example_index = ExampleIndex() if FewShotConfig.ENABLED else None
+        self.query_generator = SQLQueryGenerator(
+            cache=cache, async_llm_client=async_llm_client, example_index=example_index
         )
-
-        response = self.llm.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "You are a visualization output expert."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=50,
-            temperature=0.2,
-            top_p=1.0
+        self.db_handler = DatabaseHandler()
+        # High-frequency intents answered from vetted SQL templates, before any LLM call
+        self.templates = TemplateEngine(self.db_handler.engine) if TemplateConfig.ENABLED else None
+        self.table_schemas = DBConstant.db_schema
+        self.chat_history = []
+        self.intent_classifier = IntentClassifier(
+            llm_client=self.query_generator.client,
+            async_llm_client=async_llm_client,
         )
-        output_type = response.choices[0].message.content.strip().lower()
-        return output_type if output_type in ['text', 'table', 'plot'] else 'text'
+        self.fused = PipelineConfig.FUSED_MODE if fused is None else fused
+        # Identical questions are only coalesced within the same tenant database
+        self.tenant = tenant or DBConstant.db_name or ""
 
-    def generate_chart(self, df: pd.DataFrame, chart_type='bar'):
-        import plotly.express as px
-        numeric = df.select_dtypes(include='number').columns.tolist()
-        categoric = df.select_dtypes(include=['object', 'category']).columns.tolist()
-        datetime = df.select_dtypes(include='datetime').columns.tolist()
+    def run(self, user_input: str, history: Optional[SQLHistory] = None) -> Tuple[str, Union[pd.DataFrame, dict]]:
+        sql_query, result, _ = self.run_with_plan(user_input, history)
+        return sql_query, result
 
-        try:
-            if chart_type == 'line' and datetime and numeric:
-                return px.line(df.sort_values(datetime[0]), x=datetime[0], y=numeric[0])
-            elif chart_type == 'bar' and categoric and numeric:
-                return px.bar(df, x=categoric[0], y=numeric[0])
-            elif chart_type == 'scatter' and len(numeric) >= 2:
-                return px.scatter(df, x=numeric[0], y=numeric[1])
-            elif chart_type == 'histogram' and numeric:
-                return px.histogram(df, x=numeric[0])
-            elif chart_type == 'pie' and categoric and numeric:
-                return px.pie(df, names=categoric[0], values=numeric[0])
-        except Exception as e:
-            print(f"⚠️ Plot generation error: {e}")
+    async def arun(self, user_input: str, history: Optional[SQLHistory] = None) -> Tuple[str, Union[pd.DataFrame, dict]]:
+        sql_query, result, _ = await self.arun_with_plan(user_input, history)
+        return sql_query, result
+
+    def run_with_plan(
+        self, user_input: str, history: Optional[SQLHistory] = None
+    ) -> Tuple[str, Union[pd.DataFrame, dict], Optional[str]]:
+        """
+        Like run(), but also returns the output type chosen by the fused call
+        ('text', 'table' or 'plot'), or None when the caller should decide.
+        `history` is the caller's per-session history; None uses the generator's own.
+        The run is recorded as a telemetry trace (src.mcp.telemetry).
+        """
+        with trace("chatbot.run", question=user_input):
+            outcome = self._run_with_plan(user_input, history)
+            annotate(sql=None if outcome[0] == "N/A" else outcome[0], output_type=outcome[2])
+            return outcome
+
+    def _run_with_plan(
+        self, user_input: str, history: Optional[SQLHistory] = None
+    ) -> Tuple[str, Union[pd.DataFrame, dict], Optional[str]]:
+        template = self._match_template(user_input, history)
+        if template is not None:
+            with stage("execute"):
+                result, _ = single_flight.do(
+                    "execute", (self.tenant, template.sql), lambda: self.db_handler.execute_query(template.sql)
+                )
+            self._record_result(user_input, template.sql, result, history)
+            return template.sql, result, template.output_type
+
+        if self.fused:
+            planned = self._run_fused(user_input, history)
+            if planned is not None:
+                return planned
+
+        with stage("classify"):
+            classification, _ = single_flight.do(
+                "classify", self._flight_key(user_input), lambda: self.intent_classifier.classify(user_input).label
+            )
+
+        if classification == GREETING:
+            return "N/A", {"message": "Hello! How can I assist you today?"}, None
+
+        with stage("sql"):
+            sql_query, shared = single_flight.do(
+                "sql", self._generation_key(user_input, history),
+                lambda: self.query_generator.generate_sql_query(user_input, self.table_schemas, history),
+            )
+        if shared:
+            self.query_generator.record_turn(user_input, sql_query, history)
+        if not sql_query:
+            return "N/A", {"message": "Sorry, could not generate a valid SQL for your query."}, None
+
+        with stage("execute"):
+            result, _ = single_flight.do(
+                "execute", (self.tenant, sql_query), lambda: self.db_handler.execute_query(sql_query)
+            )
+        self._record_result(user_input, sql_query, result, history)
+        return sql_query, result, None
+
+    async def arun_with_plan(
+        self, user_input: str, history: Optional[SQLHistory] = None
+    ) -> Tuple[str, Union[pd.DataFrame, dict], Optional[str]]:
+        """
+        Async variant of run_with_plan: LLM calls use the async client and the
+        query runs on the database thread pool.
+        """
+        with trace("chatbot.arun", question=user_input):
+            outcome = ("N/A", None, None)
+            async for event, payload in self.astream_run(user_input, history):
+                if event == "result":
+                    outcome = payload
+            annotate(sql=None if outcome[0] == "N/A" else outcome[0], output_type=outcome[2])
+            return outcome
+
+    async def astream_run(self, user_input: str, history: Optional[SQLHistory] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Run the async pipeline, yielding (event, payload) pairs as stages finish:
+        - ("classified", {"intent": ...})
+        - ("sql_ready", {"sql": ...})
+        - ("rows_ready", {"rows": ..., "columns": [...]})
+        - ("result", (sql_query, result, output_type)), always last.
+        Concurrent identical questions share each stage through `single_flight`.
+        Stage timings go to the caller's telemetry trace, if one is open.
+        """
+        template = await self._amatch_template(user_input, history)
+        if template is not None:
+            yield "classified", {"intent": QUESTION}
+            async for event in self._aexecute_stage(user_input, template.sql, template.output_type, history):
+                yield event
+            return
 
-        return None
+        if self.fused:
+            prediction = self.intent_classifier.classify(user_input, allow_llm=False)
+            if prediction.label == GREETING and prediction.source == "rule":
+                yield "classified", {"intent": GREETING}
+                yield "result", ("N/A", {"message": "Hello! How can I assist you today?"}, None)
+                return
+            with stage("plan"):
+                plan, shared = await single_flight.ado(
+                    "plan", self._generation_key(user_input, history),
+                    lambda: self.query_generator.agenerate_fused_plan(user_input, self.table_schemas, history),
+                )
+            if plan is not None:
+                if shared:
+                    self.query_generator.record_turn(user_input, plan["sql"], history)
+                yield "classified", {"intent": plan["intent"]}
+                sql_query, message = self._plan_outcome(plan)
+                if message is not None:
+                    yield "result", (sql_query, message, None)
+                    return
+                async for event in self._aexecute_stage(user_input, sql_query, plan["output_type"], history):
+                    yield event
+                return
+
+        with stage("classify"):
+            prediction, _ = await single_flight.ado(
+                "classify", self._flight_key(user_input), lambda: self.intent_classifier.aclassify(user_input)
+            )
+        classification = prediction.label
+        yield "classified", {"intent": classification}
+
+        if classification == GREETING:
+            yield "result", ("N/A", {"message": "Hello! How can I assist you today?"}, None)
+            return
 
-# -------------------------------------------------------------------------
-# LLMChatBot
-# -------------------------------------------------------------------------
-class LLMChatBot:
-    def __init__(self):
-        self.query_generator = SQLQueryGenerator()
-        self.db_handler = DatabaseHandler()
-        self.table_schemas = DBConstant.db_schema
-        self.chat_history = []
+        with stage("sql"):
+            sql_query, shared = await single_flight.ado(
+                "sql", self._generation_key(user_input, history),
+                lambda: self.query_generator.agenerate_sql_query(user_input, self.table_schemas, history),
+            )
+        if shared:
+            self.query_generator.record_turn(user_input, sql_query, history)
+        if not sql_query:
+            yield "result", ("N/A", {"message": "Sorry, could not generate a valid SQL for your query."}, None)
+            return
+
+        async for event in self._aexecute_stage(user_input, sql_query, None, history):
+            yield event
+
+    async def _aexecute_stage(
+        self, user_input: str, sql_query: str, output_type: Optional[str], history: Optional[SQLHistory] = None
+    ):
+        yield "sql_ready", {"sql": sql_query}
+        with stage("execute"):
+            result, _ = await single_flight.ado(
+                "execute", (self.tenant, sql_query), lambda: self.db_handler.aexecute_query(sql_query)
+            )
+        self._record_result(user_input, sql_query, result, history)
+        if isinstance(result, pd.DataFrame):
+            yield "rows_ready", {"rows": len(result), "columns": [str(col) for col in result.columns]}
+        yield "result", (sql_query, result, output_type)
 
-    def run(self, user_input: str) -> Tuple[str, Union[pd.DataFrame, dict]]:
-        prompt = f"""
-        Determine if this input is a greeting or a question:
-        "{user_input}"
-        Respond with GREETING or QUESTION only.
+    def _run_fused(self, user_input: str, history: Optional[SQLHistory] = None):
         """
+        Fused path: one structured completion for intent, SQL and output type.
+        Obvious greetings are still answered locally. Returns None to fall back.
+        """
+        prediction = self.intent_classifier.classify(user_input, allow_llm=False)
+        if prediction.label == GREETING and prediction.source == "rule":
+            return "N/A", {"message": "Hello! How can I assist you today?"}, None
+
+        with stage("plan"):
+            plan, shared = single_flight.do(
+                "plan", self._generation_key(user_input, history),
+                lambda: self.query_generator.generate_fused_plan(user_input, self.table_schemas, history),
+            )
+        if plan is None:
+            return None
+        if shared:
+            self.query_generator.record_turn(user_input, plan["sql"], history)
+        sql_query, message = self._plan_outcome(plan)
+        if message is not None:
+            return sql_query, message, None
+
+        with stage("execute"):
+            result, _ = single_flight.do(
+                "execute", (self.tenant, sql_query), lambda: self.db_handler.execute_query(sql_query)
+            )
+        self._record_result(user_input, sql_query, result, history)
+        return sql_query, result, plan["output_type"]
+
+    def _match_template(self, user_input: str, history: Optional[SQLHistory] = None) -> Optional[TemplateMatch]:
+        """
+        The SQL template answering `user_input`, recorded in the history, or None for the LLM path.
+        """
+        if self.templates is None:
+            return None
+        with stage("template"):
+            template = self.templates.match(user_input)
+        if template is not None:
+            self.query_generator.record_turn(user_input, template.sql, history)
+        return template
+
+    async def _amatch_template(self, user_input: str, history: Optional[SQLHistory] = None) -> Optional[TemplateMatch]:
+        """
+        Async variant of _match_template; the value index's first load reads the database, so it runs off the event loop.
+        """
+        if self.templates is not None and not self.templates.values.loaded:
+            return await asyncio.to_thread(self._match_template, user_input, history)
+        return self._match_template(user_input, history)
 
-        response = self.query_generator.client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "You are a user input classifier."},
-                {"role": "user", "content": prompt},
-            ],
-            max_tokens=10,
-            temperature=0.0,
-            top_p=1.0
-        )
+    def _flight_key(self, user_input: str) -> Tuple[str, str]:
+        return self.tenant, normalize_question(user_input)
 
-        classification = response.choices[0].message.content.strip().upper()
+    def _generation_key(self, user_input: str, history: Optional[SQLHistory] = None) -> Tuple[str, str, str]:
+        """
+        Single-flight key for the SQL-generating stages ("sql", "plan"): only
+        callers whose prompt carries the same previous turns share a result.
+        """
+        context = self.query_generator.history_context(history)
+        return self._flight_key(user_input) + (hashlib.sha256(context.encode("utf-8")).hexdigest(),)
 
-        if classification == "GREETING":
+    def _record_result(
+        self, user_input: str, sql_query: str, result: Union[pd.DataFrame, dict], history: Optional[SQLHistory] = None
+    ) -> None:
+        """
+        Keep the row count next to the SQL in the generator's compact history,
+        and index the (question, SQL) pair as a few-shot example when it executed.
+        """
+        row_count = len(result) if isinstance(result, pd.DataFrame) else None
+        annotate(**result_size(result))
+        self.query_generator.record_row_count(sql_query, row_count, history)
+        if row_count is not None:
+            self.query_generator.record_success(user_input, sql_query)
+
+    @staticmethod
+    def _plan_outcome(plan: dict):
+        """
+        Map a fused plan to (sql, None) for execution or ("N/A", message).
+        """
+        if plan["intent"] == GREETING:
             return "N/A", {"message": "Hello! How can I assist you today?"}
-
-        sql_query = self.query_generator.generate_sql_query(user_input, self.table_schemas)
-        if not sql_query:
+        if not plan["sql"]:
             return "N/A", {"message": "Sorry, could not generate a valid SQL for your query."}
-
-        result = self.db_handler.execute_query(sql_query)
-        return sql_query, result
+        return plan["sql"], None
 
 # -------------------------------------------------------------------------
 # main()
 # -------------------------------------------------------------------------
-def main():
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Text-to-SQL chatbot")
+    add_batch_arguments(parser)
+    args = parser.parse_args(argv)
+
     bot = LLMChatBot()
+    if args.batch:
+        counts = run_batch_file(args.batch, chatbot_runner(bot, SQLHistory), args.output, args.concurrency)
+        print(json.dumps(counts), file=sys.stderr)
+        return
+
     visualization = VisualizationEngine()
     print("Text-to-SQL Chatbot (Type 'exit' to quit)\n")
 
@@ -242,7 +481,7 @@ def main():
             output_type = visualization.suggest_output_type(clean_result, user_input)
 
             if output_type == 'text':
-                summary = get_llm_response(user_input, clean_result.to_dict())
+                summary = get_llm_response(user_input, clean_result)
                 print("\n📝 Insight Summary:\n", summary)
 
             elif output_type == 'table':
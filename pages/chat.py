@@ -5,19 +5,34 @@ Chat page routes for FastAPI application.
 
 Routes:
 - GET /chat: Render the chat page if user is authenticated.
-- GET /logout: Logout user and redirect to login page.
-- POST /get: Example endpoint for chat response.
+- GET /logout: Logout user, drop their chat session and redirect to login page.
+- POST /get: Chat response endpoint; every LLM call and query runs without blocking the event loop.
+  Queries still running when the client disconnects are stopped inside SQLite.
+- POST /stream: Same pipeline as Server-Sent Events, streaming stage events and summary tokens.
+- GET /jobs/{job_id}: Poll a background query started by the same user.
+- GET /results/{result_id}?page=N: Further pages of a table reply that carried a result_id.
 
 Utilities:
 - get_current_user_from_cookie(request): Retrieves user from JWT cookie (for demonstration, returns token).
+- session_store: Per-user SQL history, keyed by the JWT email, so users never share context.
+- result_pages: Per-user result handles; table replies show one page at a time.
 """
 
 from fastapi import APIRouter, Request, Body
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from inference import LLMChatBot  # Ensure this is the correct import for your chatbot
+import asyncio
+import json
+from inference import LLMChatBot, aget_llm_response, astream_llm_response  # Ensure this is the correct import for your chatbot
 from jwtsign import decode_token  # Make sure this exists or use your JWT decode function
 from src.mcp.generate_plot import VisualizationEngine, remove_sensitive_columns
+from src.mcp.query_budget import cancel_on_disconnect
+from src.mcp.query_guard import background_jobs, job_owner
+from src.mcp.resilient_llm import request_deadline
+from src.mcp.result_pages import ResultPages
+from src.mcp.session_store import SessionStore
+from src.mcp.telemetry import annotate, stage, trace
+from src.utils.constant import LLMClientConfig
 from tabulate import tabulate
 import pandas as pd
 
@@ -25,6 +40,8 @@ router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 chatbot = LLMChatBot()
 visualization = VisualizationEngine()
+session_store = SessionStore()
+result_pages = ResultPages(chatbot.db_handler)
 
 def get_current_user_from_cookie(request: Request):
     """
@@ -54,25 +71,20 @@ async def chat_page(request: Request):
     return templates.TemplateResponse("chat.html", {"request": request, "user": user})
 
 @router.get("/logout")
-async def logout():
+async def logout(request: Request):
     """
     Logout the user and redirect to the login page.
     """
+    user = get_current_user_from_cookie(request)
+    if user and user.get("email"):
+        session_store.drop(user["email"])
     return RedirectResponse(url="/", status_code=302)
 
-@router.post("/get")
-async def get_chat_response(request: Request, data: dict = Body(...)):
+def _message_reply(sql_query, result):
     """
-    Endpoint for POST /get.
-    Enhanced to handle SQL, DataFrame, and visualization output.
+    Build the reply for non-DataFrame results (greetings, errors, messages).
+    Returns None if `result` is a DataFrame that still needs rendering.
     """
-    user = get_current_user_from_cookie(request)
-    if not user:
-        return {"success": False, "message": "Unauthorized"}, 401
-
-    user_msg = data.get("msg", "")
-    sql_query, result = chatbot.run(user_msg)
-
     # Handle error or message responses
     if sql_query == 'N/A' or result is None:
         if isinstance(result, dict) and "message" in result:
@@ -86,32 +98,214 @@ async def get_chat_response(request: Request, data: dict = Body(...)):
         elif "message" in result:
             return {"reply": result["message"], "sql": sql_query}
 
-    # Handle DataFrame results
     if isinstance(result, pd.DataFrame):
-        clean_result = remove_sensitive_columns(result)
-        output_type = visualization.suggest_output_type(clean_result, user_msg)
-
-        if output_type == 'text':
-            # Implement get_llm_response if available
-            from inference import get_llm_response  # Ensure this function exists in your inference module
-            summary = get_llm_response(user_msg, clean_result.to_dict())
-            return {"reply":  summary, "sql": sql_query}
-
-        elif output_type == 'table':
-            table_str = tabulate(clean_result, headers='keys', tablefmt='pretty')
-            return {
-                "reply": table_str,
-                "sql": sql_query
-            }
-
-        elif output_type == 'plot':
-            # Plots can't be sent via JSON; indicate to frontend
-            return {
-                "reply": "📊 Plot output generated. (Plot display not supported in API response.)",
-                "sql": sql_query
-            }
-        else:
-            return {"reply": "⚠️ Unexpected output type.", "sql": sql_query}
+        return None
 
     # Fallback for unexpected result format
-    return {"reply": str(result), "sql": sql_query}
\ No newline at end of file
+    return {"reply": str(result), "sql": sql_query}
+
+async def _resolve_output_type(user_msg, result, planned_output_type):
+    """
+    Strip sensitive columns and decide how the DataFrame should be shown.
+    """
+    clean_result = remove_sensitive_columns(result)
+    # The fused pipeline already picked an output type; otherwise ask the engine
+    output_type = planned_output_type or await visualization.asuggest_output_type(clean_result, user_msg)
+    return clean_result, output_type
+
+def _page_reply(sql_query, page):
+    """
+    Reply fields for one page of a result; a DataFrame page is rendered by the caller.
+    """
+    return {
+        "sql": sql_query,
+        "result_id": page["result_id"],
+        "page": page["page"],
+        "has_more": page["has_more"],
+        "total_rows": page["total_rows"],
+    }
+
+async def _render_output(sql_query, clean_result, output_type, owner="", materialized=False):
+    """
+    Build the reply for the 'table' and 'plot' output types.
+    Tables show the first page only; a result_id is returned when more pages exist.
+    materialized=True pages `clean_result` itself rather than re-running the SQL.
+    """
+    if output_type == 'table':
+        page = result_pages.first_page(sql_query, clean_result, owner=owner, materialized=materialized)
+        table_str = await asyncio.to_thread(tabulate, page["rows"], headers='keys', tablefmt='pretty')
+        return {"reply": table_str, **_page_reply(sql_query, page)}
+
+    elif output_type == 'plot':
+        # Plots can't be sent via JSON; indicate to frontend
+        return {
+            "reply": "📊 Plot output generated. (Plot display not supported in API response.)",
+            "sql": sql_query
+        }
+    else:
+        return {"reply": "⚠️ Unexpected output type.", "sql": sql_query}
+
+def _share_job(result, owner):
+    """
+    A background-job reply may come from another user's coalesced query; let this user poll it too.
+    """
+    if isinstance(result, dict) and result.get("job_id"):
+        background_jobs.share(result["job_id"], owner)
+
+def _sse(event, payload):
+    """
+    Format one Server-Sent Events frame.
+    """
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+@router.post("/get")
+async def get_chat_response(request: Request, data: dict = Body(...)):
+    """
+    Endpoint for POST /get.
+    Enhanced to handle SQL, DataFrame, and visualization output.
+    """
+    user = get_current_user_from_cookie(request)
+    if not user:
+        return {"success": False, "message": "Unauthorized"}, 401
+
+    user_msg = data.get("msg", "")
+    session_id = user.get("email", "")
+    history = session_store.get(session_id)
+    # Every LLM call made for this request shares one deadline; stages are logged as one telemetry record
+    with trace("chat.get", question=user_msg), request_deadline(LLMClientConfig.REQUEST_DEADLINE_SECONDS):
+        async with cancel_on_disconnect(request.is_disconnected):
+            with job_owner(session_id):
+                reply = await _chat_reply(user_msg, history, session_id)
+        session_store.save(session_id, history)
+        annotate(reply_bytes=len(json.dumps(reply, default=str).encode("utf-8")))
+        return reply
+
+async def _chat_reply(user_msg, history, owner=""):
+    """
+    Run the pipeline for /get and build the reply, timing each stage.
+    """
+    sql_query, result, planned_output_type = await chatbot.arun_with_plan(user_msg, history)
+    annotate(sql=None if sql_query == "N/A" else sql_query)
+    _share_job(result, owner)
+
+    reply = _message_reply(sql_query, result)
+    if reply is not None:
+        return reply
+
+    # Handle DataFrame results
+    with stage("output_type"):
+        clean_result, output_type = await _resolve_output_type(user_msg, result, planned_output_type)
+    annotate(output_type=output_type)
+    if output_type == 'text':
+        with stage("summarize"):
+            summary = await aget_llm_response(user_msg, clean_result)
+        return {"reply":  summary, "sql": sql_query}
+    with stage("render"):
+        return await _render_output(sql_query, clean_result, output_type, owner)
+
+@router.get("/jobs/{job_id}")
+async def get_job_result(request: Request, job_id: str):
+    """
+    Endpoint for GET /jobs/{job_id}.
+    Poll a query that the query guard sent to the background; finished
+    DataFrame results are returned as a table. Only the user whose question
+    started the job can poll it; anyone else gets a 404.
+    """
+    user = get_current_user_from_cookie(request)
+    if not user:
+        return JSONResponse({"success": False, "message": "Unauthorized"}, status_code=401)
+
+    job = background_jobs.get(job_id, owner=user.get("email", ""))
+    if job is None:
+        return JSONResponse({"success": False, "message": "Unknown or expired job"}, status_code=404)
+    if job["status"] == "running":
+        return {"status": "running", "sql": job["sql"]}
+
+    reply = _message_reply(job["sql"], job["result"])
+    if reply is None:
+        # Re-running the job's SQL for later pages would send it to the background again
+        reply = await _render_output(
+            job["sql"], remove_sensitive_columns(job["result"]), "table", user.get("email", ""), materialized=True
+        )
+    return {"status": job["status"], **reply}
+
+@router.get("/results/{result_id}")
+async def get_result_page(request: Request, result_id: str, page: int = 1):
+    """
+    Endpoint for GET /results/{result_id}?page=N.
+    Page N (1-based) of a table reply. Only the user who got the result_id can
+    read it, and it expires after ResultPageConfig.TTL_SECONDS without use.
+    """
+    user = get_current_user_from_cookie(request)
+    if not user:
+        return JSONResponse({"success": False, "message": "Unauthorized"}, status_code=401)
+    if page < 1:
+        return JSONResponse({"success": False, "message": "page must be 1 or more"}, status_code=400)
+
+    fetched = await result_pages.apage(result_id, page, owner=user.get("email", ""))
+    if fetched is None:
+        return JSONResponse({"success": False, "message": "Unknown or expired result"}, status_code=404)
+
+    rows = fetched["rows"]
+    if isinstance(rows, pd.DataFrame):
+        table_str = await asyncio.to_thread(tabulate, remove_sensitive_columns(rows), headers='keys', tablefmt='pretty')
+    else:
+        table_str = _message_reply(None, rows)["reply"]
+    return {"reply": table_str, **_page_reply(None, fetched)}
+
+@router.post("/stream")
+async def stream_chat_response(request: Request, data: dict = Body(...)):
+    """
+    Endpoint for POST /stream.
+    Same pipeline as /get, streamed as Server-Sent Events: stage events
+    (classified, sql_ready, rows_ready), then either `token` events carrying the
+    summary as it is generated or a single `reply` event, and finally `done`.
+    """
+    user = get_current_user_from_cookie(request)
+    if not user:
+        return JSONResponse({"success": False, "message": "Unauthorized"}, status_code=401)
+
+    user_msg = data.get("msg", "")
+    session_id = user.get("email", "")
+    history = session_store.get(session_id)
+
+    async def event_stream():
+        with trace("chat.stream", question=user_msg), request_deadline(LLMClientConfig.REQUEST_DEADLINE_SECONDS):
+            async with cancel_on_disconnect(request.is_disconnected):
+                with job_owner(session_id):
+                    async for frame in _event_frames():
+                        yield frame
+
+    async def _event_frames():
+        sql_query, result, planned_output_type = "N/A", None, None
+        async for event, payload in chatbot.astream_run(user_msg, history):
+            if event == "result":
+                sql_query, result, planned_output_type = payload
+            else:
+                yield _sse(event, payload)
+        session_store.save(session_id, history)
+        annotate(sql=None if sql_query == "N/A" else sql_query)
+        _share_job(result, session_id)
+
+        reply = _message_reply(sql_query, result)
+        if reply is None:
+            with stage("output_type"):
+                clean_result, output_type = await _resolve_output_type(user_msg, result, planned_output_type)
+            annotate(output_type=output_type)
+            if output_type == 'text':
+                async for token in astream_llm_response(user_msg, clean_result):
+                    if await request.is_disconnected():
+                        return
+                    yield _sse("token", {"text": token})
+                yield _sse("done", {"sql": sql_query})
+                return
+            with stage("render"):
+                reply = await _render_output(sql_query, clean_result, output_type, session_id)
+        yield _sse("reply", reply)
+        yield _sse("done", {"sql": sql_query})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -3,11 +3,16 @@ inference.py
 ============
 This module provides a unified interface for running natural language to SQL inference,
 executing the SQL query, and optionally generating a visualization based on the results.
+Run with `--batch questions.jsonl` to process a question file concurrently (src.mcp.batch_runner).
 """
 
 # Use relative imports for package context, or adjust sys.path for script execution
+import argparse
+import json
 import os
 import sys
+import time
+from contextlib import contextmanager
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pandas as pd
@@ -17,6 +22,9 @@ from inference import get_llm_response
 from src.mcp.generate_plot import VisualizationEngine, remove_sensitive_columns
 from tabulate import tabulate
 from src.mcp.classifier_greetings import GreetingClassifier
+from src.mcp.sql_history import SQLHistory
+from src.mcp.batch_runner import add_batch_arguments, outcome_record, run_batch_file, sync_runner
+from src.mcp.telemetry import annotate, result_size, stage, trace
 
 class InferenceEngine:
     """
@@ -39,31 +47,54 @@ class InferenceEngine:
         self.table_schemas = table_schemas or {}
         self.classifier = GreetingClassifier(self.sql_generator)
 
-    def run(self, user_query: str, visualize: bool = False):
+    def run(self, user_query: str, visualize: bool = False, history: SQLHistory = None):
         """
         Runs the full inference pipeline:
         - Classifies user_query as greeting or question.
         - If greeting, returns greeting message.
         - If question, converts to SQL, executes, and optionally visualizes.
+        `history` is the caller's conversation history; None uses the SQL generator's own.
+        The result's "latency_ms" holds the duration of each stage, which is also
+        logged as a telemetry record (src.mcp.telemetry).
         """
-        classification_result = self.classifier.classify(user_query)
+        with trace("inference_engine.run", question=user_query):
+            result = self._run(user_query, visualize, history)
+            annotate(sql=result["sql"], **result_size(result["data"]))
+            return result
+
+    def _run(self, user_query: str, visualize: bool = False, history: SQLHistory = None):
+        latency = {}
+
+        @contextmanager
+        def timed(name):
+            started = time.perf_counter()
+            with stage(name):
+                yield
+            latency[name] = round((time.perf_counter() - started) * 1000, 2)
+
+        with timed("classify"):
+            classification_result = self.classifier.classify(user_query)
         if isinstance(classification_result, tuple) and classification_result[0] == "N/A":
             # It's a greeting or unclassified
             return {
                 "sql": None,
                 "data": classification_result[1],
-                "visualization": None
+                "visualization": None,
+                "latency_ms": latency
             }
 
-        sql = self.sql_generator.generate_sql_query(user_query, self.table_schemas)
+        with timed("sql"):
+            sql = self.sql_generator.generate_sql_query(user_query, self.table_schemas, history=history)
         if not sql:
             return {
                 "sql": None,
                 "data": {"message": "Could not generate SQL for the query."},
-                "visualization": None
+                "visualization": None,
+                "latency_ms": latency
             }
 
-        data = self.db_handler.execute_query(sql)
+        with timed("execute"):
+            data = self.db_handler.execute_query(sql)
         visualization = None
 
         # Check if data is a pandas DataFrame for visualization
@@ -74,18 +105,39 @@ class InferenceEngine:
             is_dataframe = False
 
         if visualize and is_dataframe:
-            output_type = self.viz_engine.suggest_output_type(data, user_query)
-            if output_type == "plot":
-                visualization = self.viz_engine.generate_chart(data)
+            with timed("visualize"):
+                output_type = self.viz_engine.suggest_output_type(data, user_query)
+                if output_type == "plot":
+                    visualization = self.viz_engine.generate_chart(data)
 
         return {
             "sql": sql,
             "data": data,
-            "visualization": visualization
+            "visualization": visualization,
+            "latency_ms": latency
         }
+
+    def batch_record(self, user_query: str) -> dict:
+        """
+        Run one question for the batch runner: SQL, row count, status and stage latencies.
+        Each question gets a fresh history, so concurrent batch items neither see
+        each other's context nor share the generator's history across threads.
+        """
+        result = self.run(user_query, history=SQLHistory())
+        record = outcome_record(result["sql"], result["data"])
+        record["latency_ms"] = result["latency_ms"]
+        return record
     
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Text-to-SQL inference engine")
+    add_batch_arguments(parser)
+    args = parser.parse_args()
+    if args.batch:
+        counts = run_batch_file(args.batch, sync_runner(InferenceEngine().batch_record), args.output, args.concurrency)
+        print(json.dumps(counts), file=sys.stderr)
+        sys.exit(0)
+
     # Example usage
     inference_engine = InferenceEngine()
     visualization = VisualizationEngine()
@@ -122,7 +174,7 @@ if __name__ == "__main__":
             output_type = visualization.suggest_output_type(clean_result, user_input)
 
             if output_type == 'text':
-                summary = get_llm_response(user_input, clean_result.to_dict())
+                summary = get_llm_response(user_input, clean_result)
                 print("\n📝 Insight Summary:\n", summary)
 
             elif output_type == 'table':
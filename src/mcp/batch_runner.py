@@ -0,0 +1,156 @@
+"""
+Batch Runner Module
+===============================================================================
+Runs a file of questions through a pipeline with bounded concurrency and
+streams one JSON line per question as soon as it finishes. Used for nightly
+regression runs and for warming the SQL cache.
+
+Input (by extension):
+- .jsonl: one object per line with "question" (and optional "id"), or a bare JSON string;
+- .csv: a "question" column (and optional "id" column).
+
+Output record:
+    {"id": ..., "question": ..., "status": "ok" | "message" | "error",
+     "sql": ..., "row_count": ..., "output_type": ..., "message"/"error": ...,
+     "latency_ms": {"classify": ..., "sql": ..., "execute": ..., "total": ...}}
+
+Usage Example:
+    python inference.py --batch questions.jsonl --output results.jsonl --concurrency 8
+    python src/mcp/app_inference.py --batch questions.csv
+"""
+import asyncio
+import csv
+import json
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TextIO
+
+import pandas as pd
+
+from src.mcp.telemetry import trace
+from src.utils.constant import BatchConfig
+
+# Pipeline events that close a stage, as emitted by LLMChatBot.astream_run
+STAGE_EVENTS = {"classified": "classify", "sql_ready": "sql", "result": "execute"}
+
+
+def read_questions(path: str) -> List[Dict[str, Any]]:
+    """
+    Load {"id", "question"} items from a JSONL or CSV file; ids default to the line number.
+    """
+    items = []
+    with open(path, encoding="utf-8", newline="") as handle:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(handle))
+        else:
+            rows = [json.loads(line) for line in handle if line.strip()]
+    for number, row in enumerate(rows, start=1):
+        if isinstance(row, str):
+            row = {"question": row}
+        question = (row.get("question") or "").strip()
+        if question:
+            items.append({"id": row.get("id") or number, "question": question})
+    return items
+
+
+def outcome_record(sql_query: Optional[str], result: Any, output_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Summarize a pipeline result: status, SQL, row count and any message or error.
+    """
+    record = {"sql": None if sql_query in (None, "N/A") else sql_query, "row_count": None, "output_type": output_type}
+    if isinstance(result, pd.DataFrame):
+        record.update(status="ok", row_count=len(result))
+    elif isinstance(result, dict) and "error" in result:
+        record.update(status="error", error=result["error"])
+    elif isinstance(result, dict) and "message" in result:
+        record.update(status="message", message=result["message"])
+    else:
+        record.update(status="error", error="Unexpected result format")
+    return record
+
+
+def chatbot_runner(bot: Any, history_factory: Optional[Callable[[], Any]] = None) -> Callable[[str], Awaitable[Dict[str, Any]]]:
+    """
+    Runner for an LLMChatBot: streams its stages to time each one. Every question
+    gets a fresh history so batch items do not leak context into each other.
+    """
+    async def run(question: str) -> Dict[str, Any]:
+        history = history_factory() if history_factory else None
+        latency, outcome = {}, ("N/A", None, None)
+        stage_started = time.perf_counter()
+        with trace("batch", question=question):
+            async for event, payload in bot.astream_run(question, history):
+                if event in STAGE_EVENTS:
+                    now = time.perf_counter()
+                    latency[STAGE_EVENTS[event]] = round((now - stage_started) * 1000, 2)
+                    stage_started = now
+                if event == "result":
+                    outcome = payload
+        record = outcome_record(*outcome)
+        record["latency_ms"] = latency
+        return record
+
+    return run
+
+
+def sync_runner(fn: Callable[[str], Dict[str, Any]], executor: Any = None) -> Callable[[str], Awaitable[Dict[str, Any]]]:
+    """
+    Runner for a blocking `fn(question) -> record`, run on a thread pool.
+    """
+    async def run(question: str) -> Dict[str, Any]:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, question)
+
+    return run
+
+
+async def run_batch(
+    items: Iterable[Dict[str, Any]],
+    runner: Callable[[str], Awaitable[Dict[str, Any]]],
+    output: Optional[TextIO] = None,
+    concurrency: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Run every item with at most `concurrency` in flight, writing each record
+    to `output` as JSON lines in completion order. Returns counts per status.
+    """
+    output = output or sys.stdout
+    semaphore = asyncio.Semaphore(concurrency or BatchConfig.CONCURRENCY)
+    counts: Dict[str, int] = {}
+
+    async def run_one(item: Dict[str, Any]) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                record = await runner(item["question"])
+            except Exception as e:
+                record = {"status": "error", "error": f"{type(e).__name__}: {e}", "latency_ms": {}}
+            record.setdefault("latency_ms", {})["total"] = round((time.perf_counter() - started) * 1000, 2)
+        record = {"id": item["id"], "question": item["question"], **record}
+        counts[record["status"]] = counts.get(record["status"], 0) + 1
+        output.write(json.dumps(record, default=str) + "\n")
+        output.flush()
+
+    await asyncio.gather(*(run_one(item) for item in items))
+    return counts
+
+
+def run_batch_file(
+    path: str,
+    runner: Callable[[str], Awaitable[Dict[str, Any]]],
+    output_path: Optional[str] = None,
+    concurrency: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Blocking entry point for the CLIs: read `path`, write JSONL to `output_path` (default: stdout).
+    """
+    items = read_questions(path)
+    if not output_path:
+        return asyncio.run(run_batch(items, runner, sys.stdout, concurrency))
+    with open(output_path, "w", encoding="utf-8") as output:
+        return asyncio.run(run_batch(items, runner, output, concurrency))
+
+
+def add_batch_arguments(parser: Any) -> None:
+    parser.add_argument("--batch", help="JSONL or CSV file of questions to run non-interactively")
+    parser.add_argument("--output", help="JSONL results file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Questions in flight at once")
@@ -1,31 +1,19 @@
+from src.mcp.intent_classifier import IntentClassifier, GREETING, QUESTION
+
+
 class GreetingClassifier:
-    def __init__(self, query_generator):
+    def __init__(self, query_generator, intent_classifier=None):
         self.query_generator = query_generator
+        # The LLM is only consulted when the local model is unsure
+        self.intent_classifier = intent_classifier or IntentClassifier(llm_client=query_generator.client)
 
     def classify(self, user_input):
-        prompt = f"""
-Determine if this input is a greeting or a question:
-"{user_input}"
-Respond with GREETING or QUESTION only.
-"""
-
-        response = self.query_generator.client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "You are a user input classifier."},
-                {"role": "user", "content": prompt},
-            ],
-            max_tokens=10,
-            temperature=0.0,
-            top_p=1.0
-        )
-
-        classification = response.choices[0].message.content.strip().upper()
+        classification = self.intent_classifier.classify(user_input).label
 
-        if classification == "GREETING":
+        if classification == GREETING:
             return "N/A", {"message": "Hello! How can I assist you today?"}
-        elif classification == "QUESTION":
+        elif classification == QUESTION:
             # ...proceed with normal question handling...
             pass
         else:
-            return "N/A", {"message": "Sorry, I couldn't classify your input. Please try again."}
\ No newline at end of file
+            return "N/A", {"message": "Sorry, I couldn't classify your input. Please try again."}
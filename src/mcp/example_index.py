@@ -0,0 +1,145 @@
+"""
+Example Index Module
+===============================================================================
+ExampleIndex: a BM25 index of (question, SQL) pairs that executed successfully,
+used to put the most similar past examples into the SQL generation prompt as
+few-shot examples.
+
+The index is an inverted index stored in SQLite:
+- sql_examples(id, question, normalized, sql, length, updated_at)
+- sql_example_terms(term, example_id, tf), indexed by term
+
+A search reads only the postings of the query's terms. Questions are
+tokenized with the schema retrieval tokenizer (synonyms mapped, plurals
+stemmed, stopwords dropped), so "unpaid bills" matches "overdue invoices".
+
+Usage Example:
+    index = ExampleIndex()
+    index.add("how many invoices are overdue", "SELECT COUNT(*) FROM Invoice WHERE status = 'OVERDUE'")
+    index.search("count of unpaid invoices", k=3)
+    # [Example(question=..., sql=..., score=...)]
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, List, NamedTuple, Optional
+
+from src.mcp.query_cache import normalize_question
+from src.mcp.schema_retrieval import tokenize
+from src.utils.constant import FewShotConfig
+
+
+class Example(NamedTuple):
+    question: str
+    sql: str
+    score: float
+
+
+class ExampleIndex:
+    """
+    SQLite-backed BM25 index of executed (question, SQL) pairs.
+
+    Args:
+        db_path: SQLite file; ":memory:" keeps the index in memory (default: config.DB_PATH).
+        config: Configuration object (default: FewShotConfig).
+    """
+
+    def __init__(self, db_path: Optional[str] = None, config: Optional[Any] = None):
+        self.config = config or FewShotConfig
+        db_path = db_path or self.config.DB_PATH
+        db_dir = os.path.dirname(db_path)
+        if db_dir and db_path != ":memory:":
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS sql_examples ("
+            "id INTEGER PRIMARY KEY, question TEXT NOT NULL, normalized TEXT NOT NULL UNIQUE, "
+            "sql TEXT NOT NULL, length INTEGER NOT NULL, updated_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS sql_example_terms ("
+            "term TEXT NOT NULL, example_id INTEGER NOT NULL, tf INTEGER NOT NULL, "
+            "PRIMARY KEY (term, example_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS sql_example_terms_example ON sql_example_terms(example_id);"
+        )
+
+    def add(self, question: str, sql: str) -> None:
+        """
+        Index a pair that executed successfully; a repeated question keeps only its latest SQL.
+        """
+        terms = Counter(tokenize(question))
+        if not sql or not terms:
+            return
+        normalized = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                row = self._conn.execute("SELECT id FROM sql_examples WHERE normalized = ?", (normalized,)).fetchone()
+                if row is not None:
+                    self._delete(row[0])
+                cursor = self._conn.execute(
+                    "INSERT INTO sql_examples(question, normalized, sql, length, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (question.strip(), normalized, sql, sum(terms.values()), now),
+                )
+                self._conn.executemany(
+                    "INSERT INTO sql_example_terms(term, example_id, tf) VALUES (?, ?, ?)",
+                    [(term, cursor.lastrowid, tf) for term, tf in terms.items()],
+                )
+                self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def search(self, question: str, k: Optional[int] = None) -> List[Example]:
+        """
+        Top-k examples by BM25 score (at least config.MIN_SCORE), best first.
+        """
+        k = k or self.config.TOP_K
+        terms = set(tokenize(question))
+        if not terms:
+            return []
+        k1, b = self.config.BM25_K1, self.config.BM25_B
+        with self._lock:
+            total, avg_length = self._conn.execute("SELECT COUNT(*), AVG(length) FROM sql_examples").fetchone()
+            if not total:
+                return []
+            placeholders = ",".join("?" * len(terms))
+            postings = self._conn.execute(
+                f"SELECT t.term, t.example_id, t.tf, e.length, "
+                f"(SELECT COUNT(*) FROM sql_example_terms d WHERE d.term = t.term) "
+                f"FROM sql_example_terms t JOIN sql_examples e ON e.id = t.example_id "
+                f"WHERE t.term IN ({placeholders})",
+                tuple(terms),
+            ).fetchall()
+            scores = Counter()
+            for term, example_id, tf, length, document_frequency in postings:
+                idf = math.log(1 + (total - document_frequency + 0.5) / (document_frequency + 0.5))
+                scores[example_id] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+            best = [(example_id, score) for example_id, score in scores.most_common(k) if score >= self.config.MIN_SCORE]
+            examples = []
+            for example_id, score in best:
+                question_text, sql = self._conn.execute(
+                    "SELECT question, sql FROM sql_examples WHERE id = ?", (example_id,)
+                ).fetchone()
+                examples.append(Example(question_text, sql, round(score, 4)))
+            return examples
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sql_examples").fetchone()[0]
+
+    def _delete(self, example_id: int) -> None:
+        self._conn.execute("DELETE FROM sql_example_terms WHERE example_id = ?", (example_id,))
+        self._conn.execute("DELETE FROM sql_examples WHERE id = ?", (example_id,))
+
+    def _evict(self) -> None:
+        stale = self._conn.execute(
+            "SELECT id FROM sql_examples ORDER BY updated_at DESC LIMIT -1 OFFSET ?", (self.config.MAX_EXAMPLES,)
+        ).fetchall()
+        for (example_id,) in stale:
+            self._delete(example_id)
@@ -6,10 +6,23 @@ and suggesting output types based on user queries and pandas DataFrames.
 This class provides a flexible interface for integrating with various LLMs and plotting libraries,  
 allowing for easy extension and customization.
 """
+import re
 import pandas as pd
-from openai import OpenAI, OpenAIError
-from src.utils.constant import OpenAIConfig
-from typing import Optional, List, Any
+from openai import OpenAIError
+from src.mcp.llm_backend import create_llm_client
+from src.mcp.resilient_llm import guard_async_llm, guard_llm
+from src.utils.constant import OpenAIConfig, VisualizationConfig
+from typing import Optional, List, Any, Tuple
+
+_PLOT_KEYWORDS = re.compile(
+    r"\b(trends?|over time|timeline|monthly|weekly|daily|yearly|per (month|week|day|year)|"
+    r"compare|comparison|versus|vs|distribution|breakdown|share|proportion|"
+    r"chart|plot|graph|visuali[sz]e)\b",
+    re.IGNORECASE,
+)
+_TABLE_KEYWORDS = re.compile(r"\b(list|show all|details|table|records|rows)\b", re.IGNORECASE)
+_DATE_VALUE = re.compile(r"^\d{4}-\d{2}(-\d{2})?")
+_DATE_NAME = re.compile(r"(date|month|year|week|day|time|_at)$", re.IGNORECASE)
 
 
 def remove_sensitive_columns(result):
@@ -24,26 +37,77 @@ def remove_sensitive_columns(result):
     return result
 
 
+def _is_temporal(series: pd.Series) -> bool:
+    """
+    True for datetime columns and for SQLite date strings (YYYY-MM[-DD]) in date-named columns.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return True
+    if pd.api.types.is_numeric_dtype(series) or not _DATE_NAME.search(str(series.name)):
+        return False
+    sample = series.dropna().head(5).astype(str)
+    return not sample.empty and sample.str.match(_DATE_VALUE).all()
+
+
+def heuristic_output_type(df: pd.DataFrame, user_query: str = "") -> Tuple[str, bool]:
+    """
+    Choose 'text', 'table' or 'plot' from the result shape, dtype mix and query wording.
+
+    Returns:
+        (output_type, confident): `confident` is False when the rules only
+        picked a default and an LLM tie-breaker could reasonably disagree.
+    """
+    if df is None or df.empty:
+        return 'text', True
+
+    rows, cols = df.shape
+    numeric = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])]
+    temporal = [col for col in df.columns if _is_temporal(df[col])]
+    categorical = [col for col in df.columns if col not in numeric and col not in temporal]
+    query = user_query or ""
+    wants_plot = bool(_PLOT_KEYWORDS.search(query))
+    wants_table = bool(_TABLE_KEYWORDS.search(query))
+
+    if rows <= VisualizationConfig.MAX_TEXT_ROWS and cols <= VisualizationConfig.MAX_TEXT_COLUMNS:
+        return 'text', True
+
+    plottable = bool(numeric) and rows > 1 and (temporal or categorical or len(numeric) >= 2)
+    if wants_plot and plottable:
+        return 'plot', True
+    if cols >= VisualizationConfig.WIDE_COLUMNS or wants_table:
+        return 'table', True
+    if temporal and numeric and rows > 2:
+        return 'plot', True
+    if plottable and categorical and len(numeric) == 1 and rows <= VisualizationConfig.MAX_PLOT_CATEGORIES:
+        # e.g. a count per department: a bar chart and a table are both sensible
+        return 'table', False
+    return 'table', rows > VisualizationConfig.MAX_PLOT_CATEGORIES
+
+
 class VisualizationEngine:
     """
     VisualizationEngine provides a modular, configurable, and pluggable interface for generating
     data visualizations and suggesting output types based on user queries and pandas DataFrames.
 
     Features:
-    - Uses an LLM (default: OpenAI GPT) to suggest the most appropriate output type ('text', 'table', or 'plot')
-      for a given DataFrame and user query.
+    - Suggests the most appropriate output type ('text', 'table', or 'plot') for a given DataFrame and
+      user query with deterministic rules, optionally using an LLM (default: OpenAI GPT) as a tie-breaker.
     - Supports automatic chart generation using a pluggable plotting backend (default: plotly.express).
     - Allows injection of custom LLM clients, configuration objects, and supported chart types for flexibility.
     - Designed for easy extension and integration into larger data analysis or chatbot systems.
 
     Args:
-        llm_client: Optional LLM client instance for output type suggestion (default: OpenAI with API key from config).
+        llm_client: Optional LLM client instance for output type suggestion (default: the configured LLM backend, see src.mcp.llm_backend).
         config: Optional configuration object for LLM and plotting settings (default: OpenAIConfig).
         supported_types: Optional list of supported chart types (default: ['line', 'bar', 'scatter', 'histogram', 'pie', 'trend']).
+        async_llm_client: Optional async LLM client for asuggest_output_type (default: the configured async backend, created on first use).
+        use_llm_tiebreak: Ask the LLM when the output-type rules are unsure (default: VisualizationConfig.LLM_TIEBREAK).
 
     Methods:
         suggest_output_type(df, user_query):
             Suggests the output type ('text', 'table', or 'plot') based on the DataFrame and user query.
+        asuggest_output_type(df, user_query):
+            Async variant of suggest_output_type that does not block the event loop.
         generate_chart(df, chart_type='bar', plot_backend=None):
             Generates a chart of the specified type using the provided or default plotting backend.
         available_chart_types():
@@ -63,43 +127,79 @@ class VisualizationEngine:
         self,
         llm_client: Optional[Any] = None,
         config: Optional[Any] = None,
-        supported_types: Optional[List[str]] = None
+        supported_types: Optional[List[str]] = None,
+        async_llm_client: Optional[Any] = None,
+        use_llm_tiebreak: Optional[bool] = None
     ):
         self.config = config or OpenAIConfig
-        self.llm = llm_client or OpenAI(api_key=getattr(self.config, "OpenAI_API_KEY", None))
+        self.llm = guard_llm(llm_client or create_llm_client(api_key=getattr(self.config, "OpenAI_API_KEY", None)))
+        self._async_llm = guard_async_llm(async_llm_client)
+        self.use_llm_tiebreak = VisualizationConfig.LLM_TIEBREAK if use_llm_tiebreak is None else use_llm_tiebreak
         self.supported_types = supported_types or ['line', 'bar', 'scatter', 'histogram', 'pie', 'trend']
 
     def suggest_output_type(self, df: pd.DataFrame, user_query: str) -> str:
         """
         Suggest output type ('text', 'table', or 'plot') based on dataframe and user query.
-        Returns 'text' on error or if DataFrame is empty.
+        Uses the local rules; the LLM is only asked when `use_llm_tiebreak` is set
+        and the rules are not confident. Returns 'text' if the DataFrame is empty.
+        """
+        output_type, confident = heuristic_output_type(df, user_query)
+        if confident or not self.use_llm_tiebreak:
+            return output_type
+
+        try:
+            response = self.llm.chat.completions.create(**self._output_type_request(df, user_query))
+            return self._parse_output_type(response, output_type)
+        except Exception as e:
+            print(f"LLM output type suggestion error: {e}")
+            return output_type
+
+    async def asuggest_output_type(self, df: pd.DataFrame, user_query: str) -> str:
+        """
+        Async variant of suggest_output_type using the async LLM client.
+        """
+        output_type, confident = heuristic_output_type(df, user_query)
+        if confident or not self.use_llm_tiebreak:
+            return output_type
+
+        try:
+            response = await self.async_llm.chat.completions.create(**self._output_type_request(df, user_query))
+            return self._parse_output_type(response, output_type)
+        except Exception as e:
+            print(f"LLM output type suggestion error: {e}")
+            return output_type
+
+    @property
+    def async_llm(self):
         """
-        if df.empty:
-            return 'text'
+        Async LLM client, created on first use unless one was injected.
+        """
+        if self._async_llm is None:
+            self._async_llm = guard_async_llm(create_llm_client(is_async=True, api_key=getattr(self.config, "OpenAI_API_KEY", None)))
+        return self._async_llm
 
+    def _output_type_request(self, df: pd.DataFrame, user_query: str) -> dict:
         column_info = ", ".join([f"{col} ({str(dtype)})" for col, dtype in df.dtypes.items()])
         prompt = (
             f"Data columns: {column_info}\n"
             f"User query: '{user_query}'\n"
             "Suggest output type: 'text', 'table', or 'plot'."
         )
+        return dict(
+            model=getattr(self.config, "OpenAI_model", "gpt-4-turbo"),
+            messages=[
+                {"role": "system", "content": "You are a visualization output expert."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=50,
+            temperature=0.2,
+            top_p=1.0
+        )
 
-        try:
-            response = self.llm.chat.completions.create(
-                model=getattr(self.config, "OpenAI_model", "gpt-4-turbo"),
-                messages=[
-                    {"role": "system", "content": "You are a visualization output expert."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=50,
-                temperature=0.2,
-                top_p=1.0
-            )
-            output_type = response.choices[0].message.content.strip().lower()
-            return output_type if output_type in ['text', 'table', 'plot'] else 'text'
-        except Exception as e:
-            print(f"LLM output type suggestion error: {e}")
-            return 'text'
+    @staticmethod
+    def _parse_output_type(response: Any, default: str = 'text') -> str:
+        output_type = response.choices[0].message.content.strip().lower()
+        return output_type if output_type in ['text', 'table', 'plot'] else default
 
     def generate_chart(
         self,
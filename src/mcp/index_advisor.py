@@ -0,0 +1,468 @@
+"""
+Index Advisor Module
+===============================================================================
+Offline tool that proposes secondary indexes for the generated-SQL workload.
+
+1. Workload: the SQL logged by SQLQueryGenerator (logs/sql_query_generator),
+   deduplicated by canonical form (src.mcp.result_cache) and weighted by how
+   often it was generated.
+2. Candidates: each query's predicates and join keys are parsed per table:
+   equality (=, IN, IS) and range (<, >, BETWEEN) filters on plain columns,
+   and join equalities. Every such column is a single-column candidate, and a
+   query filtering one table on several columns adds a composite candidate
+   (equality columns first, then one range column). Columns inside function
+   calls, rowid aliases and columns already leading an index are skipped.
+3. Replay: the database is copied and ANALYZEd, so both sides of every
+   comparison have planner statistics. Each query is timed (best of REPEATS)
+   and costed with the QueryGuard estimator; then all candidates are created
+   together and the queries are replayed to see which candidates the planner
+   uses. The speedup of that full set is reported as "combined". Each
+   candidate is then measured alone: it is the only candidate index on the
+   copy while the queries that used a candidate on its table are replayed,
+   so its estimated and measured speedups are its own. An index is recommended when its measured
+   speedup (or, for queries too fast to time, the estimated one) reaches
+   MIN_SPEEDUP.
+4. Apply (optional): recommended indexes are created on the real database,
+   followed by ANALYZE.
+
+Usage Example:
+    python -m src.mcp.index_advisor                      # report only
+    python -m src.mcp.index_advisor --apply --output advice.json
+"""
+import argparse
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import create_engine
+from tabulate import tabulate
+
+from src.mcp.query_budget import QueryBudget
+from src.mcp.query_guard import QueryGuard
+from src.mcp.result_cache import canonical_sql
+from src.utils.constant import IndexAdvisorConfig, SQLitePoolConfig
+
+_RECORD = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} - [^-]+ - \w+ - (.*)$")
+_GENERATED = re.compile(r"^Generated SQL Query(?: \([^)]*\))?: (.*)$", re.DOTALL)
+_FENCE = re.compile(r"^```(?:sql)?\s*|\s*```$", re.IGNORECASE)
+_TOKEN = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]|\d+(?:\.\d*)?|\w+|<=|>=|==|!=|<>|\S"
+)
+
+EQUALITY, RANGE, JOIN = "equality", "range", "join"
+_OPERATORS = {"=": EQUALITY, "==": EQUALITY, "in": EQUALITY, "is": EQUALITY,
+              "<": RANGE, ">": RANGE, "<=": RANGE, ">=": RANGE, "between": RANGE}
+_KEYWORDS = {
+    "select", "from", "where", "join", "left", "right", "inner", "outer", "cross", "full", "natural", "on",
+    "using", "group", "order", "by", "having", "limit", "offset", "union", "all", "except", "intersect",
+    "as", "and", "or", "not", "in", "is", "null", "between", "like", "glob", "exists", "case", "when",
+    "then", "else", "end", "distinct", "asc", "desc", "with", "recursive", "values", "cast", "collate",
+    "escape", "true", "false",
+}
+
+
+class Candidate(NamedTuple):
+    table: str
+    columns: Tuple[str, ...]
+
+    @property
+    def name(self) -> str:
+        return IndexAdvisorConfig.INDEX_PREFIX + "_".join((self.table,) + self.columns).lower()
+
+    def create_sql(self) -> str:
+        columns = ", ".join(f'"{column}"' for column in self.columns)
+        return f'CREATE INDEX IF NOT EXISTS "{self.name}" ON "{self.table}" ({columns})'
+
+
+def read_workload(log_path: str) -> "OrderedDict[str, Dict[str, Any]]":
+    """
+    Logged SELECT statements by canonical form: {"sql", "count"}, in first-seen order.
+    """
+    messages, current = [], None
+    with open(log_path, encoding="utf-8", errors="replace") as handle:
+        for line in handle:
+            match = _RECORD.match(line.rstrip("\n"))
+            if match:
+                current = [match.group(1)]
+                messages.append(current)
+            elif current is not None:
+                current.append(line.rstrip("\n"))
+
+    workload: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    for lines in messages:
+        match = _GENERATED.match("\n".join(lines))
+        if not match:
+            continue
+        sql = _FENCE.sub("", match.group(1).strip()).strip().rstrip(";").strip()
+        if not re.match(r"^(select|with)\b", sql, re.IGNORECASE):
+            continue
+        entry = workload.setdefault(canonical_sql(sql), {"sql": sql, "count": 0})
+        entry["count"] += 1
+    return workload
+
+
+def _tokens(sql: str) -> List[str]:
+    return _TOKEN.findall(sql)
+
+
+def _identifier(token: str) -> Optional[str]:
+    if token[0] in "\"`[":
+        return token[1:-1].replace('""', '"')
+    if re.match(r"^[A-Za-z_]\w*$", token) and token.lower() not in _KEYWORDS:
+        return token
+    return None
+
+
+def _table_aliases(tokens: List[str]) -> Dict[str, str]:
+    """
+    alias (lower-case) -> table name, for every FROM/JOIN table reference.
+    """
+    aliases = {}
+    in_from = False
+    for i, token in enumerate(tokens):
+        lowered = token.lower()
+        if lowered == "from":
+            in_from = True
+        if lowered in ("from", "join") or (in_from and token == ","):
+            name = _identifier(tokens[i + 1]) if i + 1 < len(tokens) else None
+            if name is None:
+                continue
+            position = i + 2
+            if position < len(tokens) and tokens[position] == ".":
+                # schema.table
+                name = _identifier(tokens[position + 1]) or name
+                position += 2
+            if position < len(tokens) and tokens[position].lower() == "as":
+                position += 1
+            alias = _identifier(tokens[position]) if position < len(tokens) else None
+            aliases[name.lower()] = name
+            if alias is not None:
+                aliases[alias.lower()] = name
+        elif lowered in ("where", "group", "order", "having", "limit", "on", "union", "select", ")"):
+            in_from = False
+    return aliases
+
+
+def extract_predicates(sql: str, columns_by_table: Dict[str, List[str]]) -> List[Tuple[str, str, str]]:
+    """
+    (table, column, EQUALITY | RANGE | JOIN) for the indexable filters and join keys of `sql`.
+    """
+    tokens = _tokens(sql)
+    aliases = _table_aliases(tokens)
+    tables = {name for name in aliases.values() if name in columns_by_table}
+    owners: Dict[str, List[str]] = {}
+    for table in tables:
+        for column in columns_by_table[table]:
+            owners.setdefault(column.lower(), []).append(table)
+
+    predicates = []
+    # Whether each open parenthesis is a function call; columns inside one are not indexable as is
+    calls: List[bool] = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == "(":
+            previous = tokens[i - 1].lower() if i else ""
+            calls.append(bool(re.match(r"^[a-z_]\w*$", previous)) and previous not in _KEYWORDS)
+            i += 1
+            continue
+        if token == ")":
+            if calls:
+                calls.pop()
+            i += 1
+            continue
+
+        name = _identifier(token)
+        if name is None or (i + 1 < len(tokens) and tokens[i + 1] == "("):
+            i += 1
+            continue
+        qualifier, end = None, i + 1
+        if end + 1 < len(tokens) and tokens[end] == "." and _identifier(tokens[end + 1]):
+            qualifier, name, end = name, _identifier(tokens[end + 1]), end + 2
+        if any(calls):
+            i = end
+            continue
+
+        after = tokens[end].lower() if end < len(tokens) else ""
+        if after == "is" and end + 1 < len(tokens) and tokens[end + 1].lower() == "not":
+            after = ""
+        before = tokens[i - 1].lower() if i else ""
+        if after in _OPERATORS:
+            kind = _OPERATORS[after]
+            other = tokens[end + 1] if end + 1 < len(tokens) else ""
+        elif before in ("=", "==", "<", ">", "<=", ">="):
+            kind = _OPERATORS[before]
+            other = tokens[i - 2] if i >= 2 else ""
+        else:
+            kind = other = None
+        if kind == EQUALITY and after != "in" and _identifier(other or "'"):
+            # column = column: a join key
+            kind = JOIN
+        if kind is not None:
+            if qualifier is not None:
+                table = aliases.get(qualifier.lower())
+            else:
+                candidates = owners.get(name.lower(), [])
+                table = candidates[0] if len(candidates) == 1 else None
+            if table in tables:
+                column = next((c for c in columns_by_table[table] if c.lower() == name.lower()), None)
+                if column is not None:
+                    predicates.append((table, column, kind))
+        i = end
+    return predicates
+
+
+class IndexAdvisor:
+    """
+    Proposes, measures and optionally applies indexes for a SQLite database.
+
+    Args:
+        db_path: The database the workload runs against.
+        config: Configuration object (default: IndexAdvisorConfig).
+    """
+
+    def __init__(self, db_path: str, config: Optional[Any] = None):
+        self.db_path = db_path
+        self.config = config or IndexAdvisorConfig
+
+    def schema(self, conn: sqlite3.Connection) -> Tuple[Dict[str, List[str]], set, set]:
+        """
+        (columns by table, rowid-alias (table, column) pairs, column prefixes already indexed).
+        """
+        columns_by_table, rowid_aliases, indexed = {}, set(), set()
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        )]
+        for table in tables:
+            info = conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+            columns_by_table[table] = [row[1] for row in info]
+            primary = [row for row in info if row[5]]
+            if len(primary) == 1 and (primary[0][2] or "").upper() == "INTEGER":
+                rowid_aliases.add((table, primary[0][1]))
+            for index in conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+                names = tuple(row[2] for row in conn.execute(f'PRAGMA index_info("{index[1]}")').fetchall())
+                for length in range(1, len(names) + 1):
+                    indexed.add((table,) + tuple(name.lower() for name in names[:length] if name))
+        return columns_by_table, rowid_aliases, indexed
+
+    def candidates(self, workload: Dict[str, Dict[str, Any]], conn: sqlite3.Connection) -> List[Candidate]:
+        """
+        Candidate indexes for the workload, most frequently needed first.
+        """
+        columns_by_table, rowid_aliases, indexed = self.schema(conn)
+        weights: Dict[Candidate, int] = {}
+        for entry in workload.values():
+            by_table: Dict[str, Dict[str, List[str]]] = {}
+            for table, column, kind in extract_predicates(entry["sql"], columns_by_table):
+                if (table, column) in rowid_aliases:
+                    continue
+                columns = by_table.setdefault(table, {EQUALITY: [], RANGE: [], JOIN: []})
+                if column not in columns[EQUALITY] + columns[RANGE] + columns[JOIN]:
+                    columns[kind].append(column)
+            for table, columns in by_table.items():
+                proposed = [(column,) for column in columns[EQUALITY] + columns[RANGE] + columns[JOIN]]
+                # Composite: the table's own filters, equality columns first
+                composite = tuple(columns[EQUALITY][:self.config.MAX_INDEX_COLUMNS] + columns[RANGE][:1])
+                if len(composite) >= 2:
+                    proposed.append(composite[:self.config.MAX_INDEX_COLUMNS])
+                for cols in proposed:
+                    if (table,) + tuple(c.lower() for c in cols) in indexed:
+                        continue
+                    candidate = Candidate(table, cols)
+                    weights[candidate] = weights.get(candidate, 0) + entry["count"]
+        return sorted(weights, key=lambda candidate: -weights[candidate])
+
+    def replay(self, conn: sqlite3.Connection, guard: QueryGuard, sql: str) -> Dict[str, Any]:
+        """
+        Best-of-REPEATS wall time, guard cost estimate and plan of one query.
+        """
+        result = {"ms": None, "cost": guard.check(sql).cost, "plan": []}
+        conn.execute("PRAGMA query_only=ON")
+        try:
+            result["plan"] = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+            timings = []
+            for _ in range(self.config.REPEATS):
+                budget = QueryBudget(seconds=self.config.REPLAY_TIMEOUT_SECONDS, vm_steps=0)
+                conn.set_progress_handler(budget.check, budget.interval)
+                started = time.perf_counter()
+                try:
+                    conn.execute(sql).fetchall()
+                finally:
+                    conn.set_progress_handler(None, 0)
+                timings.append((time.perf_counter() - started) * 1000)
+            result["ms"] = min(timings)
+        except sqlite3.Error as e:
+            result["error"] = str(e)
+        finally:
+            conn.execute("PRAGMA query_only=OFF")
+        return result
+
+    def advise(self, workload: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Replay the workload on a copy of the database with and without the candidates.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            copy_path = os.path.join(directory, "advisor.db")
+            source = sqlite3.connect(f"{pathlib.Path(self.db_path).resolve().as_uri()}?mode=ro", uri=True)
+            target = sqlite3.connect(copy_path)
+            source.backup(target)
+            source.close()
+            try:
+                return self._advise(workload, target, copy_path)
+            finally:
+                target.close()
+
+    def _advise(self, workload: Dict[str, Dict[str, Any]], conn: sqlite3.Connection, copy_path: str) -> Dict[str, Any]:
+        candidates = self.candidates(workload, conn)
+        # Statistics first, so the baseline is planned the way the indexed runs are
+        conn.execute("ANALYZE")
+        conn.commit()
+        engine = create_engine(f"sqlite:///{copy_path}")
+        try:
+            guard = QueryGuard(engine)
+            before = {key: self.replay(conn, guard, entry["sql"]) for key, entry in workload.items()}
+            combined = self._replay_with(conn, engine, guard, workload, candidates, list(workload))
+            # A candidate another one shadowed in the combined run may still help alone
+            touched: Dict[str, set] = {}
+            for candidate in candidates:
+                touched.setdefault(candidate.table, set()).update(self._using(candidate, before, combined))
+            alone = {}
+            for candidate in candidates:
+                keys = [key for key in workload if key in touched[candidate.table]]
+                if keys:
+                    alone[candidate] = self._replay_with(conn, engine, guard, workload, [candidate], keys)
+        finally:
+            engine.dispose()
+
+        indexes = []
+        for candidate in candidates:
+            replays = alone.get(candidate, {})
+            used_by = self._using(candidate, before, replays)
+            report = {"name": candidate.name, "table": candidate.table, "columns": list(candidate.columns),
+                      "sql": candidate.create_sql(), "queries": len(used_by),
+                      "executions": sum(workload[key]["count"] for key in used_by),
+                      "estimated_speedup": None, "measured_speedup": None, "recommended": False}
+            if used_by:
+                report.update(self._speedups(workload, before, replays, used_by))
+                report["recommended"] = report[report.pop("decisive")] >= self.config.MIN_SPEEDUP
+            indexes.append(report)
+
+        used_by = [key for key in workload if any(key in keys for keys in touched.values())]
+        summary = {"queries": len(used_by), "executions": sum(workload[key]["count"] for key in used_by),
+                   "estimated_speedup": None, "measured_speedup": None}
+        if used_by:
+            summary.update(self._speedups(workload, before, combined, used_by))
+            summary.pop("decisive")
+
+        failed = [{"sql": workload[key]["sql"], "error": replayed["error"]} for key, replayed in before.items() if "error" in replayed]
+        return {"queries": len(workload), "executions": sum(entry["count"] for entry in workload.values()),
+                "failed_queries": failed, "combined": summary, "indexes": indexes}
+
+    def _replay_with(self, conn: sqlite3.Connection, engine: Any, guard: QueryGuard, workload: Dict[str, Dict[str, Any]],
+                     indexes: List[Candidate], keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Replay the `keys` queries with only `indexes` added to the copy, then drop them again.
+        """
+        for candidate in indexes:
+            conn.execute(candidate.create_sql())
+            conn.execute(f'ANALYZE "{candidate.name}"')
+        conn.commit()
+        # Pooled connections can keep serving plans prepared before the indexes existed
+        engine.dispose()
+        try:
+            return {key: self.replay(conn, guard, workload[key]["sql"]) for key in keys}
+        finally:
+            for candidate in indexes:
+                conn.execute(f'DROP INDEX IF EXISTS "{candidate.name}"')
+            conn.commit()
+            engine.dispose()
+
+    @staticmethod
+    def _using(candidate: Candidate, before: Dict[str, Dict[str, Any]], replays: Dict[str, Dict[str, Any]]) -> List[str]:
+        """
+        Queries timed on both sides whose replay plan uses `candidate`.
+        """
+        return [
+            key for key, replayed in replays.items()
+            if before[key]["ms"] is not None and replayed["ms"] is not None
+            and any(re.search(rf"\bINDEX {re.escape(candidate.name)}\b", detail) for detail in replayed["plan"])
+        ]
+
+    def _speedups(self, workload: Dict[str, Dict[str, Any]], before: Dict[str, Dict[str, Any]],
+                  after: Dict[str, Dict[str, Any]], keys: List[str]) -> Dict[str, Any]:
+        """
+        Execution-weighted estimated and measured speedups of `keys`, and which of them decides.
+        """
+        def weighted(replays: Dict[str, Dict[str, Any]], field: str) -> float:
+            return sum(workload[key]["count"] * replays[key][field] for key in keys)
+
+        ms_before = weighted(before, "ms")
+        return {
+            "estimated_speedup": round(weighted(before, "cost") / max(weighted(after, "cost"), 1e-9), 2),
+            "measured_speedup": round(ms_before / max(weighted(after, "ms"), 1e-6), 2),
+            # Timings decide unless the queries are too fast to time reliably
+            "decisive": "measured_speedup" if ms_before >= self.config.MIN_MEASURABLE_MS else "estimated_speedup",
+        }
+
+    def apply(self, report: Dict[str, Any]) -> List[str]:
+        """
+        Create the recommended indexes on the real database and run ANALYZE.
+        """
+        statements = [index["sql"] for index in report["indexes"] if index["recommended"]]
+        if not statements:
+            return []
+        conn = sqlite3.connect(self.db_path, timeout=self.config.REPLAY_TIMEOUT_SECONDS)
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute("ANALYZE")
+            conn.commit()
+        finally:
+            conn.close()
+        return statements
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Propose indexes for the logged generated-SQL workload")
+    parser.add_argument("--log", default=IndexAdvisorConfig.LOG_PATH, help="SQL generator log to read")
+    parser.add_argument("--db", default=SQLitePoolConfig.DB_FILE, help="SQLite database to replay against")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--apply", action="store_true", help="Create the recommended indexes and run ANALYZE")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"Database not found: {args.db}", file=sys.stderr)
+        return 1
+    workload = read_workload(args.log)
+    advisor = IndexAdvisor(args.db)
+    report = advisor.advise(workload)
+
+    rows = [[index["name"], index["queries"], index["executions"], index["estimated_speedup"],
+             index["measured_speedup"], "yes" if index["recommended"] else ""] for index in report["indexes"]]
+    print(f"{report['queries']} distinct queries ({report['executions']} executions), "
+          f"{len(report['failed_queries'])} failed to replay", file=sys.stderr)
+    combined = report["combined"]
+    print(f"All candidates together: {combined['queries']} queries, estimated speedup {combined['estimated_speedup']}, "
+          f"measured speedup {combined['measured_speedup']}", file=sys.stderr)
+    print(tabulate(rows, headers=["index", "queries", "executions", "est. speedup alone", "measured speedup alone", "recommended"],
+                   tablefmt="pretty"), file=sys.stderr)
+    if args.apply:
+        report["applied"] = advisor.apply(report)
+        print(f"Applied {len(report['applied'])} indexes and ran ANALYZE", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""
+Intent Classifier Module
+===============================================================================
+IntentClassifier: a local, in-process GREETING/QUESTION classifier that replaces
+the per-message LLM round trip.
+
+Classification is layered, cheapest first:
+    1. Compiled keyword/regex rules for obvious greetings and data questions.
+    2. A multinomial naive Bayes model over character n-grams, trained from a
+       seed vocabulary plus the questions logged by SQLQueryGenerator.
+    3. The LLM, consulted only when the model's confidence is below the
+       configured threshold (and only if an LLM client was supplied).
+
+Usage Example:
+    classifier = IntentClassifier(llm_client=OpenAI(...))
+    prediction = classifier.classify("hello there")
+    if prediction.label == GREETING:
+        ...
+"""
+import json
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from src.mcp.resilient_llm import guard_async_llm, guard_llm
+from src.utils.constant import IntentClassifierConfig
+
+GREETING = "GREETING"
+QUESTION = "QUESTION"
+LABELS = (GREETING, QUESTION)
+
+logger = logging.getLogger(__name__)
+
+_GREETING_RULE = re.compile(
+    r"^\s*(hi+|hello+|hey+|hiya|howdy|yo|greetings|namaste|hola|"
+    r"good\s+(morning|afternoon|evening|day)|"
+    r"thanks?(\s+you)?(\s+so\s+much)?|thank\s*u|ty|cheers|bye|goodbye|see\s+you|"
+    r"how\s+are\s+you(\s+doing)?|what'?s\s+up|sup|ok(ay)?|cool|great|nice)"
+    r"(\s+(there|bot|chatbot|team|all|everyone|friend))?[\s!.,?:)]*$",
+    re.IGNORECASE,
+)
+_QUESTION_RULE = re.compile(
+    r"\b(how\s+many|how\s+much|total|sum|average|avg|count|list|show|display|"
+    r"invoices?|customers?|projects?|employees?|payments?|tasks?|departments?|"
+    r"time\s*entr(y|ies)|hours|budget|overdue|unpaid|paid|sector|revenue|amount)\b",
+    re.IGNORECASE,
+)
+
+SEED_GREETINGS = [
+    "hi", "hello", "hey", "hey there", "hi there", "hello there", "good morning",
+    "good afternoon", "good evening", "greetings", "namaste", "howdy", "yo",
+    "thanks", "thank you", "thank you so much", "thanks a lot", "bye", "goodbye",
+    "see you", "how are you", "how are you doing", "what's up", "nice to meet you",
+    "hello bot", "hi team", "hey chatbot", "good day", "cheers", "ok thanks",
+    "hello, how are you?", "hi! how is it going", "morning", "hiya", "sup",
+]
+SEED_QUESTIONS = [
+    "how many employees are there", "how many customers are in each sector",
+    "list all overdue invoices", "total unpaid invoices", "projects overdue",
+    "show me the payments made by bank transfer", "what is the total invoice amount",
+    "which department has the highest budget", "average payment amount per method",
+    "list all projects where the start date is after 2020", "can you provide their names",
+    "how many hours were logged last month", "who is working on project alpha",
+    "give me details of customer", "which tasks are blocked", "count tasks by priority",
+    "what is the revenue per customer", "show invoices due this week",
+]
+
+
+class IntentPrediction(NamedTuple):
+    """Result of a classification: label, confidence in [0, 1] and the deciding layer."""
+    label: str
+    confidence: float
+    source: str
+
+
+def load_logged_questions(log_path: str) -> List[str]:
+    """
+    Extract the natural-language questions recorded by SQLQueryGenerator's log.
+    Returns an empty list if the log does not exist.
+    """
+    marker = "Natural Language Query: "
+    questions = []
+    try:
+        with open(log_path, encoding="utf-8", errors="ignore") as handle:
+            for line in handle:
+                idx = line.find(marker)
+                if idx != -1:
+                    text = line[idx + len(marker):].strip()
+                    if text:
+                        questions.append(text)
+    except OSError:
+        return []
+    return questions
+
+
+class NaiveBayesIntentModel:
+    """
+    Multinomial naive Bayes over character n-grams.
+
+    Log-probabilities are precomputed at fit time so that prediction is a
+    handful of dictionary lookups per n-gram.
+    """
+
+    def __init__(self, ngram_range: Tuple[int, int] = None, alpha: float = None):
+        self.ngram_range = tuple(ngram_range or (IntentClassifierConfig.NGRAM_MIN, IntentClassifierConfig.NGRAM_MAX))
+        self.alpha = IntentClassifierConfig.SMOOTHING_ALPHA if alpha is None else alpha
+        self.class_log_prior: Dict[str, float] = {}
+        self.feature_log_prob: Dict[str, Dict[str, float]] = {}
+        self.unseen_log_prob: Dict[str, float] = {}
+
+    def _ngrams(self, text: str) -> Counter:
+        text = f" {' '.join(text.lower().split())} "
+        low, high = self.ngram_range
+        return Counter(
+            text[i:i + n]
+            for n in range(low, high + 1)
+            for i in range(len(text) - n + 1)
+        )
+
+    def fit(self, texts: Iterable[str], labels: Iterable[str]) -> "NaiveBayesIntentModel":
+        counts: Dict[str, Counter] = defaultdict(Counter)
+        docs = Counter()
+        for text, label in zip(texts, labels):
+            counts[label].update(self._ngrams(text))
+            docs[label] += 1
+        if not docs:
+            raise ValueError("Cannot fit an intent model without training examples.")
+
+        vocabulary = set()
+        for label_counts in counts.values():
+            vocabulary.update(label_counts)
+        total_docs = sum(docs.values())
+        self.class_log_prior = {label: math.log(n / total_docs) for label, n in docs.items()}
+        self.feature_log_prob = {}
+        self.unseen_log_prob = {}
+        for label in docs:
+            denominator = sum(counts[label].values()) + self.alpha * (len(vocabulary) + 1)
+            self.feature_log_prob[label] = {
+                gram: math.log((count + self.alpha) / denominator)
+                for gram, count in counts[label].items()
+            }
+            self.unseen_log_prob[label] = math.log(self.alpha / denominator)
+        return self
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        if not self.class_log_prior:
+            raise RuntimeError("NaiveBayesIntentModel has not been fitted.")
+        grams = self._ngrams(text)
+        scores = {}
+        for label, prior in self.class_log_prior.items():
+            table = self.feature_log_prob[label]
+            unseen = self.unseen_log_prob[label]
+            scores[label] = prior + sum(table.get(gram, unseen) * n for gram, n in grams.items())
+        top = max(scores.values())
+        exp_scores = {label: math.exp(score - top) for label, score in scores.items()}
+        norm = sum(exp_scores.values())
+        return {label: value / norm for label, value in exp_scores.items()}
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        proba = self.predict_proba(text)
+        label = max(proba, key=proba.get)
+        return label, proba[label]
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump({
+                "ngram_range": list(self.ngram_range),
+                "alpha": self.alpha,
+                "class_log_prior": self.class_log_prior,
+                "feature_log_prob": self.feature_log_prob,
+                "unseen_log_prob": self.unseen_log_prob,
+            }, handle)
+
+    @classmethod
+    def load(cls, path: str) -> "NaiveBayesIntentModel":
+        with open(path, encoding="utf-8") as handle:
+            state = json.load(handle)
+        model = cls(ngram_range=state["ngram_range"], alpha=state["alpha"])
+        model.class_log_prior = state["class_log_prior"]
+        model.feature_log_prob = state["feature_log_prob"]
+        model.unseen_log_prob = state["unseen_log_prob"]
+        return model
+
+    @classmethod
+    def from_seed(cls, log_path: Optional[str] = None, **kwargs) -> "NaiveBayesIntentModel":
+        """
+        Train on the built-in seed examples plus every question found in `log_path`.
+        """
+        questions = SEED_QUESTIONS + (load_logged_questions(log_path) if log_path else [])
+        texts = SEED_GREETINGS + questions
+        labels = [GREETING] * len(SEED_GREETINGS) + [QUESTION] * len(questions)
+        return cls(**kwargs).fit(texts, labels)
+
+
+class IntentClassifier:
+    """
+    Local GREETING/QUESTION classifier with an optional LLM tie-breaker.
+
+    Args:
+        llm_client: Optional OpenAI-compatible client used when confidence is low.
+                    If None, the local prediction is always returned.
+        async_llm_client: Optional async client used by aclassify for the same fallback.
+        config: Configuration object (default: IntentClassifierConfig).
+        model: Optional pre-trained NaiveBayesIntentModel. If omitted, the model
+               is loaded from config.MODEL_PATH or trained from the seed data and
+               config.TRAINING_LOG_PATH.
+    """
+
+    def __init__(
+        self,
+        llm_client: Optional[Any] = None,
+        config: Optional[Any] = None,
+        model: Optional[NaiveBayesIntentModel] = None,
+        async_llm_client: Optional[Any] = None,
+    ):
+        self.config = config or IntentClassifierConfig
+        self.llm = guard_llm(llm_client)
+        self.async_llm = guard_async_llm(async_llm_client)
+        self.model = model or self._default_model()
+
+    def _default_model(self) -> NaiveBayesIntentModel:
+        model_path = getattr(self.config, "MODEL_PATH", None)
+        if model_path:
+            try:
+                return NaiveBayesIntentModel.load(model_path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Could not load intent model from {model_path}: {e}")
+        return NaiveBayesIntentModel.from_seed(
+            log_path=getattr(self.config, "TRAINING_LOG_PATH", None),
+            ngram_range=(self.config.NGRAM_MIN, self.config.NGRAM_MAX),
+            alpha=self.config.SMOOTHING_ALPHA,
+        )
+
+    def classify(self, user_input: str, allow_llm: bool = True) -> IntentPrediction:
+        """
+        Classify `user_input` as GREETING or QUESTION.
+        Pass allow_llm=False to get the local prediction even when confidence is low.
+        """
+        prediction = self._classify_locally(user_input)
+        if not self._needs_llm(prediction, self.llm, allow_llm):
+            return prediction
+        try:
+            response = self.llm.chat.completions.create(**self._llm_request(user_input))
+        except Exception as e:
+            logger.warning(f"LLM intent fallback failed: {e}")
+            return prediction
+        return self._merge_llm_answer(prediction, response)
+
+    async def aclassify(self, user_input: str, allow_llm: bool = True) -> IntentPrediction:
+        """
+        Async variant of classify; the LLM fallback uses `async_llm_client`.
+        """
+        prediction = self._classify_locally(user_input)
+        if not self._needs_llm(prediction, self.async_llm, allow_llm):
+            return prediction
+        try:
+            response = await self.async_llm.chat.completions.create(**self._llm_request(user_input))
+        except Exception as e:
+            logger.warning(f"LLM intent fallback failed: {e}")
+            return prediction
+        return self._merge_llm_answer(prediction, response)
+
+    def _classify_locally(self, user_input: str) -> IntentPrediction:
+        text = (user_input or "").strip()
+        if not text:
+            return IntentPrediction(GREETING, 1.0, "rule")
+        if _GREETING_RULE.match(text):
+            return IntentPrediction(GREETING, 1.0, "rule")
+        if _QUESTION_RULE.search(text):
+            return IntentPrediction(QUESTION, 1.0, "rule")
+        label, confidence = self.model.predict(text)
+        return IntentPrediction(label, confidence, "model")
+
+    def _needs_llm(self, prediction: IntentPrediction, client: Optional[Any], allow_llm: bool) -> bool:
+        return (
+            allow_llm
+            and client is not None
+            and prediction.source == "model"
+            and prediction.confidence < self.config.CONFIDENCE_THRESHOLD
+        )
+
+    def _llm_request(self, user_input: str) -> Dict[str, Any]:
+        prompt = f"""
+Determine if this input is a greeting or a question:
+"{user_input.strip()}"
+Respond with GREETING or QUESTION only.
+"""
+        return dict(
+            model=self.config.LLM_FALLBACK_MODEL,
+            messages=[
+                {"role": "system", "content": "You are a user input classifier."},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=10,
+            temperature=0.0,
+            top_p=1.0
+        )
+
+    @staticmethod
+    def _merge_llm_answer(prediction: IntentPrediction, response: Any) -> IntentPrediction:
+        try:
+            classification = response.choices[0].message.content.strip().upper()
+        except (AttributeError, IndexError, TypeError):
+            return prediction
+        if classification not in LABELS:
+            return prediction
+        return IntentPrediction(classification, 1.0, "llm")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the local intent model from logged questions.")
+    parser.add_argument("--log", default=IntentClassifierConfig.TRAINING_LOG_PATH, help="SQLQueryGenerator log file")
+    parser.add_argument("--out", required=True, help="Where to write the trained model (JSON)")
+    args = parser.parse_args()
+
+    trained = NaiveBayesIntentModel.from_seed(log_path=args.log)
+    trained.save(args.out)
+    print(f"Intent model written to {args.out}")
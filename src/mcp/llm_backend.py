@@ -0,0 +1,63 @@
+"""
+LLM Backend Module
+===============================================================================
+Pluggable construction of the OpenAI-compatible clients used across the
+project. Code that needs a default client calls `create_llm_client()` instead
+of building `OpenAI(...)` directly, so the backend is chosen in one place:
+
+- "openai": the real OpenAI client. Setting LLM_BASE_URL points it at any
+  OpenAI-compatible server, e.g. the local stub server (src.mcp.llm_stub_server).
+- "stub": the in-process StubLLM; no network access, no API quota.
+
+Other backends can be added with `register_backend`.
+
+Usage Example:
+    # LLM_BACKEND=stub LLM_STUB_LATENCY="percentiles:0.6,2.0" python inference.py
+    client = create_llm_client()
+    async_client = create_llm_client(is_async=True)
+"""
+from typing import Any, Callable, Dict, Optional
+
+from openai import AsyncOpenAI, OpenAI
+
+from src.utils.constant import LLMBackendConfig, OpenAIConfig
+
+_BACKENDS: Dict[str, Callable[..., Any]] = {}
+
+
+def register_backend(name: str, factory: Callable[..., Any]) -> None:
+    """
+    Register `factory(is_async, api_key, config)` as the backend called `name`.
+    """
+    _BACKENDS[name.lower()] = factory
+
+
+def _openai_backend(is_async: bool, api_key: Optional[str], config: Any) -> Any:
+    client_class = AsyncOpenAI if is_async else OpenAI
+    return client_class(api_key=api_key or OpenAIConfig.OpenAI_API_KEY, base_url=config.BASE_URL or None)
+
+
+def _stub_backend(is_async: bool, api_key: Optional[str], config: Any) -> Any:
+    from src.mcp.llm_stub import StubLLM
+
+    return StubLLM(is_async=is_async, config=config)
+
+
+register_backend("openai", _openai_backend)
+register_backend("stub", _stub_backend)
+
+
+def create_llm_client(
+    is_async: bool = False,
+    api_key: Optional[str] = None,
+    backend: Optional[str] = None,
+    config: Optional[Any] = None,
+) -> Any:
+    """
+    Build a client for the configured backend (default: config.BACKEND).
+    """
+    config = config or LLMBackendConfig
+    name = (backend or config.BACKEND or "openai").lower()
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}'. Available: {', '.join(sorted(_BACKENDS))}")
+    return _BACKENDS[name](is_async, api_key, config)
@@ -0,0 +1,232 @@
+"""
+LLM Stub Module
+===============================================================================
+An offline stand-in for the OpenAI chat completions API, for tests and load
+tests on machines without network access or API quota.
+
+- LatencyModel: samples response latency from a configurable distribution.
+- StubResponder: picks a canned response by matching regex patterns against
+  the prompt; built-in defaults answer every prompt this project sends
+  (intent, SQL, fused plan, output type, summary).
+- StubLLM: an in-process client with the `chat.completions.create` shape
+  (sync or async, streaming supported) that returns real openai response types.
+
+The same responder backs the HTTP server in src.mcp.llm_stub_server.
+
+Latency specs:
+    "fixed:0.2"              always 0.2 s
+    "uniform:0.1,0.5"        uniform between 0.1 s and 0.5 s
+    "normal:0.8,0.2"         mean, standard deviation (clipped at 0)
+    "exponential:0.5"        mean
+    "lognormal:-0.5,0.4"     mu, sigma of the underlying normal
+    "percentiles:0.6,2.0"    lognormal fitted to a p50 and a p95
+
+Usage Example:
+    client = StubLLM(latency="percentiles:0.6,2.0", responses_path="stub_responses.json")
+    generator = SQLQueryGenerator(llm_client=client)
+"""
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from src.mcp.sql_history import estimate_tokens
+from src.utils.constant import LLMBackendConfig
+
+# Built-in answers for the prompts this project sends, checked after user rules
+DEFAULT_RULES = [
+    (r"Respond with GREETING or QUESTION only", "QUESTION"),
+    (r"Suggest output type", "table"),
+    (r"Provide a simple summary", "The query returned the requested records."),
+    (r"SQL Query:\s*$", "```sql\nSELECT customer_id, company_name, sector FROM Customer LIMIT 10;\n```"),
+]
+DEFAULT_PLAN = {
+    "intent": "QUESTION",
+    "sql": "SELECT customer_id, company_name, sector FROM Customer LIMIT 10;",
+    "output_type": "table",
+}
+_Z95 = 1.6448536269514722
+
+
+class LatencyModel:
+    """
+    Latency sampler built from a spec string such as "lognormal:-0.5,0.4".
+    """
+
+    def __init__(self, spec: Optional[str] = None, seed: Optional[int] = None):
+        self.spec = spec or "fixed:0"
+        self.random = random.Random(seed)
+        kind, _, params = self.spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(value) for value in params.split(",") if value.strip()]
+        if self.kind == "percentiles":
+            p50, p95 = self.params
+            mu = math.log(p50)
+            self.kind, self.params = "lognormal", [mu, (math.log(p95) - mu) / _Z95]
+        if self.kind not in ("fixed", "uniform", "normal", "exponential", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {self.spec}")
+
+    def sample(self) -> float:
+        params = self.params
+        if self.kind == "fixed":
+            return params[0] if params else 0.0
+        if self.kind == "uniform":
+            return self.random.uniform(params[0], params[1])
+        if self.kind == "normal":
+            return max(0.0, self.random.gauss(params[0], params[1]))
+        if self.kind == "exponential":
+            return self.random.expovariate(1.0 / params[0]) if params[0] > 0 else 0.0
+        return self.random.lognormvariate(params[0], params[1])
+
+
+class StubResponder:
+    """
+    Maps a chat completion request to (content, latency_seconds).
+
+    Args:
+        rules: Extra {"pattern", "response", optional "latency"} rules, checked first.
+        responses_path: JSON file holding {"rules": [...], "latency": spec}.
+        latency: Default latency spec (default: config.STUB_LATENCY).
+        seed: Seed for reproducible latency samples (default: config.STUB_SEED).
+        config: Configuration object (default: LLMBackendConfig).
+    """
+
+    def __init__(
+        self,
+        rules: Optional[List[Dict[str, Any]]] = None,
+        responses_path: Optional[str] = None,
+        latency: Optional[str] = None,
+        seed: Optional[int] = None,
+        config: Optional[Any] = None,
+    ):
+        self.config = config or LLMBackendConfig
+        responses_path = responses_path if responses_path is not None else self.config.STUB_RESPONSES_PATH
+        loaded = {}
+        if responses_path:
+            with open(responses_path, encoding="utf-8") as handle:
+                loaded = json.load(handle)
+        seed = seed if seed is not None else self.config.STUB_SEED
+        self.latency = LatencyModel(latency or loaded.get("latency") or self.config.STUB_LATENCY, seed)
+        self.rules = []
+        for rule in list(rules or []) + loaded.get("rules", []):
+            rule_latency = LatencyModel(rule["latency"], seed) if rule.get("latency") else None
+            self.rules.append((re.compile(rule["pattern"], re.IGNORECASE | re.DOTALL), rule["response"], rule_latency))
+        self.defaults = [(re.compile(pattern, re.DOTALL), response) for pattern, response in DEFAULT_RULES]
+
+    @staticmethod
+    def prompt_text(messages: List[Dict[str, Any]]) -> str:
+        return "\n".join(str(message.get("content") or "") for message in messages or [])
+
+    def respond(self, request: Dict[str, Any]) -> tuple:
+        text = self.prompt_text(request.get("messages"))
+        for pattern, response, latency in self.rules:
+            if pattern.search(text):
+                content = response if isinstance(response, str) else json.dumps(response)
+                return content, (latency or self.latency).sample()
+        if request.get("response_format"):
+            return json.dumps(DEFAULT_PLAN), self.latency.sample()
+        last = str((request.get("messages") or [{}])[-1].get("content") or "")
+        for pattern, response in self.defaults:
+            if pattern.search(last):
+                return response, self.latency.sample()
+        return "OK", self.latency.sample()
+
+    def completion(self, request: Dict[str, Any], content: str) -> Dict[str, Any]:
+        prompt_tokens = estimate_tokens(self.prompt_text(request.get("messages")))
+        completion_tokens = estimate_tokens(content)
+        return {
+            "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model") or "stub",
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def chunks(self, request: Dict[str, Any], content: str) -> Iterator[Dict[str, Any]]:
+        completion_id = f"chatcmpl-stub-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        pieces = re.findall(r"\S+\s*", content) or [content]
+        for index, piece in enumerate(pieces):
+            delta = {"content": piece}
+            if index == 0:
+                delta["role"] = "assistant"
+            yield {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                "model": request.get("model") or "stub",
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            }
+        yield {
+            "id": completion_id, "object": "chat.completion.chunk", "created": created,
+            "model": request.get("model") or "stub",
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+
+
+class StubLLM:
+    """
+    In-process OpenAI-compatible client backed by a StubResponder.
+
+    Args:
+        is_async: Make `chat.completions.create` a coroutine (like AsyncOpenAI).
+        responder: Shared StubResponder; the remaining keyword arguments build one when omitted.
+    """
+
+    def __init__(self, is_async: bool = False, responder: Optional[StubResponder] = None, **responder_kwargs: Any):
+        self.is_async = is_async
+        self.responder = responder or StubResponder(**responder_kwargs)
+        self.calls = 0
+        create = self._acreate if is_async else self._create
+        self.chat = type("Chat", (), {"completions": type("Completions", (), {"create": staticmethod(create)})()})()
+
+    def _create(self, **request: Any) -> Any:
+        self.calls += 1
+        content, latency = self.responder.respond(request)
+        timeout = request.get("timeout")
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Stub LLM request timed out")
+        time.sleep(latency)
+        if request.get("stream"):
+            return (ChatCompletionChunk.model_validate(chunk) for chunk in self.responder.chunks(request, content))
+        return ChatCompletion.model_validate(self.responder.completion(request, content))
+
+    async def _acreate(self, **request: Any) -> Any:
+        self.calls += 1
+        content, latency = self.responder.respond(request)
+        timeout = request.get("timeout")
+        if timeout is not None and latency > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError("Stub LLM request timed out")
+        await asyncio.sleep(latency)
+        if request.get("stream"):
+            return _AsyncChunkStream(self.responder.chunks(request, content))
+        return ChatCompletion.model_validate(self.responder.completion(request, content))
+
+
+class _AsyncChunkStream:
+    def __init__(self, chunks: Iterator[Dict[str, Any]]):
+        self._chunks = chunks
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ChatCompletionChunk:
+        try:
+            return ChatCompletionChunk.model_validate(next(self._chunks))
+        except StopIteration:
+            raise StopAsyncIteration
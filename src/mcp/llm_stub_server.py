@@ -0,0 +1,74 @@
+"""
+LLM Stub Server
+===============================================================================
+A local OpenAI-compatible HTTP server (POST /v1/chat/completions, with SSE
+streaming, and GET /v1/models) backed by StubResponder, for load testing the
+FastAPI app and LLMChatBot without network access or API quota.
+
+Run:
+    python -m src.mcp.llm_stub_server --port 8001 --latency "percentiles:0.6,2.0" \
+        --responses stub_responses.json
+
+Point the app at it:
+    LLM_BACKEND=openai LLM_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=stub uvicorn main:app
+
+Canned responses file:
+    {"latency": "fixed:0.3",
+     "rules": [{"pattern": "overdue", "response": "```sql\\nSELECT COUNT(*) FROM Invoice WHERE status = 'OVERDUE';\\n```",
+                "latency": "uniform:0.5,1.5"}]}
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Optional
+
+from fastapi import Body, FastAPI
+from fastapi.responses import StreamingResponse
+
+from src.mcp.llm_stub import StubResponder
+
+
+def create_app(responder: Optional[StubResponder] = None) -> FastAPI:
+    responder = responder or StubResponder()
+    app = FastAPI(title="LLM stub server")
+    app.state.responder = responder
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model", "created": int(time.time()), "owned_by": "stub"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: dict = Body(...)):
+        content, latency = responder.respond(request)
+        await asyncio.sleep(latency)
+        if not request.get("stream"):
+            return responder.completion(request, content)
+
+        async def events():
+            for chunk in responder.chunks(request, content):
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server for offline load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default=None, help='Latency spec, e.g. "percentiles:0.6,2.0"')
+    parser.add_argument("--responses", default=None, help="JSON file with canned response rules")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    responder = StubResponder(responses_path=args.responses, latency=args.latency, seed=args.seed)
+    uvicorn.run(create_app(responder), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
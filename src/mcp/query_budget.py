@@ -0,0 +1,218 @@
+"""
+Query Budget Module
+===============================================================================
+Per-query limits enforced inside SQLite through sqlite3's progress handler,
+which runs every PROGRESS_INTERVAL virtual-machine instructions and aborts the
+statement ("interrupted") when it returns non-zero. A query is stopped when:
+
+- it has run longer than TIMEOUT_SECONDS, or past the request deadline set by
+  `request_deadline` (src.mcp.resilient_llm), whichever comes first;
+- it has executed more than MAX_VM_STEPS instructions;
+- its CancelToken is cancelled, e.g. because the HTTP client disconnected or
+  the awaiting task was cancelled.
+
+Cancel tokens live in a context variable, so they follow the request into the
+query thread pool. `cancel_on_disconnect` polls the client connection and
+cancels the request's token when it goes away. Work coalesced across requests
+runs under a SharedCancelToken, which is cancelled only once every caller that
+waits for it has gone away.
+
+Usage Example:
+    budget = QueryBudget()
+    with engine.connect() as conn, budget.attach(conn):
+        df = pd.read_sql(text(sql), conn)
+    # if it raised, budget.reason is "time", "steps" or "cancelled" when the budget stopped it
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+from src.mcp.resilient_llm import remaining_time
+from src.utils.constant import QueryBudgetConfig
+
+TIME, STEPS, CANCELLED = "time", "steps", "cancelled"
+
+_CANCEL: contextvars.ContextVar[Optional["CancelToken"]] = contextvars.ContextVar("query_cancel_token", default=None)
+
+
+class CancelToken:
+    """
+    Thread-safe cancellation flag; a child is also cancelled when its parent is.
+    """
+
+    def __init__(self, parent: Optional["CancelToken"] = None):
+        self.parent = parent
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+
+class SharedCancelToken(CancelToken):
+    """
+    Root token for work shared by several callers (see src.mcp.single_flight):
+    cancelled explicitly, or once every caller that joined has been cancelled.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._waiters = []
+
+    def join(self, parent: Optional[CancelToken] = None) -> CancelToken:
+        """
+        Register a caller; cancel the returned token when that caller goes away.
+        """
+        waiter = CancelToken(parent)
+        with self._lock:
+            self._waiters.append(waiter)
+        return waiter
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        with self._lock:
+            waiters = list(self._waiters)
+        return bool(waiters) and all(waiter.cancelled for waiter in waiters)
+
+
+def current_cancel_token() -> Optional[CancelToken]:
+    return _CANCEL.get()
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken] = None) -> Iterator[CancelToken]:
+    """
+    Make `token` (default: a child of the current token) the current one inside the block.
+    """
+    token = token or CancelToken(_CANCEL.get())
+    reset = _CANCEL.set(token)
+    try:
+        yield token
+    finally:
+        try:
+            _CANCEL.reset(reset)
+        except ValueError:
+            # Async generators may finish in a different context than they started in
+            _CANCEL.set(token.parent)
+
+
+@asynccontextmanager
+async def cancel_on_disconnect(is_disconnected: Callable[[], Awaitable[bool]], poll_seconds: Optional[float] = None):
+    """
+    Cancel the queries started inside the block once `is_disconnected()` is true,
+    or when the block itself is cancelled.
+    """
+    poll_seconds = poll_seconds or QueryBudgetConfig.DISCONNECT_POLL_SECONDS
+    with cancel_scope() as token:
+        async def watch():
+            while not token.cancelled:
+                if await is_disconnected():
+                    token.cancel()
+                    return
+                await asyncio.sleep(poll_seconds)
+
+        watcher = asyncio.ensure_future(watch())
+        try:
+            yield token
+        except BaseException:
+            token.cancel()
+            raise
+        finally:
+            watcher.cancel()
+
+
+def too_expensive(reason: str, **fields: Any) -> Dict[str, Any]:
+    """
+    Structured reply for a query that was not run, or stopped, for its cost.
+    """
+    return {
+        "message": f"This query is too expensive to run ({reason}). Please narrow it down with filters.",
+        "code": "query_too_expensive",
+        "reason": reason,
+        **fields,
+    }
+
+
+class QueryBudget:
+    """
+    Wall-clock, VM-step and cancellation limits for one query.
+
+    Args:
+        seconds: Wall-clock limit; 0 disables it (default: config.TIMEOUT_SECONDS).
+            The request deadline, when set, can only shorten it.
+        vm_steps: Instruction limit; 0 disables it (default: config.MAX_VM_STEPS).
+        token: Cancel token to honour (default: the current one).
+        config: Configuration object (default: QueryBudgetConfig).
+    """
+
+    def __init__(
+        self,
+        seconds: Optional[float] = None,
+        vm_steps: Optional[int] = None,
+        token: Optional[CancelToken] = None,
+        config: Optional[Any] = None,
+    ):
+        self.config = config or QueryBudgetConfig
+        self.seconds = self.config.TIMEOUT_SECONDS if seconds is None else seconds
+        self.vm_steps = self.config.MAX_VM_STEPS if vm_steps is None else vm_steps
+        self.token = token or current_cancel_token()
+        self.interval = self.config.PROGRESS_INTERVAL
+        self.started = time.monotonic()
+        self.deadline = self.started + self.seconds if self.seconds else None
+        self.deadline_is_request = False
+        left = remaining_time()
+        if left is not None and (self.deadline is None or self.started + left < self.deadline):
+            self.deadline = self.started + max(left, 0.0)
+            self.deadline_is_request = True
+        self.steps = 0
+        self.reason: Optional[str] = None
+
+    def check(self) -> int:
+        """
+        Progress handler: non-zero interrupts the running statement.
+        """
+        self.steps += self.interval
+        if self.token is not None and self.token.cancelled:
+            self.reason = CANCELLED
+        elif self.vm_steps and self.steps > self.vm_steps:
+            self.reason = STEPS
+        elif self.deadline is not None and time.monotonic() > self.deadline:
+            self.reason = TIME
+        return 1 if self.reason else 0
+
+    @contextmanager
+    def attach(self, connection: Any) -> Iterator["QueryBudget"]:
+        """
+        Install the progress handler on a SQLAlchemy connection for the duration of the block.
+        """
+        driver = connection.connection.driver_connection
+        if not hasattr(driver, "set_progress_handler"):
+            yield self
+            return
+        driver.set_progress_handler(self.check, self.interval)
+        try:
+            yield self
+        finally:
+            driver.set_progress_handler(None, 0)
+
+    def response(self) -> Dict[str, Any]:
+        """
+        Reply for a query this budget stopped.
+        """
+        elapsed = round(time.monotonic() - self.started, 2)
+        if self.reason == CANCELLED:
+            return {"message": "The query was cancelled.", "code": "query_cancelled", "reason": CANCELLED}
+        if self.reason == STEPS:
+            return too_expensive(f"it needed more than {self.vm_steps:,} steps", elapsed_seconds=elapsed)
+        if self.deadline_is_request:
+            return too_expensive("it did not finish before the request deadline", elapsed_seconds=elapsed)
+        return too_expensive(f"it ran longer than {self.seconds:g} s", elapsed_seconds=elapsed)
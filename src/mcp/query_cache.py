@@ -0,0 +1,208 @@
+"""
+Query Cache Module
+===============================================================================
+SQLQueryCache: a two-tier cache mapping natural-language questions to the SQL
+generated for them, so repeated questions skip the LLM entirely.
+
+- Keys are built from a normalized question (case, whitespace, punctuation and
+  number formatting folded), a hash of the table schemas and the model name,
+  plus a hash of the conversation context the prompt used, if any, so
+  follow-ups are only reused within the same context.
+- The in-memory tier is an LRU with per-entry TTL.
+- The persistent tier is a SQLite table that survives restarts; memory misses
+  fall through to it and promote hits back into memory.
+- Hit/miss counters are exposed through `stats()`.
+
+Usage Example:
+    cache = SQLQueryCache()
+    sql = cache.get(question, table_schemas)
+    if sql is None:
+        sql = generate(...)
+        cache.set(question, table_schemas, sql)
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from src.utils.constant import SQLCacheConfig
+
+_NUMBER = re.compile(r"(?<![\w.])\d{1,3}(?:,\d{3})+(?:\.\d+)?(?![\w])|(?<![\w.])\d+\.\d+(?![\w])")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _fold_number(match: re.Match) -> str:
+    literal = match.group(0).replace(",", "")
+    if "." in literal:
+        literal = literal.rstrip("0").rstrip(".")
+    return literal
+
+
+def normalize_question(question: str) -> str:
+    """
+    Fold a question into its cache-key form.
+
+    Number literals are rewritten to a canonical spelling ("1,000.00" -> "1000")
+    rather than erased, so questions that differ only in a value never share SQL.
+    """
+    text = unicodedata.normalize("NFKC", question or "").lower()
+    text = _NUMBER.sub(_fold_number, text)
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def schema_fingerprint(table_schemas: Optional[Dict[str, str]]) -> str:
+    """
+    Stable short hash of the table schemas used for a generation.
+    """
+    payload = json.dumps(table_schemas or {}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class SQLQueryCache:
+    """
+    LRU+TTL in-memory cache backed by an optional SQLite table.
+
+    Args:
+        max_entries: Maximum entries kept in memory (default: config.MAX_ENTRIES).
+        ttl_seconds: Entry lifetime in both tiers (default: config.TTL_SECONDS).
+        db_path: SQLite file for the persistent tier; falsy disables it (default: config.DB_PATH).
+        namespace: Extra key component, e.g. the model name, so different models do not share entries.
+        config: Configuration object (default: SQLCacheConfig).
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        db_path: Optional[str] = None,
+        namespace: str = "",
+        config: Optional[Any] = None,
+    ):
+        self.config = config or SQLCacheConfig
+        self.max_entries = max_entries or self.config.MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else self.config.TTL_SECONDS
+        self.namespace = namespace
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._conn = None
+        db_path = self.config.DB_PATH if db_path is None else db_path
+        if db_path:
+            self._conn = self._open_disk_tier(db_path)
+
+    @staticmethod
+    def _open_disk_tier(db_path: str) -> sqlite3.Connection:
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sql_cache ("
+            "key TEXT PRIMARY KEY, question TEXT NOT NULL, sql TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sql_cache_last_access ON sql_cache(last_access)")
+        return conn
+
+    def make_key(self, question: str, table_schemas: Optional[Dict[str, str]], context: str = "") -> str:
+        raw = f"{self.namespace}|{schema_fingerprint(table_schemas)}|{normalize_question(question)}"
+        if context:
+            raw += "|" + hashlib.sha256(context.encode("utf-8")).hexdigest()
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question: str, table_schemas: Optional[Dict[str, str]] = None, context: str = "") -> Optional[str]:
+        """
+        Return the cached SQL for `question` asked in `context` (rendered history), or None on a miss.
+        """
+        key = self.make_key(question, table_schemas, context)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                sql, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return sql
+                del self._memory[key]
+
+            sql = self._disk_get(key, now)
+            if sql is not None:
+                self._memory_put(key, sql, now)
+                self.hits += 1
+                self.disk_hits += 1
+                return sql
+            self.misses += 1
+            return None
+
+    def set(self, question: str, table_schemas: Optional[Dict[str, str]], sql: Optional[str], context: str = "") -> None:
+        """
+        Store `sql` for `question` asked in `context`. Empty results (NO_SQL) are not cached.
+        """
+        if not sql:
+            return
+        key = self.make_key(question, table_schemas, context)
+        now = time.time()
+        with self._lock:
+            self._memory_put(key, sql, now)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sql_cache(key, question, sql, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, normalize_question(question), sql, now, now),
+                )
+                self._disk_evict(now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM sql_cache")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "memory_entries": len(self._memory),
+            }
+
+    def _memory_put(self, key: str, sql: str, now: float) -> None:
+        self._memory[key] = (sql, now + self.ttl_seconds)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        if self._conn is None:
+            return None
+        row = self._conn.execute(
+            "SELECT sql, created_at FROM sql_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        sql, created_at = row
+        if created_at + self.ttl_seconds <= now:
+            self._conn.execute("DELETE FROM sql_cache WHERE key = ?", (key,))
+            return None
+        self._conn.execute("UPDATE sql_cache SET last_access = ? WHERE key = ?", (now, key))
+        return sql
+
+    def _disk_evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM sql_cache WHERE created_at <= ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM sql_cache WHERE key IN ("
+            "SELECT key FROM sql_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.config.DISK_MAX_ENTRIES,),
+        )
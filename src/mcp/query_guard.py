@@ -0,0 +1,305 @@
+"""
+Query Guard Module
+===============================================================================
+QueryGuard: a pre-execution check for LLM-generated SQL on SQLite.
+
+The guard runs `EXPLAIN QUERY PLAN`, walks the plan as SQLite's nested loops
+and estimates the rows examined: a full scan costs the table's row count per
+outer row, an index search costs about log2(rows) and multiplies the outer
+rows by a small fan-out, and correlated subqueries are paid once per outer
+row. A cross join such as `TimeEntry, Task` therefore costs rows(TimeEntry)
+x rows(Task).
+
+The estimate is compared with the thresholds of the cost tier selected by the
+largest table involved (QueryGuardConfig.TIERS), giving one of:
+- "allow": run as is.
+- "limit": run with a LIMIT added (only when the query can stop early,
+  i.e. no aggregate, GROUP BY, ORDER BY or DISTINCT and no LIMIT yet).
+- "background": run on the background job pool (`background_jobs`); the
+  caller gets a job id to poll. A job belongs to the `job_owner` current when
+  it was submitted (plus anyone it is shared with), and only they can read it.
+- "reject": do not run.
+
+Usage Example:
+    guard = QueryGuard(engine)
+    decision = guard.check("SELECT * FROM TimeEntry, Task")
+    # GuardDecision(action='reject', sql=..., cost=..., reason=...)
+"""
+import contextvars
+import math
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import text
+
+from src.utils.constant import QueryGuardConfig
+
+ALLOW, LIMIT, BACKGROUND, REJECT = "allow", "limit", "background", "reject"
+
+_ACCESS = re.compile(r"^(SCAN|SEARCH)\s+(?:TABLE\s+)?(\S+)(?:\s+AS\s+(\S+))?(.*)$")
+_FROM_CLAUSE = re.compile(r"\b(?:FROM|JOIN)\s+[\"`\[]?(\w+)[\"`\]]?(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|RIGHT\b|INNER\b|CROSS\b|OUTER\b|FULL\b|NATURAL\b|GROUP\b|ORDER\b|LIMIT\b|USING\b|HAVING\b|UNION\b)(\w+))?", re.IGNORECASE)
+_NO_EARLY_STOP = re.compile(r"\b(?:COUNT|SUM|AVG|MIN|MAX|TOTAL|GROUP_CONCAT)\s*\(|\bGROUP\s+BY\b|\bORDER\s+BY\b|\bDISTINCT\b|\bUNION\b|\bINTERSECT\b|\bEXCEPT\b", re.IGNORECASE)
+# "LIMIT n", "LIMIT n OFFSET m" or "LIMIT m, n" at the end of the statement
+_HAS_LIMIT = re.compile(r"\bLIMIT\s+\d+(?:\s+OFFSET\s+\d+|\s*,\s*\d+)?\s*;?\s*$", re.IGNORECASE)
+_TAIL_TOKEN = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?(?:\*/|$)|;|\s+|[^'\"`\[\-/;\s]+|.",
+    re.DOTALL,
+)
+
+
+def strip_sql_tail(sql: str) -> str:
+    """
+    `sql` without trailing whitespace, semicolons and comments, so it can be wrapped
+    in `SELECT * FROM (...)` without a `--` comment swallowing the closing parenthesis.
+    """
+    end = 0
+    for match in _TAIL_TOKEN.finditer(sql):
+        token = match.group(0)
+        if token == ";" or token.isspace() or token.startswith(("--", "/*")):
+            continue
+        end = match.end()
+    return sql[:end].strip()
+
+
+class GuardDecision(NamedTuple):
+    action: str
+    sql: str
+    cost: float
+    reason: str
+
+
+class QueryGuard:
+    """
+    Estimates the cost of a query from its SQLite plan and decides how to run it.
+
+    Args:
+        engine: SQLAlchemy engine of the queried database.
+        config: Configuration object (default: QueryGuardConfig).
+    """
+
+    def __init__(self, engine: Any, config: Optional[Any] = None):
+        self.engine = engine
+        self.config = config or QueryGuardConfig
+        self._row_counts: Dict[str, int] = {}
+        self._row_counts_at = 0.0
+        self._lock = threading.Lock()
+
+    def check(self, sql: str) -> GuardDecision:
+        """
+        Decide whether `sql` runs as is, with a LIMIT, in the background or not at all.
+        Queries the planner cannot explain are allowed so execution reports the error.
+        """
+        if self.engine.dialect.name != "sqlite":
+            return GuardDecision(ALLOW, sql, 0.0, "cost estimation is only available for SQLite")
+        try:
+            with self.engine.connect() as conn:
+                plan = conn.execute(text(f"EXPLAIN QUERY PLAN {strip_sql_tail(sql)}")).fetchall()
+                row_counts = self._table_rows(conn)
+        except Exception as e:
+            return GuardDecision(ALLOW, sql, 0.0, f"plan unavailable: {e}")
+
+        aliases = self._aliases(sql, row_counts)
+        cost, _, tables = self._estimate(plan, aliases, row_counts)
+        largest = max((row_counts.get(table, 0) for table in tables), default=0)
+        tier = self.tier(largest)
+        reason = f"estimated {int(cost):,} rows examined (largest table: {largest:,} rows)"
+
+        if cost <= tier["limit"]:
+            return GuardDecision(ALLOW, sql, cost, reason)
+        if cost > tier["reject"]:
+            return GuardDecision(REJECT, sql, cost, reason)
+        if not _NO_EARLY_STOP.search(sql):
+            # Nested loops stream rows, so a LIMIT bounds the work
+            if _HAS_LIMIT.search(strip_sql_tail(sql)):
+                return GuardDecision(ALLOW, sql, cost, reason)
+            limited = f"SELECT * FROM ({strip_sql_tail(sql)}) LIMIT {self.config.ROW_LIMIT}"
+            return GuardDecision(LIMIT, limited, cost, reason)
+        if cost > tier["background"]:
+            return GuardDecision(BACKGROUND, sql, cost, reason)
+        return GuardDecision(ALLOW, sql, cost, reason)
+
+    def tier(self, table_rows: int) -> Dict[str, float]:
+        """
+        Thresholds for a query whose largest table has `table_rows` rows.
+        """
+        for tier in self.config.TIERS:
+            if tier.get("max_rows") is None or table_rows <= tier["max_rows"]:
+                return tier
+        return self.config.TIERS[-1]
+
+    def _table_rows(self, conn: Any) -> Dict[str, int]:
+        """
+        Approximate row counts per table, refreshed every ROW_COUNT_TTL_SECONDS.
+        MAX(rowid) is an index lookup; WITHOUT ROWID tables fall back to COUNT(*).
+        """
+        with self._lock:
+            if self._row_counts and time.monotonic() - self._row_counts_at < self.config.ROW_COUNT_TTL_SECONDS:
+                return self._row_counts
+        counts = {}
+        tables = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")).fetchall()
+        for (name,) in tables:
+            quoted = '"' + name.replace('"', '""') + '"'
+            try:
+                counts[name] = conn.execute(text(f"SELECT MAX(rowid) FROM {quoted}")).scalar() or 0
+            except Exception:
+                counts[name] = conn.execute(text(f"SELECT COUNT(*) FROM {quoted}")).scalar() or 0
+        with self._lock:
+            self._row_counts, self._row_counts_at = counts, time.monotonic()
+        return counts
+
+    @staticmethod
+    def _aliases(sql: str, row_counts: Dict[str, int]) -> Dict[str, str]:
+        """
+        Map table names and the aliases in `sql` (of tables or CTEs) to the aliased name.
+        """
+        aliases = {name.lower(): name for name in row_counts}
+        for name, alias in _FROM_CLAUSE.findall(sql):
+            if alias:
+                aliases[alias.lower()] = aliases.get(name.lower(), name)
+        return aliases
+
+    def _estimate(self, plan: List[Any], aliases: Dict[str, str], row_counts: Dict[str, int]):
+        """
+        Returns (rows examined, output rows, tables accessed) for the plan.
+        """
+        children = defaultdict(list)
+        for node_id, parent, _, detail in plan:
+            children[parent].append((node_id, detail))
+        tables = set()
+        # Output rows of materialized subqueries and CTEs, by name
+        derived = {}
+
+        def rows_of(name: str, alias: Optional[str]):
+            target = aliases.get((alias or name).lower(), alias or name)
+            if target in row_counts:
+                tables.add(target)
+                return max(1, row_counts[target])
+            return derived.get(target.lower(), self.config.UNKNOWN_TABLE_ROWS)
+
+        def walk(parent: int):
+            outer, cost = 1.0, 0.0
+            for node_id, detail in children.get(parent, []):
+                match = None if detail.startswith("SCAN CONSTANT ROW") else _ACCESS.match(detail)
+                if match:
+                    kind, name, alias, rest = match.groups()
+                    rows = rows_of(name, alias)
+                    if kind == "SCAN":
+                        cost += outer * rows
+                        outer *= rows
+                    else:
+                        if "AUTOMATIC" in rest:
+                            cost += rows
+                        if "PRIMARY KEY" in rest or "rowid=" in rest:
+                            fan_out = 1
+                        elif "=" in rest:
+                            fan_out = min(rows, self.config.INDEX_FAN_OUT)
+                        else:
+                            fan_out = max(1.0, rows * self.config.RANGE_SELECTIVITY)
+                        cost += outer * (math.log2(rows + 1) + fan_out)
+                        outer *= fan_out
+                elif detail.startswith("USE TEMP B-TREE"):
+                    cost += outer * math.log2(outer + 1)
+                sub_cost, sub_rows = walk(node_id)
+                if detail.startswith("CORRELATED"):
+                    cost += outer * sub_cost
+                else:
+                    cost += sub_cost
+                    if detail.startswith(("CO-ROUTINE", "MATERIALIZE")):
+                        derived[detail.split()[-1].lower()] = max(1.0, sub_rows)
+            return cost, outer
+
+        cost, outer = walk(0)
+        return cost, outer, tables
+
+
+_JOB_OWNER: contextvars.ContextVar[str] = contextvars.ContextVar("background_job_owner", default="")
+
+
+@contextmanager
+def job_owner(owner: str) -> Iterator[None]:
+    """
+    Background jobs submitted inside the block belong to `owner`.
+    """
+    reset = _JOB_OWNER.set(owner or "")
+    try:
+        yield
+    finally:
+        try:
+            _JOB_OWNER.reset(reset)
+        except ValueError:
+            # Async generators may finish in a different context than they started in
+            _JOB_OWNER.set(reset.old_value if reset.old_value is not contextvars.Token.MISSING else "")
+
+
+class BackgroundJobs:
+    """
+    Small pool for queries too expensive to run inline; keeps the newest finished jobs.
+
+    Args:
+        workers: Worker threads (default: QueryGuardConfig.BACKGROUND_WORKERS).
+        max_jobs: Jobs retained for polling (default: QueryGuardConfig.MAX_BACKGROUND_JOBS).
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_jobs: Optional[int] = None):
+        self.workers = workers or QueryGuardConfig.BACKGROUND_WORKERS
+        self.max_jobs = max_jobs or QueryGuardConfig.MAX_BACKGROUND_JOBS
+        self._executor = None
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, sql: str, fn: Callable[[], Any], owner: Optional[str] = None) -> str:
+        """
+        Run `fn` in the background and return the job id; the job belongs to
+        `owner` (default: the current `job_owner`).
+        """
+        job_id = uuid.uuid4().hex
+        owner = _JOB_OWNER.get() if owner is None else owner
+        job = {"id": job_id, "sql": sql, "status": "running", "submitted_at": time.time(), "result": None,
+               "owners": {owner}}
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="db-background")
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._run, job, fn)
+        return job_id
+
+    def get(self, job_id: str, owner: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        A copy of the job; None if it is unknown, expired or (when `owner` is given) not theirs.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (owner is not None and owner not in job["owners"]):
+                return None
+            return dict(job)
+
+    def share(self, job_id: str, owner: str) -> None:
+        """
+        Let `owner` read the job too (a caller whose identical query was coalesced with it).
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["owners"].add(owner)
+
+    @staticmethod
+    def _run(job: Dict[str, Any], fn: Callable[[], Any]) -> None:
+        try:
+            job["result"] = fn()
+            job["status"] = "done"
+        except Exception as e:
+            job["result"] = {"error": f"Unexpected error: {e}"}
+            job["status"] = "failed"
+        job["finished_at"] = time.time()
+
+
+background_jobs = BackgroundJobs()
+
@@ -0,0 +1,372 @@
+"""
+Resilient LLM Module
+===============================================================================
+A deadline-aware wrapper around OpenAI-compatible clients, shared by every LLM
+call in the project (SQL generation, output type, intent fallback, summaries).
+
+- Deadlines: `request_deadline(seconds)` sets a per-request deadline (a context
+  variable, so it follows the request into worker threads). Each call's timeout
+  is the smaller of config.CALL_TIMEOUT and the time left before the deadline.
+- Retries: timeouts, connection errors, 429 and 5xx responses are retried with
+  full-jitter exponential backoff, as long as the deadline allows it.
+- Hedging (optional): when a call has not answered after the observed p95
+  latency, an identical duplicate is sent and the first answer wins.
+- Circuit breaker: after repeated failures or slow calls the breaker opens and
+  calls fail fast with LLMUnavailableError, so callers fall back to cached or
+  degraded answers instead of waiting on a struggling provider.
+
+The wrapped client keeps the `client.chat.completions.create(**kwargs)` shape,
+so callers do not change.
+
+Usage Example:
+    client = guard_llm(OpenAI(api_key=...))
+    async_client = guard_async_llm(AsyncOpenAI(api_key=...))
+    with request_deadline(20):
+        response = client.chat.completions.create(model=..., messages=...)
+"""
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+from src.mcp.telemetry import record_usage
+from src.utils.constant import LLMClientConfig
+
+_DEADLINE: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_request_deadline", default=None)
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+class LLMUnavailableError(RuntimeError):
+    """
+    Raised instead of calling the provider when the circuit is open or the request deadline has passed.
+    """
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]):
+    """
+    Bound every LLM call made inside the block by a shared deadline `seconds` from now.
+    """
+    token = _DEADLINE.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        try:
+            _DEADLINE.reset(token)
+        except ValueError:
+            # Async generators may finish in a different context than they started in
+            _DEADLINE.set(token.old_value if token.old_value is not contextvars.Token.MISSING else None)
+
+
+def remaining_time() -> Optional[float]:
+    """
+    Seconds left before the current request deadline, or None without a deadline.
+    """
+    deadline = _DEADLINE.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, APIConnectionError, RateLimitError, InternalServerError)):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+def _get_hedge_executor(config: Any) -> ThreadPoolExecutor:
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=config.HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+        return _hedge_executor
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures; after
+    `reset_seconds` one probe call is let through (half-open) and its outcome
+    closes or re-opens the circuit. A probe that never reports back (e.g. a
+    cancelled request) is replaced after another `reset_seconds`.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._probe_started = None
+            if self.state == "half_open" and (
+                self._probe_started is None or now - self._probe_started >= self.reset_seconds
+            ):
+                self._probe_started = now
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_started = None
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class LLMHealth:
+    """
+    Provider health shared by all wrapped clients: circuit breaker, a rolling
+    latency window (for the hedging delay) and call counters.
+    """
+
+    def __init__(self, config: Optional[Any] = None):
+        self.config = config or LLMClientConfig
+        self.breaker = CircuitBreaker(self.config.BREAKER_FAILURE_THRESHOLD, self.config.BREAKER_RESET_SECONDS)
+        self._latencies = deque(maxlen=self.config.LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "retries": 0, "hedges": 0, "timeouts": 0, "short_circuits": 0, "failures": 0}
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def record_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+        if seconds >= self.config.SLOW_CALL_SECONDS:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def record_failure(self, error: BaseException) -> None:
+        self.count("failures")
+        if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+            self.count("timeouts")
+        self.breaker.record_failure()
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < self.config.HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters, breaker=self.breaker.state, samples=len(self._latencies))
+
+
+default_health = LLMHealth()
+
+
+class ResilientLLM:
+    """
+    Wraps an OpenAI-compatible client so `chat.completions.create` honours the
+    request deadline, retries, hedging and the shared circuit breaker.
+
+    Args:
+        client: The OpenAI-compatible client to wrap.
+        is_async: True when `client.chat.completions.create` is a coroutine function.
+        config: Configuration object (default: LLMClientConfig).
+        health: Shared provider health (default: the module-wide `default_health`).
+    """
+
+    def __init__(self, client: Any, is_async: bool = False, config: Optional[Any] = None, health: Optional[LLMHealth] = None):
+        self.client = client
+        self.is_async = is_async
+        self.config = config or LLMClientConfig
+        self.health = health or default_health
+        self.chat = _Namespace(completions=_Namespace(create=self._acreate if is_async else self._create))
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def _call_timeout(self) -> float:
+        remaining = remaining_time()
+        if remaining is None:
+            return self.config.CALL_TIMEOUT
+        if remaining <= self.config.MIN_CALL_SECONDS:
+            raise LLMUnavailableError("Request deadline exceeded before the LLM call")
+        return min(self.config.CALL_TIMEOUT, remaining)
+
+    def _admit(self) -> float:
+        timeout = self._call_timeout()
+        if not self.health.breaker.allow():
+            self.health.count("short_circuits")
+            raise LLMUnavailableError("LLM circuit breaker is open")
+        self.health.count("calls")
+        return timeout
+
+    def _record_error(self, error: BaseException) -> None:
+        if is_retryable(error):
+            self.health.record_failure(error)
+        else:
+            # The provider answered (e.g. a 400), so it is not unhealthy
+            self.health.breaker.record_success()
+
+    def _backoff(self, attempt: int, error: BaseException) -> Optional[float]:
+        """
+        Full-jitter delay before retry `attempt`, or None when the error is final.
+        """
+        if isinstance(error, LLMUnavailableError) or not is_retryable(error) or attempt >= self.config.MAX_RETRIES:
+            return None
+        delay = random.uniform(0, min(self.config.BACKOFF_MAX, self.config.BACKOFF_BASE * 2 ** attempt))
+        remaining = remaining_time()
+        if remaining is not None and delay + self.config.MIN_CALL_SECONDS >= remaining:
+            return None
+        self.health.count("retries")
+        return delay
+
+    def _hedge_delay(self, kwargs: Dict[str, Any], timeout: float) -> Optional[float]:
+        if not self.config.HEDGE_ENABLED or kwargs.get("stream"):
+            return None
+        delay = self.health.percentile(self.config.HEDGE_PERCENTILE)
+        return delay if delay is not None and delay < timeout else None
+
+    def _create(self, **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            timeout = self._admit()
+            started = time.monotonic()
+            try:
+                response = self._attempt(kwargs, timeout)
+            except Exception as error:
+                self._record_error(error)
+                delay = self._backoff(attempt, error)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.health.record_latency(time.monotonic() - started)
+            record_usage(response)
+            return response
+
+    def _attempt(self, kwargs: Dict[str, Any], timeout: float) -> Any:
+        create = self.client.chat.completions.create
+        hedge_delay = self._hedge_delay(kwargs, timeout)
+        if hedge_delay is None:
+            return create(**kwargs, timeout=timeout)
+
+        executor = _get_hedge_executor(self.config)
+        started = time.monotonic()
+        pending = {executor.submit(contextvars.copy_context().run, create, **kwargs, timeout=timeout)}
+        done, pending = wait(pending, timeout=hedge_delay)
+        if not done:
+            self.health.count("hedges")
+            remaining = max(timeout - (time.monotonic() - started), self.config.MIN_CALL_SECONDS)
+            pending.add(executor.submit(contextvars.copy_context().run, create, **kwargs, timeout=remaining))
+        error = None
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                raise error
+            left = timeout - (time.monotonic() - started)
+            if left <= 0:
+                raise TimeoutError("LLM call timed out")
+            done, pending = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError("LLM call timed out")
+
+    async def _acreate(self, **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            timeout = self._admit()
+            started = time.monotonic()
+            try:
+                response = await self._aattempt(kwargs, timeout)
+            except Exception as error:
+                self._record_error(error)
+                delay = self._backoff(attempt, error)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.health.record_latency(time.monotonic() - started)
+            record_usage(response)
+            return response
+
+    async def _aattempt(self, kwargs: Dict[str, Any], timeout: float) -> Any:
+        create = self.client.chat.completions.create
+        hedge_delay = self._hedge_delay(kwargs, timeout)
+        if hedge_delay is None:
+            return await asyncio.wait_for(create(**kwargs, timeout=timeout), timeout)
+
+        started = time.monotonic()
+        primary = asyncio.ensure_future(create(**kwargs, timeout=timeout))
+        done, pending = await asyncio.wait({primary}, timeout=hedge_delay)
+        if not done:
+            self.health.count("hedges")
+            remaining = max(timeout - (time.monotonic() - started), self.config.MIN_CALL_SECONDS)
+            pending.add(asyncio.ensure_future(create(**kwargs, timeout=remaining)))
+        error = None
+        try:
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                left = timeout - (time.monotonic() - started)
+                if left <= 0:
+                    raise asyncio.TimeoutError("LLM call timed out")
+                done, pending = await asyncio.wait(pending, timeout=left, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError("LLM call timed out")
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class _Namespace:
+    def __init__(self, **attributes: Any):
+        self.__dict__.update(attributes)
+
+
+def guard_llm(client: Optional[Any], **kwargs: Any) -> Optional[Any]:
+    """
+    Wrap a synchronous client (idempotent; None stays None).
+    """
+    if client is None or isinstance(client, ResilientLLM):
+        return client
+    return ResilientLLM(client, is_async=False, **kwargs)
+
+
+def guard_async_llm(client: Optional[Any], **kwargs: Any) -> Optional[Any]:
+    """
+    Wrap an async client (idempotent; None stays None).
+    """
+    if client is None or isinstance(client, ResilientLLM):
+        return client
+    return ResilientLLM(client, is_async=True, **kwargs)
@@ -0,0 +1,256 @@
+"""
+Result Cache Module
+===============================================================================
+ResultCache: an in-process cache of query results, so repeated dashboard-style
+questions are answered without re-scanning the tables.
+
+- Keys are canonicalized SQL: comments, redundant whitespace, trailing
+  semicolons, identifier/keyword case and number spelling are folded. Every
+  SELECT list (subqueries and CTEs included), CTE column list and alias is
+  kept verbatim, because SQLite derives column labels from their exact text,
+  also through an outer `SELECT *`.
+- Entries are invalidated by `PRAGMA data_version`, read on a dedicated
+  connection: it changes whenever any other connection (the writer, another
+  process) commits, so a single write drops every cached result.
+- Results are stored column by column (numpy/extension arrays; repetitive
+  text columns dictionary-encoded) and the cache is bounded by total bytes
+  with LRU eviction. Every hit returns a fresh DataFrame.
+
+Usage Example:
+    cache = ResultCache(engine)
+    df = cache.get(sql)
+    if df is None:
+        version = cache.data_version()
+        df = pd.read_sql(sql, engine)
+        cache.put(sql, df, version)
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.utils.constant import ResultCacheConfig
+
+_TOKEN = re.compile(
+    r"(?P<comment>--[^\n]*|/\*.*?(?:\*/|$))"
+    r"|(?P<string>'(?:[^']|'')*')"
+    r"|(?P<quoted>\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\])"
+    r"|(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)"
+    r"|(?P<word>[A-Za-z_][\w$]*)"
+    r"|(?P<space>\s+)"
+    r"|(?P<other>.)",
+    re.DOTALL,
+)
+
+
+def _fold_number(literal: str) -> str:
+    if "e" in literal.lower():
+        return literal.lower()
+    if "." not in literal:
+        return literal.lstrip("0") or "0"
+    whole, fraction = literal.split(".", 1)
+    # Keep one fractional digit so REAL literals stay REAL ("1.00" -> "1.0")
+    return f"{whole.lstrip('0') or '0'}.{fraction.rstrip('0') or '0'}"
+
+
+def canonical_sql(sql: str) -> str:
+    """
+    Fold `sql` into its cache-key form; statements with the same key return the same result.
+    """
+    tokens: List[str] = []
+    depth = 0
+    # Depths of the open SELECT lists (innermost last); everything inside one is kept verbatim
+    select_lists: List[int] = []
+    # Depths of the open WITH clauses, and whether a CTE name/column list is being read
+    with_clauses: List[int] = []
+    cte_header = False
+    previous = ""
+    for match in _TOKEN.finditer((sql or "").strip().rstrip(";").strip()):
+        kind, token = match.lastgroup, match.group(0)
+        lowered = token.lower()
+        verbatim = bool(select_lists)
+        if kind == "word":
+            if lowered == "select":
+                if with_clauses and with_clauses[-1] == depth:
+                    with_clauses.pop()
+                    cte_header = False
+                select_lists.append(depth)
+                if not verbatim:
+                    tokens.append(lowered)
+                    previous = lowered
+                    continue
+            elif lowered == "from" and select_lists and select_lists[-1] == depth:
+                select_lists.pop()
+                verbatim = bool(select_lists)
+                if not verbatim:
+                    while tokens and tokens[-1].isspace():
+                        tokens.pop()
+                    tokens.append(" ")
+            elif lowered == "with" and not verbatim:
+                with_clauses.append(depth)
+                cte_header = True
+            elif lowered == "as" and cte_header and with_clauses[-1] == depth:
+                cte_header = False
+            elif not verbatim and lowered != "recursive" and (cte_header or previous == "as"):
+                # CTE names and columns, and aliases, become column labels
+                verbatim = True
+        elif kind == "other":
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+                while select_lists and select_lists[-1] > depth:
+                    select_lists.pop()
+                while with_clauses and with_clauses[-1] > depth:
+                    with_clauses.pop()
+            elif token == "," and with_clauses and with_clauses[-1] == depth and not select_lists:
+                cte_header = True
+        if kind not in ("space", "comment"):
+            previous = lowered
+
+        if verbatim:
+            # Whitespace inside an expression is part of its label; around it, it is not
+            if kind == "space" and (tokens[-1] == "select" or (depth == select_lists[0] and tokens[-1] == ",")):
+                token = " "
+            tokens.append(token)
+        elif kind == "comment" or kind == "space":
+            if tokens and tokens[-1] != " ":
+                tokens.append(" ")
+        elif kind == "word":
+            tokens.append(lowered)
+        elif kind == "number":
+            tokens.append(_fold_number(token))
+        else:
+            tokens.append(token)
+    return "".join(tokens).strip()
+
+
+def _encode(series: pd.Series) -> Tuple[Any, int]:
+    """
+    Compact copy of one column and its size in bytes.
+    """
+    if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+        if not series.isna().any():
+            categorical = pd.Categorical(series)
+            if len(categorical.categories) <= len(series) // 2:
+                return categorical, int(pd.Series(categorical).memory_usage(index=False, deep=True))
+        values = series.array.copy()
+        return values, int(pd.Series(values).memory_usage(index=False, deep=True))
+    values = series.array.copy()
+    return values, int(values.nbytes)
+
+
+class _Entry:
+    __slots__ = ("columns", "dtypes", "arrays", "attrs", "nbytes")
+
+    def __init__(self, df: pd.DataFrame):
+        self.columns = list(df.columns)
+        self.dtypes = list(df.dtypes)
+        self.arrays = []
+        self.nbytes = 0
+        for position in range(df.shape[1]):
+            values, size = _encode(df.iloc[:, position])
+            self.arrays.append(values)
+            self.nbytes += size
+        self.attrs = dict(df.attrs)
+
+    def to_frame(self) -> pd.DataFrame:
+        data = {}
+        for position, (values, dtype) in enumerate(zip(self.arrays, self.dtypes)):
+            if isinstance(values, pd.Categorical) and not isinstance(dtype, pd.CategoricalDtype):
+                values = values.astype(dtype)
+            data[position] = pd.Series(values, dtype=dtype, copy=True)
+        df = pd.DataFrame(data)
+        df.columns = self.columns
+        df.attrs.update(self.attrs)
+        return df
+
+
+class ResultCache:
+    """
+    Byte-bounded LRU cache of DataFrame results, invalidated by PRAGMA data_version.
+
+    Args:
+        engine: SQLAlchemy engine of a SQLite database; one of its connections is
+            detached from the pool and kept to read data_version.
+        max_bytes: Total size of cached results (default: config.MAX_BYTES).
+        config: Configuration object (default: ResultCacheConfig).
+    """
+
+    def __init__(self, engine: Any, max_bytes: Optional[int] = None, config: Optional[Any] = None):
+        self.config = config or ResultCacheConfig
+        self.max_bytes = max_bytes or self.config.MAX_BYTES
+        self.max_entry_bytes = min(self.config.MAX_ENTRY_BYTES, self.max_bytes)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        raw = engine.raw_connection()
+        self._probe = raw.driver_connection
+        raw.detach()
+
+    def data_version(self) -> int:
+        """
+        Current database version; take it before running a query and pass it to `put`.
+        """
+        with self._lock:
+            return self._probe.execute("PRAGMA data_version").fetchone()[0]
+
+    def get(self, sql: str) -> Optional[pd.DataFrame]:
+        """
+        Return a copy of the cached result of `sql`, or None on a miss.
+        """
+        key = canonical_sql(sql)
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry.to_frame()
+
+    def put(self, sql: str, df: pd.DataFrame, version: int) -> None:
+        """
+        Cache `df` as the result of `sql` read at `version`. Results read while
+        the database changed, and results larger than MAX_ENTRY_BYTES, are skipped.
+        """
+        if not isinstance(df, pd.DataFrame):
+            return
+        entry = _Entry(df)
+        if entry.nbytes > self.max_entry_bytes:
+            return
+        key = canonical_sql(sql)
+        with self._lock:
+            self._check_version()
+            if version != self._version:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+    def _check_version(self) -> None:
+        version = self._probe.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._version:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
@@ -0,0 +1,194 @@
+"""
+Result Digest Module
+===============================================================================
+digest_result: turns a query result into a size-capped JSON payload for the
+summary LLM call, instead of interpolating the whole DataFrame into the prompt.
+
+- Results that fit the cap are sent as plain records, so small answers lose nothing.
+- Larger results are sent statistics-first: schema, row count, vectorized
+  descriptive stats (pandas describe for numbers, top-k categories for text,
+  min/max for dates) and a small sample stratified on a low-cardinality column.
+- The sample, then the top-k lists, then whole column stats are dropped until
+  the payload fits the byte (or estimated token) budget.
+- A result cut off at a row limit (attrs["row_limit"], set by the bounded read
+  and the query guard's LIMIT) carries "truncated": true and "row_limit", so
+  it is not summarized as the complete answer.
+
+Usage Example:
+    payload = digest_result(df)                  # ResultDigestConfig.MAX_BYTES
+    payload = digest_result(df, max_tokens=500)  # token budget instead
+"""
+import json
+import math
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from src.mcp.generate_plot import _is_temporal
+from src.mcp.sql_history import estimate_tokens
+from src.utils.constant import ResultDigestConfig
+
+
+def _scalar(value: Any, max_chars: int) -> Any:
+    """
+    JSON-friendly, compact form of a single cell or statistic.
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)) or value is pd.NaT:
+        return None
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float):
+        return float(f"{value:.6g}")
+    if isinstance(value, (int, bool)):
+        return value
+    text = value.isoformat() if hasattr(value, "isoformat") else str(value)
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+
+def _column_stats(df: pd.DataFrame, top_k: int, max_chars: int) -> Dict[str, Dict[str, Any]]:
+    stats = {}
+    numeric = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])]
+    if numeric:
+        described = df[numeric].describe().T
+        described["sum"] = df[numeric].sum()
+        for col, row in described.iterrows():
+            stats[str(col)] = {key: _scalar(value, max_chars) for key, value in row.items()}
+    for col in df.columns:
+        if col in numeric:
+            continue
+        series = df[col]
+        nulls = int(series.isna().sum())
+        if _is_temporal(series):
+            values = pd.to_datetime(series, errors="coerce")
+            stats[str(col)] = {"min": _scalar(values.min(), max_chars), "max": _scalar(values.max(), max_chars)}
+        else:
+            counts = series.astype(str).where(series.notna()).value_counts()
+            stats[str(col)] = {
+                "unique": int(counts.size),
+                "top": [[_scalar(value, max_chars), int(count)] for value, count in counts.head(top_k).items()],
+            }
+        if nulls:
+            stats[str(col)]["nulls"] = nulls
+    return stats
+
+
+def stratified_sample(df: pd.DataFrame, rows: int, max_groups: Optional[int] = None) -> pd.DataFrame:
+    """
+    Up to `rows` rows: proportional per group of the lowest-cardinality text column
+    (at least one row per group), or evenly spaced rows when there is no such column.
+    """
+    if rows <= 0 or df.empty:
+        return df.head(0)
+    if len(df) <= rows:
+        return df
+    max_groups = max_groups or ResultDigestConfig.STRATIFY_MAX_GROUPS
+    candidates = [
+        col for col in df.columns
+        if not pd.api.types.is_numeric_dtype(df[col]) and 1 < df[col].nunique(dropna=False) <= min(max_groups, rows)
+    ]
+    if candidates:
+        strata = min(candidates, key=lambda col: df[col].nunique(dropna=False))
+        groups = df.groupby(strata, dropna=False, sort=False)
+        quota = {key: max(1, round(rows * len(index) / len(df))) for key, index in groups.indices.items()}
+        while sum(quota.values()) > rows:
+            largest = max(quota, key=quota.get)
+            quota[largest] -= 1
+        positions = [index[pos] for key, index in groups.indices.items() for pos in _spread(len(index), quota[key])]
+        return df.iloc[sorted(positions)]
+    return df.iloc[_spread(len(df), rows)]
+
+
+def _spread(length: int, count: int) -> List[int]:
+    """
+    `count` evenly spaced positions in range(length), including both ends.
+    """
+    if count >= length:
+        return list(range(length))
+    step = (length - 1) / (count - 1) if count > 1 else 0
+    return sorted({round(i * step) for i in range(count)})
+
+
+def _records(df: pd.DataFrame, max_chars: int) -> List[Dict[str, Any]]:
+    return [
+        {str(col): _scalar(value, max_chars) for col, value in zip(df.columns, row)}
+        for row in df.itertuples(index=False, name=None)
+    ]
+
+
+def digest_result(
+    result: Any,
+    max_bytes: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    config: Optional[Any] = None,
+) -> str:
+    """
+    Serialize `result` as JSON no larger than the configured budget.
+
+    Args:
+        result: Query result; DataFrames are digested, anything else is serialized as-is (truncated to the cap).
+        max_bytes: Byte budget (default: config.MAX_BYTES).
+        max_tokens: Estimated token budget; overrides max_bytes when given (default: config.MAX_TOKENS).
+        config: Configuration object (default: ResultDigestConfig).
+    """
+    config = config or ResultDigestConfig
+    max_tokens = max_tokens or (None if max_bytes else config.MAX_TOKENS)
+    max_bytes = max_bytes or config.MAX_BYTES
+
+    def dump(payload):
+        return json.dumps(payload, default=str, ensure_ascii=False, separators=(",", ":"))
+
+    def fits(text):
+        if max_tokens:
+            return estimate_tokens(text) <= max_tokens
+        return len(text.encode("utf-8")) <= max_bytes
+
+    if not isinstance(result, pd.DataFrame):
+        text = dump(result)
+        return text if fits(text) else _truncate(text, fits)
+
+    df = result
+    counts = {"row_count": len(df)}
+    if "row_limit" in df.attrs:
+        counts.update(truncated=True, row_limit=df.attrs["row_limit"])
+    if len(df) <= config.FULL_ROWS_MAX:
+        full = dump({**counts, "rows": _records(df, config.MAX_VALUE_CHARS)})
+        if fits(full):
+            return full
+
+    payload = {
+        **counts,
+        "columns": {str(col): str(dtype) for col, dtype in df.dtypes.items()},
+        "stats": _column_stats(df, config.TOP_K, config.MAX_VALUE_CHARS),
+    }
+    rows = config.SAMPLE_ROWS
+    while rows > 0:
+        payload["sample"] = _records(stratified_sample(df, rows, config.STRATIFY_MAX_GROUPS), config.MAX_VALUE_CHARS)
+        text = dump(payload)
+        if fits(text):
+            return text
+        rows //= 2
+    payload.pop("sample", None)
+
+    for stats in payload["stats"].values():
+        if "top" in stats:
+            stats["top"] = stats["top"][:1]
+    text = dump(payload)
+    while not fits(text) and payload["stats"]:
+        payload["stats"].popitem()
+        payload["omitted_stats"] = len(df.columns) - len(payload["stats"])
+        text = dump(payload)
+    return text if fits(text) else _truncate(text, fits)
+
+
+def _truncate(text: str, fits) -> str:
+    """
+    Last resort for payloads whose schema alone exceeds the budget.
+    """
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(text[:middle] + "…"):
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + "…"
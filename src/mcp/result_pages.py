@@ -0,0 +1,279 @@
+"""
+Result Pages Module
+===============================================================================
+ResultPages: server-side handles for paging through a query's rows.
+
+A reply shows the first page, taken from the rows already fetched. When
+there are more rows, the reply carries a result handle whose id the client
+passes to `/results/{id}?page=N`. The first request for a later page opens
+a QueryCursor (src.mcp.run_query) for the handle: the query runs once on a
+reader connection of its own, is cost-checked like any other query, and each
+page reads only its own rows plus one look-ahead row that tells whether
+another page follows. The cursor keeps one read snapshot, so pages do not
+shift while the data changes. An open read snapshot keeps SQLite from
+checkpointing the WAL, so a cursor unused for CURSOR_IDLE_SECONDS is closed
+by a background sweeper, and at most MAX_CURSORS cursors stay open. A handle
+whose cursor was closed (or a request for an earlier page) reopens it on
+current data and skips to the page. Handles expire after TTL_SECONDS
+without use.
+
+Results that must not be re-run, such as a finished background job (its SQL
+would be sent to the background again), are opened with materialized=True:
+the handle keeps the fetched DataFrame and pages slice it.
+
+Page record:
+    {"result_id": "...", "page": 2, "page_size": 50, "rows": <DataFrame | dict>,
+     "has_more": True, "total_rows": None}
+
+Usage Example:
+    pages = ResultPages(db_handler)
+    first = pages.first_page(sql, df, owner=email)
+    second = pages.page(first["result_id"], 2, owner=email)
+"""
+import asyncio
+import contextvars
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+import pandas as pd
+
+from src.mcp.run_query import get_query_executor
+from src.utils.constant import ResultPageConfig
+
+NO_DATA = {"message": "Query executed successfully but returned no data."}
+
+
+class ResultPages:
+    """
+    Owner-scoped result handles with a sliding TTL.
+
+    Args:
+        db_handler: DatabaseHandler used to open cursors for later pages.
+        page_size: Rows per page (default: config.PAGE_SIZE).
+        config: Configuration object (default: ResultPageConfig).
+    """
+
+    def __init__(self, db_handler: Any, page_size: Optional[int] = None, config: Optional[Any] = None):
+        self.db_handler = db_handler
+        self.config = config or ResultPageConfig
+        self.page_size = page_size or self.config.PAGE_SIZE
+        self._handles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def first_page(self, sql: str, result: pd.DataFrame, owner: str = "", materialized: bool = False) -> Dict[str, Any]:
+        """
+        Page 1 of `result`, already fetched for `sql`; opens a handle only when more rows exist.
+        With materialized=True later pages are sliced from `result` instead of re-running `sql`.
+        """
+        has_more = len(result) > self.page_size
+        complete = "row_limit" not in result.attrs
+        record = {
+            "result_id": None,
+            "page": 1,
+            "page_size": self.page_size,
+            # A copy, so the record does not keep the whole result alive
+            "rows": result.iloc[:self.page_size].copy(),
+            "has_more": has_more,
+            "total_rows": len(result) if complete else None,
+        }
+        if has_more and (sql or materialized):
+            frame = result.copy() if materialized else None
+            record["result_id"] = self._open(sql, owner, record["total_rows"], frame)
+        return record
+
+    def page(self, result_id: str, page: int, owner: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Fetch page `page` (1-based) of a handle; None if it is unknown, expired or not `owner`'s.
+        """
+        handle = self._touch(result_id, owner)
+        if handle is None:
+            return None
+        return self._read_page(handle, page)
+
+    async def apage(self, result_id: str, page: int, owner: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Async variant of page, reading on the bounded query thread pool.
+        """
+        handle = self._touch(result_id, owner)
+        if handle is None:
+            return None
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(get_query_executor(), ctx.run, self._read_page, handle, page)
+
+    def close(self) -> None:
+        """
+        Close every open cursor and forget all handles.
+        """
+        with self._lock:
+            handles = list(self._handles.values())
+            self._handles.clear()
+        for handle in handles:
+            with handle["lock"]:
+                self._close_cursor(handle)
+
+    def _read_page(self, handle: Dict[str, Any], page: int) -> Dict[str, Any]:
+        if handle["frame"] is not None:
+            rows, has_more = self._slice(handle["frame"], max(page, 1))
+        else:
+            with handle["lock"]:
+                rows = self._fetch(handle, max(page, 1))
+            has_more = isinstance(rows, pd.DataFrame) and bool(handle["lookahead"])
+        return {
+            "result_id": handle["id"],
+            "page": page,
+            "page_size": self.page_size,
+            "rows": rows,
+            "has_more": has_more,
+            "total_rows": handle["total_rows"],
+        }
+
+    def _slice(self, frame: pd.DataFrame, page: int) -> Tuple[Union[pd.DataFrame, dict], bool]:
+        start = (page - 1) * self.page_size
+        rows = frame.iloc[start:start + self.page_size].copy()
+        if rows.empty:
+            return dict(NO_DATA), False
+        return rows, len(frame) > start + self.page_size
+
+    def _fetch(self, handle: Dict[str, Any], page: int) -> Union[pd.DataFrame, dict]:
+        """
+        Rows of `page` from the handle's cursor, keeping one look-ahead row. Caller holds handle["lock"].
+        """
+        if handle["cursor"] is None or page < handle["next_page"]:
+            self._close_cursor(handle)
+            cursor = self.db_handler.open_cursor(handle["sql"])
+            if isinstance(cursor, dict):
+                return cursor
+            handle.update(cursor=cursor, columns=cursor.columns, next_page=1, lookahead=[])
+            self._limit_cursors(handle["id"])
+            self._watch_idle()
+        handle["used_at"] = time.monotonic()
+
+        skipped = self._take(handle, (page - handle["next_page"]) * self.page_size, keep=False)
+        if isinstance(skipped, dict):
+            return skipped
+        rows = self._take(handle, self.page_size + 1)
+        if isinstance(rows, dict):
+            return rows
+        handle["lookahead"] = rows[self.page_size:]
+        handle["next_page"] = page + 1
+        if not handle["lookahead"]:
+            # Exhausted: release the connection; an earlier page reopens it
+            self._close_cursor(handle)
+        if not rows:
+            return dict(NO_DATA)
+        return pd.DataFrame(rows[:self.page_size], columns=handle["columns"])
+
+    def _take(self, handle: Dict[str, Any], count: int, keep: bool = True) -> Union[list, dict]:
+        """
+        The next `count` rows (look-ahead first); with keep=False they are read in chunks and dropped.
+        """
+        rows = handle["lookahead"][:count]
+        handle["lookahead"] = handle["lookahead"][count:]
+        taken = len(rows)
+        if not keep:
+            rows = []
+        while taken < count and handle["cursor"] is not None:
+            wanted = count - taken if keep else min(count - taken, self.config.CHUNK_ROWS)
+            fetched = handle["cursor"].fetch(wanted)
+            if isinstance(fetched, dict):
+                self._close_cursor(handle)
+                return fetched
+            if keep:
+                rows.extend(fetched)
+            taken += len(fetched)
+            if len(fetched) < wanted:
+                self._close_cursor(handle)
+        return rows
+
+    @staticmethod
+    def _close_cursor(handle: Dict[str, Any]) -> None:
+        if handle["cursor"] is not None:
+            handle["cursor"].close()
+        handle.update(cursor=None, next_page=1, lookahead=[])
+
+    def _limit_cursors(self, keep_id: str) -> None:
+        """
+        Close the least recently used cursors beyond MAX_CURSORS (never `keep_id`'s, nor one in use).
+        """
+        with self._lock:
+            open_handles = [handle for handle in self._handles.values() if handle["cursor"] is not None]
+        for handle in open_handles[:max(len(open_handles) - self.config.MAX_CURSORS, 0)]:
+            if handle["id"] != keep_id and handle["lock"].acquire(blocking=False):
+                try:
+                    self._close_cursor(handle)
+                finally:
+                    handle["lock"].release()
+
+    def _watch_idle(self) -> None:
+        """
+        Start the idle-cursor sweeper unless it is running.
+        """
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep, name="result-cursor-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def _sweep(self) -> None:
+        """
+        Close cursors unused for CURSOR_IDLE_SECONDS; exits once no cursor is open.
+        """
+        idle = self.config.CURSOR_IDLE_SECONDS
+        while True:
+            time.sleep(max(idle / 2, 0.01))
+            with self._lock:
+                open_handles = [handle for handle in self._handles.values() if handle["cursor"] is not None]
+                if not open_handles:
+                    self._sweeper = None
+                    return
+            now = time.monotonic()
+            for handle in open_handles:
+                # A handle being read is in use, not idle
+                if now - handle["used_at"] >= idle and handle["lock"].acquire(blocking=False):
+                    try:
+                        if handle["cursor"] is not None and time.monotonic() - handle["used_at"] >= idle:
+                            self._close_cursor(handle)
+                    finally:
+                        handle["lock"].release()
+
+    def _open(self, sql: str, owner: str, total_rows: Optional[int], frame: Optional[pd.DataFrame] = None) -> str:
+        result_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            dropped = self._evict(now)
+            self._handles[result_id] = {
+                "id": result_id, "sql": sql, "owner": owner, "total_rows": total_rows, "frame": frame,
+                "expires_at": now + self.config.TTL_SECONDS,
+                "lock": threading.Lock(), "cursor": None, "columns": [], "next_page": 1, "lookahead": [],
+                "used_at": 0.0,
+            }
+            while len(self._handles) > self.config.MAX_HANDLES:
+                dropped.append(self._handles.popitem(last=False)[1])
+        self._release(dropped)
+        return result_id
+
+    def _touch(self, result_id: str, owner: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            dropped = self._evict(now)
+            handle = self._handles.get(result_id)
+            if handle is not None and handle["owner"] == owner:
+                handle["expires_at"] = now + self.config.TTL_SECONDS
+                self._handles.move_to_end(result_id)
+            else:
+                handle = None
+        self._release(dropped)
+        return handle
+
+    def _evict(self, now: float) -> list:
+        expired = [key for key, handle in self._handles.items() if handle["expires_at"] <= now]
+        return [self._handles.pop(key) for key in expired]
+
+    def _release(self, handles: list) -> None:
+        for handle in handles:
+            with handle["lock"]:
+                self._close_cursor(handle)
@@ -0,0 +1,154 @@
+"""
+Result Summarizer Module
+===============================================================================
+summarize_locally: deterministic, template-based sentences for simple results,
+so "how many invoices are overdue?" -> 42 does not need an LLM completion.
+
+Results cut off at a row limit (attrs["row_limit"]) always go to the LLM,
+whose digest marks them as partial; a local sentence would state them as
+the whole answer.
+
+Covered shapes (anything else returns None and goes to the LLM):
+- empty results
+- scalars (1x1), phrased from the question when it is a "how many" question
+- a single row with a few columns
+- a single column with a few rows (a list)
+- small grouped results: one label column and one numeric column
+
+Usage Example:
+    summary = summarize_locally("how many invoices are overdue?", df)
+    if summary is None:
+        summary = get_llm_response(question, df)
+"""
+import re
+from typing import Any, List, Optional
+
+import pandas as pd
+
+from src.utils.constant import SummaryConfig
+
+_AGGREGATE = re.compile(r"^\s*(count|sum|avg|average|min|max|total)\s*\(\s*(distinct\s+)?([^)]*)\)\s*$", re.IGNORECASE)
+_AGGREGATE_NAMES = {"avg": "average", "min": "minimum", "max": "maximum", "sum": "total", "total": "total"}
+_HOW_MANY = re.compile(r"^\s*how\s+many\s+(?P<rest>[^?.!]+)", re.IGNORECASE)
+_EXISTENCE = re.compile(r"^(?P<noun>.+?)\s+(are there|were there|do we have|exist|in total|altogether)$", re.IGNORECASE)
+_PREDICATE = re.compile(r"^(?P<noun>\w+(?:\s\w+)?)\s+(?P<verb>are|were)\s+(?P<pred>.+)$", re.IGNORECASE)
+
+
+def humanize_column(column: Any) -> str:
+    """
+    Readable label for a result column: "total_amount" -> "total amount",
+    "COUNT(*)" -> "count", "SUM(total_amount)" -> "total of total amount".
+    """
+    name = str(column).strip()
+    match = _AGGREGATE.match(name)
+    if match:
+        function = match.group(1).lower()
+        argument = match.group(3).strip().split(".")[-1]
+        if function == "count" or argument in ("", "*"):
+            return "count"
+        return f"{_AGGREGATE_NAMES.get(function, function)} of {humanize_column(argument)}"
+    name = re.sub(r"(?<=[a-z])(?=[A-Z])", " ", name.split(".")[-1])
+    return re.sub(r"[_\s]+", " ", name).strip().lower()
+
+
+def format_value(value: Any) -> str:
+    """
+    Thousands separators for numbers, two decimals for non-integral floats.
+    """
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return "no value"
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, int):
+        return f"{value:,}"
+    if isinstance(value, float):
+        return f"{value:,.0f}" if value.is_integer() else f"{value:,.2f}"
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def _join(items: List[str]) -> str:
+    return items[0] if len(items) == 1 else ", ".join(items[:-1]) + " and " + items[-1]
+
+
+def _singular(noun: str) -> str:
+    if noun.endswith("ies"):
+        return noun[:-3] + "y"
+    if noun.endswith("s") and not noun.endswith("ss"):
+        return noun[:-1]
+    return noun
+
+
+def _scalar_sentence(question: str, column: Any, value: Any) -> str:
+    if hasattr(value, "item"):
+        value = value.item()
+    label = humanize_column(column)
+    text = format_value(value)
+    how_many = _HOW_MANY.match(question or "")
+    is_count = isinstance(value, (int, float)) and not isinstance(value, bool) and float(value).is_integer()
+    if how_many and is_count:
+        rest = how_many.group("rest").strip()
+        existence = _EXISTENCE.match(rest)
+        if existence:
+            noun = existence.group("noun")
+            if value == 1:
+                return f"There is 1 {_singular(noun)}."
+            return f"There are {text} {noun}."
+        predicate = _PREDICATE.match(rest)
+        if predicate and value != 1:
+            return f"{text} {predicate.group('noun')} {predicate.group('verb')} {predicate.group('pred')}."
+        return f"The answer is {text} ({rest})."
+    return f"The {label} is {text}."
+
+
+def summarize_locally(question: str, result: Any, config: Optional[Any] = None) -> Optional[str]:
+    """
+    Return a plain-English answer for simple result shapes, or None when the
+    result is complex enough to need the LLM.
+    """
+    config = config or SummaryConfig
+    if not config.LOCAL_ENABLED or not isinstance(result, pd.DataFrame):
+        return None
+    if "row_limit" in result.attrs:
+        return None
+    df = result
+    rows, cols = df.shape
+    if rows == 0:
+        return "No matching records were found."
+    if cols == 0:
+        return None
+
+    if rows == 1 and cols == 1:
+        return _scalar_sentence(question, df.columns[0], df.iat[0, 0])
+
+    if rows == 1 and cols <= config.MAX_ROW_COLUMNS:
+        parts = [f"the {humanize_column(col)} is {format_value(df.iat[0, i])}" for i, col in enumerate(df.columns)]
+        sentence = _join(parts)
+        return sentence[0].upper() + sentence[1:] + "."
+
+    if cols == 1 and rows <= config.MAX_LIST_ROWS:
+        values = [format_value(value) for value in df.iloc[:, 0]]
+        return f"There are {rows} results for {humanize_column(df.columns[0])}: {_join(values)}."
+
+    if cols == 2 and rows <= config.MAX_GROUP_ROWS:
+        numeric = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])]
+        if len(numeric) != 1:
+            return None
+        value_col = numeric[0]
+        label_col = next(col for col in df.columns if col != value_col)
+        pairs = [f"{format_value(label)}: {format_value(value)}" for label, value in zip(df[label_col], df[value_col])]
+        sentence = f"The {humanize_column(value_col)} by {humanize_column(label_col)} is {'; '.join(pairs)}."
+        values = pd.to_numeric(df[value_col], errors="coerce")
+        if values.notna().sum() > 1 and values.max() != values.min():
+            top = df.loc[values.idxmax()]
+            bottom = df.loc[values.idxmin()]
+            sentence += (
+                f" The highest is {format_value(top[label_col])} ({format_value(top[value_col])})"
+                f" and the lowest is {format_value(bottom[label_col])} ({format_value(bottom[value_col])})."
+            )
+        return sentence
+
+    return None
@@ -0,0 +1,511 @@
+"""
+Rollups Module
+===============================================================================
+Materialized summary tables over Invoice, Payment and TimeEntry, kept current
+by triggers, and a rewriter that answers matching aggregate queries from them.
+
+A rollup groups its base table by a few dimensions (plain columns, or a month
+bucket `strftime('%Y-%m', <date column>)`) and stores, per group, the row
+count `_rollup_n` and for every measure column its sum `_rollup_s_<col>` and
+non-null count `_rollup_n_<col>` (prefixed so no query alias can shadow them).
+Those are additive, so AFTER INSERT/UPDATE/DELETE triggers maintain the rollup
+incrementally. Counts stay exact; sums of REAL measures are added and
+subtracted on every write and drift in the last digits (e.g. 653.1 against
+653.1000000000006 after a few hundred updates), so schedule
+`RollupManager.rebuild()` (`python -m src.mcp.rollups rebuild`), which
+recomputes them from scratch.
+
+RollupRewriter rewrites a query when it reads one base table, has no join,
+subquery, DISTINCT or window, and touches base columns only as:
+- dimensions (anywhere: select list, WHERE, GROUP BY, HAVING, ORDER BY);
+- `strftime('%Y-%m', <date>)` or `strftime('%Y', <date>)` of a month dimension;
+- measures inside COUNT, SUM, TOTAL or AVG (COUNT(*) included).
+Because every predicate is on group keys and every aggregate is decomposable,
+the rewritten query returns the same groups and counts, and the same sums up
+to that floating-point drift. Unaliased select items keep their original text
+as the column label. A select alias naming a rollup-only column (a month
+bucket or an internal column) is not rewritten, as HAVING and WHERE would
+resolve it to the column instead of the alias.
+
+Usage Example:
+    RollupManager(writer_engine).install()
+    rewriter = RollupRewriter(reader_engine)
+    rewriter.rewrite("SELECT customer_id, SUM(amount) FROM Invoice GROUP BY customer_id")
+    # ('SELECT "customer_id", CASE WHEN SUM("_rollup_n_amount") > 0 THEN SUM("_rollup_s_amount") END AS "SUM(amount)"
+    #   FROM "rollup_invoice_monthly" GROUP BY "customer_id"', 'rollup_invoice_monthly')
+"""
+import argparse
+import logging
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from src.utils.constant import RollupConfig
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(
+    r"(?P<skip>\s+|--[^\n]*|/\*.*?(?:\*/|$))"
+    r"|(?P<string>'(?:[^']|'')*')"
+    r"|(?P<quoted>\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\])"
+    r"|(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)"
+    r"|(?P<word>[A-Za-z_][\w$]*)"
+    r"|(?P<op><=|>=|==|!=|<>|\|\|)"
+    r"|(?P<other>.)",
+    re.DOTALL,
+)
+_KEYWORDS = {
+    "select", "from", "where", "group", "order", "by", "having", "limit", "offset", "as", "and", "or", "not",
+    "in", "is", "null", "between", "like", "glob", "escape", "case", "when", "then", "else", "end", "asc",
+    "desc", "nulls", "first", "last", "collate", "nocase", "cast", "true", "false",
+}
+# Anything that can change rows or row multiplicity beyond one grouped table
+_UNSUPPORTED = {"join", "union", "intersect", "except", "distinct", "over", "window", "with", "values", "natural"}
+_CLAUSES = {"where", "group", "having", "order", "limit"}
+
+
+class Dimension(NamedTuple):
+    name: str
+    column: str
+    # "month" buckets a date column as strftime('%Y-%m', column)
+    grain: Optional[str] = None
+
+    def expression(self, prefix: str = "") -> str:
+        if self.grain == "month":
+            return f"strftime('%Y-%m', {prefix}\"{self.column}\")"
+        return f'{prefix}"{self.column}"'
+
+
+class Rollup(NamedTuple):
+    name: str
+    base: str
+    dimensions: Tuple[Dimension, ...]
+    measures: Tuple[str, ...]
+
+    def key_condition(self, prefix: str) -> str:
+        return " AND ".join(f'"{d.name}" IS {d.expression(prefix)}' for d in self.dimensions)
+
+
+DEFAULT_ROLLUPS = (
+    Rollup("rollup_invoice_monthly", "Invoice",
+           (Dimension("customer_id", "customer_id"), Dimension("status", "status"),
+            Dimension("issue_month", "issue_date", "month")),
+           ("amount", "tax_amount", "total_amount")),
+    Rollup("rollup_payment_monthly", "Payment",
+           (Dimension("payment_method", "payment_method"), Dimension("payment_month", "payment_date", "month")),
+           ("amount",)),
+    Rollup("rollup_timeentry_monthly", "TimeEntry",
+           (Dimension("project_id", "project_id"), Dimension("employee_id", "employee_id"),
+            Dimension("billable", "billable"), Dimension("entry_month", "date", "month")),
+           ("hours",)),
+)
+
+
+def _base_columns(conn: Any, table: str) -> Dict[str, str]:
+    rows = conn.execute(text(f'PRAGMA table_info("{table}")')).fetchall()
+    return {row[1].lower(): row[2] or "" for row in rows}
+
+
+def _column_names(rollup: Rollup) -> List[str]:
+    return ([f'"{d.name}"' for d in rollup.dimensions] + ["_rollup_n"]
+            + [f'"_rollup_s_{m}", "_rollup_n_{m}"' for m in rollup.measures])
+
+
+def _affinity(declared: str) -> str:
+    """
+    SQLite's type affinity for a declared column type (which may be e.g. "ENUM('A', 'B')").
+    """
+    declared = declared.upper()
+    if "INT" in declared:
+        return "INTEGER"
+    if any(part in declared for part in ("CHAR", "CLOB", "TEXT")):
+        return "TEXT"
+    if not declared or "BLOB" in declared:
+        return ""
+    if any(part in declared for part in ("REAL", "FLOA", "DOUB")):
+        return "REAL"
+    return "NUMERIC"
+
+
+class RollupManager:
+    """
+    Creates rollup tables and their maintenance triggers, and rebuilds them.
+
+    Args:
+        engine: Writable SQLAlchemy engine (DynamicDatabase().get_writer_engine()).
+        rollups: Rollup definitions (default: DEFAULT_ROLLUPS).
+    """
+
+    def __init__(self, engine: Any, rollups: Sequence[Rollup] = DEFAULT_ROLLUPS):
+        self.engine = engine
+        self.rollups = tuple(rollups)
+
+    def install(self, rebuild: bool = False) -> List[str]:
+        """
+        Install every rollup whose base table has the needed columns; new ones are built.
+        Returns the installed rollup names.
+        """
+        installed = []
+        with self.engine.begin() as conn:
+            for rollup in self.rollups:
+                columns = _base_columns(conn, rollup.base)
+                needed = {d.column.lower() for d in rollup.dimensions} | {m.lower() for m in rollup.measures}
+                if not needed <= set(columns):
+                    logger.info("Skipping rollup %s: %s lacks the needed columns", rollup.name, rollup.base)
+                    continue
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": rollup.name}
+                ).fetchone()
+                if exists and "_rollup_n" not in _base_columns(conn, rollup.name):
+                    # Built by an older layout: recreate it with its triggers
+                    self._drop(conn, rollup)
+                    exists = None
+                self._create(conn, rollup, columns)
+                if rebuild or not exists:
+                    self._rebuild(conn, rollup)
+                installed.append(rollup.name)
+        return installed
+
+    def rebuild(self) -> None:
+        """
+        Recompute every installed rollup from its base table.
+        """
+        with self.engine.begin() as conn:
+            for rollup in self.rollups:
+                if conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                {"name": rollup.name}).fetchone():
+                    self._rebuild(conn, rollup)
+
+    def drop(self) -> None:
+        with self.engine.begin() as conn:
+            for rollup in self.rollups:
+                self._drop(conn, rollup)
+
+    @staticmethod
+    def _drop(conn: Any, rollup: Rollup) -> None:
+        for suffix in ("ai", "ad", "au"):
+            conn.execute(text(f'DROP TRIGGER IF EXISTS "{rollup.name}_{suffix}"'))
+        conn.execute(text(f'DROP TABLE IF EXISTS "{rollup.name}"'))
+
+    @staticmethod
+    def _create(conn: Any, rollup: Rollup, columns: Dict[str, str]) -> None:
+        # Dimensions keep the base column's declared type, so literals compare with the same affinity
+        dims = [f'"{d.name}" {"TEXT" if d.grain else _affinity(columns[d.column.lower()])}'.strip() for d in rollup.dimensions]
+        measures = [f'"_rollup_s_{m}", "_rollup_n_{m}" INTEGER NOT NULL' for m in rollup.measures]
+        conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{rollup.name}" ({", ".join(dims)}, _rollup_n INTEGER NOT NULL, {", ".join(measures)})'
+        ))
+        keys = ", ".join(f'"{d.name}"' for d in rollup.dimensions)
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS "{rollup.name}_keys" ON "{rollup.name}" ({keys})'))
+
+        names = _column_names(rollup)
+        seed = ", ".join([d.expression("NEW.") for d in rollup.dimensions] + ["0"] + ["0, 0"] * len(rollup.measures))
+        add = ", ".join(["_rollup_n = _rollup_n + 1"] + [
+            f'"_rollup_s_{m}" = "_rollup_s_{m}" + COALESCE(NEW."{m}", 0), '
+            f'"_rollup_n_{m}" = "_rollup_n_{m}" + (NEW."{m}" IS NOT NULL)'
+            for m in rollup.measures
+        ])
+        remove = ", ".join(["_rollup_n = _rollup_n - 1"] + [
+            f'"_rollup_s_{m}" = "_rollup_s_{m}" - COALESCE(OLD."{m}", 0), '
+            f'"_rollup_n_{m}" = "_rollup_n_{m}" - (OLD."{m}" IS NOT NULL)'
+            for m in rollup.measures
+        ])
+        insert_new = (
+            f'INSERT INTO "{rollup.name}" ({", ".join(names)}) SELECT {seed} '
+            f'WHERE NOT EXISTS (SELECT 1 FROM "{rollup.name}" WHERE {rollup.key_condition("NEW.")}); '
+            f'UPDATE "{rollup.name}" SET {add} WHERE {rollup.key_condition("NEW.")};'
+        )
+        delete_old = (
+            f'UPDATE "{rollup.name}" SET {remove} WHERE {rollup.key_condition("OLD.")}; '
+            f'DELETE FROM "{rollup.name}" WHERE _rollup_n = 0 AND {rollup.key_condition("OLD.")};'
+        )
+        for suffix, event, body in (("ai", "INSERT", insert_new), ("ad", "DELETE", delete_old),
+                                    ("au", "UPDATE", delete_old + " " + insert_new)):
+            conn.execute(text(
+                f'CREATE TRIGGER IF NOT EXISTS "{rollup.name}_{suffix}" AFTER {event} ON "{rollup.base}" '
+                f"BEGIN {body} END"
+            ))
+
+    @staticmethod
+    def _rebuild(conn: Any, rollup: Rollup) -> None:
+        names = _column_names(rollup)
+        dims = [d.expression() for d in rollup.dimensions]
+        aggregates = ["COUNT(*)"] + [f'COALESCE(SUM("{m}"), 0), COUNT("{m}")' for m in rollup.measures]
+        conn.execute(text(f'DELETE FROM "{rollup.name}"'))
+        conn.execute(text(
+            f'INSERT INTO "{rollup.name}" ({", ".join(names)}) '
+            f'SELECT {", ".join(dims + aggregates)} FROM "{rollup.base}" GROUP BY {", ".join(dims)}'
+        ))
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class RollupRewriter:
+    """
+    Rewrites aggregate queries to read from installed rollups.
+
+    Args:
+        engine: SQLAlchemy engine of the queried database.
+        rollups: Rollup definitions (default: DEFAULT_ROLLUPS).
+        config: Configuration object (default: RollupConfig).
+    """
+
+    def __init__(self, engine: Any, rollups: Sequence[Rollup] = DEFAULT_ROLLUPS, config: Optional[Any] = None):
+        self.engine = engine
+        self.rollups = tuple(rollups)
+        self.config = config or RollupConfig
+        self._installed: Dict[str, Rollup] = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def installed(self) -> Dict[str, Rollup]:
+        """
+        Rollups with their table and all three triggers present, by lower-case base table.
+        """
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.config.CHECK_SECONDS:
+                return self._installed
+        try:
+            with self.engine.connect() as conn:
+                names = {row[0] for row in conn.execute(
+                    text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE 'rollup%'")
+                )}
+        except Exception:
+            names = set()
+        installed = {
+            rollup.base.lower(): rollup for rollup in self.rollups
+            if {rollup.name} | {f"{rollup.name}_{suffix}" for suffix in ("ai", "ad", "au")} <= names
+        }
+        with self._lock:
+            self._installed, self._checked_at = installed, time.monotonic()
+        return installed
+
+    def rewrite(self, sql: str) -> Optional[Tuple[str, str]]:
+        """
+        (rewritten SQL, rollup name), or None when `sql` cannot be answered from a rollup.
+        """
+        installed = self.installed()
+        if not installed or not sql:
+            return None
+        tokens = [(m.group(0), m.lastgroup, m.start(), m.end()) for m in _TOKEN.finditer(sql) if m.lastgroup != "skip"]
+        while tokens and tokens[-1][0] == ";":
+            tokens.pop()
+        words = [token.lower() for token, _, _, _ in tokens]
+        if not words or words[0] != "select" or words.count("select") != 1 or _UNSUPPORTED & set(words):
+            return None
+        try:
+            return self._rewrite(sql, tokens, words, installed)
+        except _Unsupported:
+            return None
+
+    def _rewrite(self, sql: str, tokens: list, words: List[str], installed: Dict[str, Rollup]) -> Tuple[str, str]:
+        depth, from_at = 0, None
+        for i, token in enumerate(words):
+            depth += {"(": 1, ")": -1}.get(token, 0)
+            if depth == 0 and token == "from":
+                from_at = i
+                break
+        if from_at is None or from_at + 1 >= len(tokens):
+            raise _Unsupported
+        base = _identifier(tokens[from_at + 1])
+        rollup = installed.get((base or "").lower())
+        if rollup is None:
+            raise _Unsupported
+        position = from_at + 2
+        alias = None
+        if position < len(words) and words[position] == "as":
+            position += 1
+        if position < len(words) and words[position] not in _CLAUSES:
+            alias = _identifier(tokens[position])
+            if alias is None:
+                raise _Unsupported
+            position += 1
+        if position < len(words) and words[position] not in _CLAUSES:
+            raise _Unsupported
+
+        state = {
+            "rollup": rollup,
+            "qualifiers": {base.lower()} | ({alias.lower()} if alias else set()),
+            "dimensions": {d.name.lower(): d.name for d in rollup.dimensions if not d.grain},
+            "measures": {m.lower(): m for m in rollup.measures},
+            "derived": _derived(rollup),
+            "aliases": set(),
+            "aggregates": 0,
+        }
+
+        items, start, depth = [], 1, 0
+        for i in range(1, from_at + 1):
+            depth += {"(": 1, ")": -1}.get(words[i], 0)
+            if i == from_at or (depth == 0 and words[i] == ","):
+                items.append((start, i))
+                start = i + 1
+        # Aliases first: ORDER BY and HAVING may use them
+        parsed = []
+        for first, last in items:
+            item_alias = None
+            if last - first >= 3 and words[last - 2] == "as":
+                item_alias, last = tokens[last - 1], last - 2
+            elif last - first >= 2 and tokens[last - 1][1] in ("word", "quoted") and words[last - 2] == ")":
+                item_alias, last = tokens[last - 1], last - 1
+            if item_alias is not None:
+                name = (_identifier(item_alias) or "").lower()
+                if name.startswith("_rollup_") or name in {d.name.lower() for d in rollup.dimensions if d.grain}:
+                    # HAVING and WHERE would read the rollup column, not the alias
+                    raise _Unsupported
+                state["aliases"].add(name)
+            parsed.append((first, last, item_alias and item_alias[0]))
+
+        select = []
+        for first, last, item_alias in parsed:
+            if first >= last or words[last - 1] == "*":
+                raise _Unsupported
+            converted = self._convert(tokens, first, last, state)
+            if item_alias is not None:
+                converted += f" AS {item_alias}"
+            elif not self._is_column(tokens, first, last):
+                label = sql[tokens[first][2]:tokens[last - 1][3]]
+                converted += ' AS "' + label.replace('"', '""') + '"'
+            select.append(converted)
+
+        rest = self._convert(tokens, position, len(tokens), state)
+        if not state["aggregates"] and "group" not in words[position:]:
+            raise _Unsupported
+        rewritten = f'SELECT {", ".join(select)} FROM "{rollup.name}"' + (f" AS {alias}" if alias else "")
+        return (rewritten + (" " + rest if rest else ""), rollup.name)
+
+    def _is_column(self, tokens: list, first: int, last: int) -> bool:
+        """
+        Whether an item is a bare (possibly qualified) column, whose label SQLite takes from the column name.
+        """
+        return last - first == 1 or (last - first == 3 and tokens[first + 1][0] == ".")
+
+    def _convert(self, tokens: list, first: int, last: int, state: Dict[str, Any]) -> str:
+        out = []
+        i = first
+        while i < last:
+            token, kind, _, _ = tokens[i]
+            lowered = token.lower()
+            if kind == "word" and i + 1 < last and tokens[i + 1][0] == "(" and lowered not in _KEYWORDS:
+                close = _matching(tokens, i + 1, last)
+                if lowered in ("count", "sum", "total", "avg", "min", "max"):
+                    out.append(self._aggregate(lowered, tokens[i + 2:close], state))
+                    state["aggregates"] += 1
+                    i = close + 1
+                    continue
+                call = self._normalized_call(tokens[i:close + 1], state)
+                if call in state["derived"]:
+                    out.append(state["derived"][call])
+                    i = close + 1
+                    continue
+                out.extend([token, "("])
+                i += 2
+                continue
+            if kind in ("word", "quoted") and lowered not in _KEYWORDS:
+                name, qualifier, step = _identifier(tokens[i]), None, 1
+                if i + 2 < last and tokens[i + 1][0] == "." and tokens[i + 2][1] in ("word", "quoted"):
+                    qualifier, name, step = name, _identifier(tokens[i + 2]), 3
+                    if qualifier.lower() not in state["qualifiers"]:
+                        raise _Unsupported
+                if name.lower() in state["dimensions"]:
+                    out.append((f"{token}." if qualifier else "") + f'"{state["dimensions"][name.lower()]}"')
+                elif qualifier is None and name.lower() in state["aliases"]:
+                    out.append(token)
+                else:
+                    raise _Unsupported
+                i += step
+                continue
+            out.append(token)
+            i += 1
+        return " ".join(out)
+
+    def _aggregate(self, function: str, arguments: list, state: Dict[str, Any]) -> str:
+        texts = [token for token, _, _, _ in arguments]
+        if function == "count" and texts in (["*"], ["1"]):
+            return "COALESCE(SUM(_rollup_n), 0)"
+        if len(texts) == 3 and texts[1] == "." and texts[0].lower() in state["qualifiers"]:
+            arguments = arguments[2:]
+        if len(arguments) != 1 or arguments[0][1] not in ("word", "quoted"):
+            raise _Unsupported
+        measure = state["measures"].get((_identifier(arguments[0]) or "").lower())
+        if measure is None:
+            raise _Unsupported
+        if function == "count":
+            return f'COALESCE(SUM("_rollup_n_{measure}"), 0)'
+        if function == "sum":
+            return f'CASE WHEN SUM("_rollup_n_{measure}") > 0 THEN SUM("_rollup_s_{measure}") END'
+        if function == "total":
+            return f'TOTAL("_rollup_s_{measure}")'
+        if function == "avg":
+            return f'(SUM("_rollup_s_{measure}") * 1.0 / NULLIF(SUM("_rollup_n_{measure}"), 0))'
+        # MIN and MAX cannot be maintained through deletes
+        raise _Unsupported
+
+    @staticmethod
+    def _normalized_call(call: list, state: Dict[str, Any]) -> str:
+        parts, i = [], 0
+        while i < len(call):
+            token, kind, _, _ = call[i]
+            if kind in ("word", "quoted") and i + 1 < len(call) and call[i + 1][0] == "." \
+                    and (_identifier(call[i]) or "").lower() in state["qualifiers"]:
+                i += 2
+                continue
+            parts.append(token if kind == "string" else (_identifier(call[i]) or token).lower())
+            i += 1
+        return "".join(parts)
+
+
+def _identifier(token: tuple) -> Optional[str]:
+    value, kind = token[0], token[1]
+    if kind == "quoted":
+        return value[1:-1].replace('""', '"')
+    if kind == "word" and value.lower() not in _KEYWORDS:
+        return value
+    return None
+
+
+def _matching(tokens: list, open_at: int, last: int) -> int:
+    depth = 0
+    for i in range(open_at, last):
+        depth += {"(": 1, ")": -1}.get(tokens[i][0], 0)
+        if depth == 0:
+            return i
+    raise _Unsupported
+
+
+def _derived(rollup: Rollup) -> Dict[str, str]:
+    """
+    Normalized calls over the base table that a month dimension answers.
+    """
+    derived = {}
+    for dimension in rollup.dimensions:
+        if dimension.grain == "month":
+            column = dimension.column.lower()
+            derived[f"strftime('%Y-%m',{column})"] = f'"{dimension.name}"'
+            derived[f"strftime('%Y',{column})"] = f'substr("{dimension.name}", 1, 4)'
+    return derived
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from src.mcp.run_query import DynamicDatabase
+
+    parser = argparse.ArgumentParser(description="Install, rebuild or drop the rollup tables")
+    parser.add_argument("action", choices=["install", "rebuild", "drop"])
+    args = parser.parse_args(argv)
+    manager = RollupManager(DynamicDatabase().get_writer_engine())
+    if args.action == "install":
+        print(f"Installed: {', '.join(manager.install()) or 'none'}")
+    elif args.action == "rebuild":
+        manager.rebuild()
+    else:
+        manager.drop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,8 +6,24 @@ against a SQLite database using SQLAlchemy and pandas. It is designed for use in
 analysis pipelines where dynamic, thread-safe access to a database is required.
 
 Classes:
-    - DynamicDatabase: Singleton for managing the database engine connection.
+    - DynamicDatabase: Thread-safe singleton holding two SQLite engines: a pool of
+      read-only reader connections (mode=ro, query_only, mmap, page cache,
+      temp_store=memory) used for all chat queries, and a single writer connection
+      that owns WAL mode. Pooled connections stay open, so reads never re-open files.
     - DatabaseHandler: Executes SQL queries and returns results as pandas DataFrames or error messages.
+      `aexecute_query` runs the same work on a bounded thread pool for async callers.
+      Queries first pass the QueryGuard (src.mcp.query_guard), which may reject them,
+      add a LIMIT, or run them as a background job. DataFrame results are kept in a
+      ResultCache (src.mcp.result_cache) until the database changes. Rows are read
+      in chunks and kept up to ResultPageConfig.MAX_ROWS; `open_cursor` returns a
+      QueryCursor that reads later pages a slice at a time from one snapshot
+      (src.mcp.result_pages). Reads run under a QueryBudget
+      (src.mcp.query_budget): SQLite's progress handler stops them on a wall-clock
+      or VM-step limit, the request deadline, or cancellation, and the caller
+      gets a structured "query too expensive" reply. Aggregate queries over
+      Invoice, Payment and TimeEntry that a rollup table can answer are rewritten
+      to read it (src.mcp.rollups); the writer installs the rollups and their
+      maintenance triggers on first connect.
 
 Usage Example:
     handler = DatabaseHandler()
@@ -20,74 +36,364 @@ Usage Example:
 """
 
 import os
+import asyncio
+import logging
+import contextvars
+import pathlib
+import sqlite3
+import threading
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
-from typing import Union
+from sqlalchemy.pool import QueuePool
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Tuple, Union
+from src.utils.constant import DbSqlAlchemyConstant, QueryBudgetConfig, QueryGuardConfig, ResultCacheConfig, ResultPageConfig, RollupConfig, SQLitePoolConfig
+from src.mcp.query_guard import BACKGROUND, LIMIT, REJECT, QueryGuard, background_jobs, strip_sql_tail
+from src.mcp.query_budget import CancelToken, QueryBudget, cancel_scope, current_cancel_token, too_expensive
+from src.mcp.result_cache import ResultCache
+from src.mcp.rollups import RollupManager, RollupRewriter
+from src.mcp.telemetry import annotate, result_size, stage
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_query_executor() -> ThreadPoolExecutor:
+    """
+    Returns the process-wide bounded thread pool used for async query execution.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=DbSqlAlchemyConstant.executor_workers,
+                    thread_name_prefix="db-query",
+                )
+    return _executor
+
+def _apply_pragmas(conn: sqlite3.Connection, pragmas: Tuple[str, ...]) -> None:
+    cursor = conn.cursor()
+    for pragma in pragmas:
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+
+def create_sqlite_engines(db_path: str, config: Optional[Any] = None) -> Tuple[Any, Any]:
+    """
+    Build (reader_engine, writer_engine) for a SQLite file.
+
+    The writer is a pool of exactly one connection; it creates the file if needed
+    and switches it to WAL so readers never block on the writer. Readers open the
+    file with mode=ro and query_only, so LLM-generated SQL cannot modify data.
+    """
+    config = config or SQLitePoolConfig
+    tuning = (
+        f"mmap_size={config.MMAP_SIZE}",
+        f"cache_size={config.CACHE_SIZE}",
+        "temp_store=MEMORY",
+        f"busy_timeout={config.BUSY_TIMEOUT_MS}",
+    )
+
+    def open_writer():
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        _apply_pragmas(conn, ("journal_mode=WAL", f"synchronous={config.SYNCHRONOUS}") + tuning)
+        return conn
+
+    reader_uri = f"{pathlib.Path(db_path).resolve().as_uri()}?mode=ro"
+
+    def open_reader():
+        conn = sqlite3.connect(reader_uri, uri=True, check_same_thread=False)
+        _apply_pragmas(conn, ("query_only=ON",) + tuning)
+        return conn
+
+    writer = create_engine("sqlite://", creator=open_writer, poolclass=QueuePool, pool_size=1, max_overflow=0,
+                           pool_timeout=config.POOL_TIMEOUT)
+    # Opening the writer first creates the file and enables WAL before any reader connects
+    with writer.connect():
+        pass
+    reader = create_engine("sqlite://", creator=open_reader, poolclass=QueuePool, pool_size=config.READER_POOL_SIZE,
+                           max_overflow=config.READER_MAX_OVERFLOW, pool_timeout=config.POOL_TIMEOUT)
+    return reader, writer
+
 
 class DynamicDatabase:
     """
-    Singleton class to manage a dynamic database connection.
+    Thread-safe singleton holding the reader and writer engines.
     """
     _instance = None
+    _lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialized = False
+                    cls._instance = instance
         return cls._instance
 
     def __init__(self):
-        if getattr(self, '_initialized', False):
+        if self._initialized:
             return
-        self.engine = None
-        self.db_path = os.path.join('Database', 'manufacturing_projects.db')
-        # Ensure the Database directory exists
-        db_dir = os.path.dirname(self.db_path)
-        if db_dir and not os.path.exists(db_dir):
-            os.makedirs(db_dir, exist_ok=True)
-        self._initialized = True
+        with self._lock:
+            if self._initialized:
+                return
+            self.engine = None
+            self.writer_engine = None
+            self.db_path = SQLitePoolConfig.DB_FILE
+            # Ensure the Database directory exists
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir and not os.path.exists(db_dir):
+                os.makedirs(db_dir, exist_ok=True)
+            self._connect_lock = threading.Lock()
+            self._initialized = True
 
     def connect(self):
         """
-        Establishes a connection to the SQLite database.
+        Creates the reader pool and the writer connection, once, even under concurrent first use.
         """
-        if not self.engine:
+        if self.engine:
+            return
+        with self._connect_lock:
+            if self.engine:
+                return
             try:
-                self.engine = create_engine(f'sqlite:///{self.db_path}')
+                reader, writer = create_sqlite_engines(self.db_path)
             except Exception as e:
                 raise RuntimeError(f"Failed to connect to database: {e}")
+            if RollupConfig.AUTO_INSTALL:
+                try:
+                    RollupManager(writer).install()
+                except Exception as e:
+                    logging.warning(f"Rollup tables were not installed: {e}")
+            self.writer_engine = writer
+            self.engine = reader
 
     def get_engine(self):
         """
-        Returns the SQLAlchemy engine, connecting if necessary.
+        Returns the read-only SQLAlchemy engine used for queries, connecting if necessary.
         """
         if not self.engine:
             self.connect()
         return self.engine
 
+    def get_writer_engine(self):
+        """
+        Returns the single-connection engine for writes, connecting if necessary.
+        """
+        if not self.engine:
+            self.connect()
+        return self.writer_engine
+
+def _error_reply(error: Exception, budget: QueryBudget) -> dict:
+    if budget.reason is not None:
+        # pandas re-raises the "interrupted" error from the progress handler as its own DatabaseError
+        annotate(query_stopped=budget.reason, vm_steps=budget.steps)
+        return budget.response()
+    if isinstance(error, (SQLAlchemyError, sqlite3.Error)):
+        return {"message": f"Database error: {str(error)}"}
+    return {"error": f"Unexpected error: {str(error)}"}
+
+
+class QueryCursor:
+    """
+    An open statement on its own reader connection (detached from the pool),
+    read a slice at a time. SQLite keeps the statement's read snapshot until it
+    is closed, so the slices are consistent however the data changes meanwhile.
+    Each slice runs under its own QueryBudget.
+    """
+
+    def __init__(self, engine: Any, query: str, budget: Optional[QueryBudget] = None):
+        fairy = engine.raw_connection()
+        self._conn = fairy.driver_connection
+        fairy.detach()
+        self._lock = threading.Lock()
+        try:
+            with self._progress(budget or QueryBudget()):
+                self._cursor = self._conn.execute(query)
+        except Exception:
+            self._conn.close()
+            raise
+        self.columns = [column[0] for column in self._cursor.description or ()]
+
+    def fetch(self, count: int) -> Union[list, dict]:
+        """
+        Up to `count` more rows, or a message/error dict like execute_query's.
+        """
+        budget = QueryBudget()
+        try:
+            with self._lock, self._progress(budget):
+                return self._cursor.fetchmany(count)
+        except Exception as e:
+            return _error_reply(e, budget)
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._cursor.close()
+            finally:
+                self._conn.close()
+
+    @contextmanager
+    def _progress(self, budget: QueryBudget) -> Iterator[None]:
+        self._conn.set_progress_handler(budget.check, budget.interval)
+        try:
+            yield
+        finally:
+            self._conn.set_progress_handler(None, 0)
+
+
 class DatabaseHandler:
     """
     Handles execution of SQL queries using the dynamic database engine.
     """
-    def __init__(self):
-        self.engine = DynamicDatabase().get_engine()
+    def __init__(self, engine=None, guard=None, result_cache=None, rollups=None):
+        self.engine = engine or DynamicDatabase().get_engine()
+        # guard=False runs queries unchecked
+        if guard is None:
+            guard = QueryGuard(self.engine) if QueryGuardConfig.ENABLED else False
+        self.guard = guard or None
+        # result_cache=False always reads from the database
+        if result_cache is None:
+            result_cache = ResultCache(self.engine) if ResultCacheConfig.ENABLED and self.engine.dialect.name == "sqlite" else False
+        self.result_cache = result_cache or None
+        # rollups=False never rewrites aggregate queries
+        if rollups is None:
+            rollups = RollupRewriter(self.engine) if RollupConfig.ENABLED and self.engine.dialect.name == "sqlite" else False
+        self.rollups = rollups or None
 
     def execute_query(self, query: str) -> Union[pd.DataFrame, dict]:
         """
         Executes a SQL query and returns a DataFrame or error message.
         Returns:
             pd.DataFrame if query is successful and returns data,
-            dict with 'message' or 'error' otherwise.
+            dict with 'message' or 'error' otherwise; a query sent to the
+            background also carries its 'job_id', and one stopped for its cost
+            carries code "query_too_expensive".
         """
         if not query or not isinstance(query, str) or not query.strip():
             return {"message": "No valid SQL query provided."}
+        if self.result_cache is None:
+            return self._execute(query)
+
+        cached = self.result_cache.get(query)
+        if cached is not None:
+            annotate(result_cache="hit", **result_size(cached))
+            return cached
+        annotate(result_cache="miss")
+        version = self.result_cache.data_version()
+        result = self._execute(query)
+        self.result_cache.put(query, result, version)
+        return result
+
+    def open_cursor(self, query: str) -> Union[QueryCursor, dict]:
+        """
+        Open `query` as a QueryCursor for reading it a slice at a time, with the
+        same rollup rewrite and cost checks as execute_query. A query the guard
+        would reject or send to the background is refused with the guard's reason.
+        """
+        query = self._rewrite(query)
+        if self.guard is not None:
+            decision = self.guard.check(query)
+            if decision.action in (REJECT, BACKGROUND):
+                return too_expensive(decision.reason)
+            query = decision.sql
+        budget = QueryBudget()
         try:
-            df = pd.read_sql(sql=text(query), con=self.engine)
+            return QueryCursor(self.engine, query, budget)
+        except Exception as e:
+            return _error_reply(e, budget)
+
+    def _rewrite(self, query: str) -> str:
+        if self.rollups is not None:
+            rewritten = self.rollups.rewrite(query)
+            if rewritten is not None:
+                query, rollup = rewritten
+                annotate(rollup=rollup)
+        return query
+
+    def _execute(self, query: str) -> Union[pd.DataFrame, dict]:
+        query = self._rewrite(query)
+        if self.guard is None:
+            return self._read(query)
+
+        with stage("db_guard"):
+            decision = self.guard.check(query)
+        annotate(guard_action=decision.action, guard_cost=round(decision.cost))
+        if decision.action == REJECT:
+            return too_expensive(decision.reason)
+        if decision.action == BACKGROUND:
+            # Background jobs outlive the request: no deadline, cancellation or step limit
+            job_id = background_jobs.submit(query, lambda: self._read(
+                query, QueryBudget(seconds=QueryBudgetConfig.BACKGROUND_TIMEOUT_SECONDS, vm_steps=0)
+            ))
+            return {
+                "message": f"This query is expensive ({decision.reason}) and is running in the background as job {job_id}.",
+                "job_id": job_id,
+            }
+        result = self._read(decision.sql)
+        if decision.action == LIMIT and isinstance(result, pd.DataFrame):
+            result.attrs["row_limit"] = self.guard.config.ROW_LIMIT
+        return result
+
+    def _read(self, query: str, budget: Optional[QueryBudget] = None) -> Union[pd.DataFrame, dict]:
+        """
+        Run the query without the guard, within `budget` (default: the inline query budget).
+        """
+        budget = budget or QueryBudget()
+        try:
+            with stage("db_query"):
+                df = self._read_bounded(query, budget)
+            annotate(**result_size(df))
             if df.empty:
                 return {"message": "Query executed successfully but returned no data."}
             return df
-        except SQLAlchemyError as e:
-            return {"message": f"Database error: {str(e)}"}
         except Exception as e:
-            return {"error": f"Unexpected error: {str(e)}"}
\ No newline at end of file
+            return _error_reply(e, budget)
+
+    def _read_bounded(self, query: str, budget: QueryBudget) -> pd.DataFrame:
+        """
+        Read at most ResultPageConfig.MAX_ROWS rows, chunk by chunk; a cut result
+        carries attrs["row_limit"].
+        """
+        max_rows = ResultPageConfig.MAX_ROWS
+        chunks, rows = [], 0
+        with self.engine.connect() as conn, budget.attach(conn):
+            reader = pd.read_sql(sql=text(query), con=conn, chunksize=ResultPageConfig.CHUNK_ROWS)
+            try:
+                for chunk in reader:
+                    chunks.append(chunk)
+                    rows += len(chunk)
+                    if rows > max_rows:
+                        break
+            finally:
+                # Ends the statement when the rest of the rows are never read
+                reader.close()
+        df = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+        if len(df) > max_rows:
+            df = df.iloc[:max_rows].copy()
+            df.attrs["row_limit"] = max_rows
+        return df
+
+    async def aexecute_query(self, query: str) -> Union[pd.DataFrame, dict]:
+        """
+        Async variant of execute_query. The blocking read runs on the bounded
+        query thread pool so the event loop stays free; cancelling the awaiting
+        task also stops the query inside SQLite.
+        """
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        token = CancelToken(current_cancel_token())
+
+        def run():
+            with cancel_scope(token):
+                return self.execute_query(query)
+
+        try:
+            return await loop.run_in_executor(get_query_executor(), ctx.run, run)
+        except asyncio.CancelledError:
+            token.cancel()
+            raise
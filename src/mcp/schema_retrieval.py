@@ -0,0 +1,194 @@
+"""
+Schema Retrieval Module
+===============================================================================
+SchemaIndex: a local TF-IDF index over table names, column names and ENUM values
+that selects the tables relevant to a question, so SQL generation prompts only
+carry the part of the schema the LLM needs.
+
+Selected tables are expanded with their foreign-key neighbours in both
+directions (columns named like another table's primary key, e.g.
+Invoice.customer_id -> Customer, and the tables referencing a selected one),
+so joins and name lookups stay possible. The tables the previous turn's SQL
+read are always kept, so follow-ups can refer back to them. If nothing in the
+question matches well enough (e.g. a follow-up like "can you provide their
+names"), the full schema is returned unchanged.
+
+Usage Example:
+    index = SchemaIndex(DBConstant.db_schema)
+    subset = index.select("total unpaid invoices per customer")
+    # {'Invoice': '...', 'Customer': '...', 'Projects': '...', ...}
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set
+
+from src.utils.constant import SchemaRetrievalConfig
+
+_CAMEL = re.compile(r"(?<=[a-z])(?=[A-Z])")
+_TOKEN = re.compile(r"[a-z0-9]+")
+_ENUM = re.compile(r"ENUM\s*\((.*?)\)", re.IGNORECASE | re.DOTALL)
+_QUOTED = re.compile(r"'([^']*)'")
+_SQL_TABLE = re.compile(r"\b(?:FROM|JOIN)\s+[\"`\[]?(\w+)", re.IGNORECASE)
+
+# Everyday words users type for schema concepts
+SYNONYMS = {
+    "client": "customer", "clients": "customer", "company": "customer", "companies": "customer",
+    "staff": "employee", "worker": "employee", "workers": "employee", "people": "employee",
+    "revenue": "invoice", "billing": "invoice", "billed": "invoice", "bill": "invoice", "bills": "invoice",
+    "unpaid": "overdue", "outstanding": "overdue",
+    "timesheet": "time", "timesheets": "time", "logged": "hours",
+    "job": "project", "jobs": "project",
+    "todo": "task", "assignment": "task", "assignments": "task",
+    "team": "department", "teams": "department",
+    "paid": "payment",
+}
+_STOPWORDS = {
+    "the", "a", "an", "of", "for", "to", "in", "on", "by", "with", "and", "or", "is", "are",
+    "how", "many", "much", "what", "which", "who", "all", "me", "show", "list", "give", "get",
+    "id", "there", "their", "them", "can", "you", "provide", "each", "per",
+}
+
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("es") and token[-3] in "sxz":
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-case word tokens with camelCase/snake_case split, synonyms mapped and plurals stemmed.
+    """
+    text = _CAMEL.sub(" ", text or "").lower().replace("_", " ")
+    tokens = []
+    for token in _TOKEN.findall(text):
+        token = SYNONYMS.get(token, token)
+        for part in token.split():
+            if part not in _STOPWORDS:
+                tokens.append(_stem(part))
+    return tokens
+
+
+def split_columns(schema: str) -> List[str]:
+    """
+    Split a schema string on top-level commas (ENUM value lists contain commas).
+    """
+    columns, depth, current = [], 0, []
+    for char in schema:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(depth - 1, 0)
+        if char == "," and depth == 0:
+            columns.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if "".join(current).strip():
+        columns.append("".join(current).strip())
+    return columns
+
+
+class SchemaIndex:
+    """
+    TF-IDF index over a {table: schema string} mapping.
+
+    Args:
+        table_schemas: Mapping of table names to schema strings.
+        config: Configuration object (default: SchemaRetrievalConfig).
+    """
+
+    def __init__(self, table_schemas: Dict[str, str], config: Optional[object] = None):
+        self.config = config or SchemaRetrievalConfig
+        self.table_schemas = dict(table_schemas)
+        self.columns = {table: [col.split()[0] for col in split_columns(schema) if col.split()]
+                        for table, schema in self.table_schemas.items()}
+        self.neighbours = self._foreign_key_graph()
+        self.weights = self._build_weights()
+
+    def _foreign_key_graph(self) -> Dict[str, Set[str]]:
+        """
+        Map each table to the tables its foreign-key columns reference and the tables referencing it.
+        """
+        primary_keys = {}
+        for table, schema in self.table_schemas.items():
+            for column in split_columns(schema):
+                if "PRIMARY KEY" in column.upper():
+                    primary_keys[column.split()[0]] = table
+        graph = defaultdict(set)
+        for table, columns in self.columns.items():
+            for column in columns:
+                target = primary_keys.get(column)
+                if target and target != table:
+                    graph[table].add(target)
+                    graph[target].add(table)
+        return graph
+
+    def _table_tokens(self, table: str) -> Counter:
+        schema = self.table_schemas[table]
+        tokens = Counter()
+        for token in tokenize(table):
+            tokens[token] += self.config.TABLE_NAME_WEIGHT
+        for column in self.columns[table]:
+            tokens.update(tokenize(column))
+        for enum_body in _ENUM.findall(schema):
+            for value in _QUOTED.findall(enum_body):
+                tokens.update(tokenize(value))
+        return tokens
+
+    def _build_weights(self) -> Dict[str, Dict[str, float]]:
+        documents = {table: self._table_tokens(table) for table in self.table_schemas}
+        document_frequency = Counter()
+        for tokens in documents.values():
+            document_frequency.update(set(tokens))
+        total = len(documents)
+        weights = {}
+        for table, tokens in documents.items():
+            weights[table] = {
+                token: (1 + math.log(count)) * (math.log((1 + total) / (1 + document_frequency[token])) + 1)
+                for token, count in tokens.items()
+            }
+        return weights
+
+    def score(self, question: str) -> Dict[str, float]:
+        """
+        TF-IDF relevance of each table to `question`.
+        """
+        query = set(tokenize(question))
+        return {
+            table: sum(weights.get(token, 0.0) for token in query)
+            for table, weights in self.weights.items()
+        }
+
+    def tables_in(self, sql: Optional[str]) -> Set[str]:
+        """
+        Tables of this schema that `sql` reads (FROM and JOIN clauses).
+        """
+        by_name = {table.lower(): table for table in self.table_schemas}
+        return {by_name[name.lower()] for name in _SQL_TABLE.findall(sql or "") if name.lower() in by_name}
+
+    def select(self, question: str, previous_sql: Optional[str] = None) -> Dict[str, str]:
+        """
+        Return the subset of table_schemas relevant to `question`, plus their
+        foreign-key neighbours and the tables `previous_sql` (the last turn's SQL)
+        read. Falls back to the full mapping when no table matches well.
+        """
+        scores = self.score(question)
+        best = max(scores.values(), default=0.0)
+        if best < self.config.MIN_SCORE:
+            return dict(self.table_schemas)
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        selected = [
+            table for table in ranked[:self.config.MAX_TABLES]
+            if scores[table] >= best * self.config.MIN_SCORE_RATIO
+        ]
+        expanded = set(selected) | self.tables_in(previous_sql)
+        for table in selected:
+            expanded.update(self.neighbours.get(table, ()))
+        return {table: schema for table, schema in self.table_schemas.items() if table in expanded}
@@ -0,0 +1,140 @@
+"""
+Session Store Module
+===============================================================================
+SessionStore: per-user conversation state for the chat pipeline.
+
+Each authenticated user (keyed by their JWT identity) gets their own
+SQLHistory, so one user's questions never leak into another user's prompts.
+
+- Memory is bounded: sessions live in an LRU capped at `max_sessions`, and
+  sessions idle for longer than `idle_ttl_seconds` expire.
+- An optional SQLite backend persists histories, so sessions evicted from
+  memory (or lost on restart) are restored on the user's next request.
+
+Usage Example:
+    store = SessionStore()
+    history = store.get(user["email"])
+    sql_query, result = chatbot.run(question, history=history)
+    store.save(user["email"], history)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from src.mcp.sql_history import SQLHistory
+from src.utils.constant import SessionConfig
+
+
+class SessionStore:
+    """
+    LRU of per-user SQLHistory objects with idle expiry and an optional SQLite tier.
+
+    Args:
+        max_sessions: Maximum sessions kept in memory (default: config.MAX_SESSIONS).
+        idle_ttl_seconds: Idle time after which a session expires (default: config.IDLE_TTL_SECONDS).
+        db_path: SQLite file for persistence; falsy keeps sessions in memory only (default: config.DB_PATH).
+        config: Configuration object (default: SessionConfig).
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        idle_ttl_seconds: Optional[float] = None,
+        db_path: Optional[str] = None,
+        config: Optional[Any] = None,
+    ):
+        self.config = config or SessionConfig
+        self.max_sessions = max_sessions or self.config.MAX_SESSIONS
+        self.idle_ttl_seconds = idle_ttl_seconds if idle_ttl_seconds is not None else self.config.IDLE_TTL_SECONDS
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        db_path = self.config.DB_PATH if db_path is None else db_path
+        if db_path:
+            self._conn = self._open_disk_tier(db_path)
+
+    @staticmethod
+    def _open_disk_tier(db_path: str) -> sqlite3.Connection:
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_sessions ("
+            "session_id TEXT PRIMARY KEY, entries TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        return conn
+
+    def get(self, session_id: str) -> SQLHistory:
+        """
+        Return the history for `session_id`, restoring it from disk or creating it if needed.
+        """
+        now = time.time()
+        with self._lock:
+            self._expire_idle(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                history = entry[0]
+            else:
+                history = self._load(session_id, now) or SQLHistory()
+            self._put(session_id, history, now)
+            return history
+
+    def save(self, session_id: str, history: SQLHistory) -> None:
+        """
+        Mark the session as active and persist it if the SQLite backend is enabled.
+        """
+        now = time.time()
+        with self._lock:
+            self._put(session_id, history, now)
+            self._persist(session_id, history, now)
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def _put(self, session_id: str, history: SQLHistory, now: float) -> None:
+        self._sessions[session_id] = (history, now)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            evicted_id, (evicted, last_seen) = self._sessions.popitem(last=False)
+            self._persist(evicted_id, evicted, last_seen)
+
+    def _expire_idle(self, now: float) -> None:
+        cutoff = now - self.idle_ttl_seconds
+        while self._sessions:
+            session_id, (_, last_seen) = next(iter(self._sessions.items()))
+            if last_seen > cutoff:
+                break
+            del self._sessions[session_id]
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM chat_sessions WHERE updated_at <= ?", (cutoff,))
+
+    def _load(self, session_id: str, now: float) -> Optional[SQLHistory]:
+        if self._conn is None:
+            return None
+        row = self._conn.execute(
+            "SELECT entries, updated_at FROM chat_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or row[1] <= now - self.idle_ttl_seconds:
+            return None
+        return SQLHistory(entries=json.loads(row[0]))
+
+    def _persist(self, session_id: str, history: SQLHistory, updated_at: float) -> None:
+        if self._conn is None:
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO chat_sessions(session_id, entries, updated_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(history.to_list(), default=str), updated_at),
+        )
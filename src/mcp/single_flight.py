@@ -0,0 +1,144 @@
+"""
+Single Flight Module
+===============================================================================
+SingleFlight: coalesces identical concurrent work. While a call for a given
+(stage, key) is in flight, later callers with the same key wait for it and
+receive its result (or its exception) instead of running the work again.
+
+Works for both threads (`do`) and asyncio tasks (`ado`). Async work runs in a
+shielded task, so a caller that disconnects does not cancel it for the others.
+Shared work runs under its own SharedCancelToken (src.mcp.query_budget) and
+without any one caller's request deadline: a query it starts is stopped only
+when every waiting caller has been cancelled or has gone away, and is otherwise
+bounded by the default query budget.
+Per-stage counters report how many calls ran and how many were coalesced.
+
+Usage Example:
+    flight = SingleFlight()
+    sql, shared = await flight.ado("sql", (tenant, normalize_question(q)),
+                                   lambda: generator.agenerate_sql_query(q, schemas))
+    flight.stats()  # {"sql": {"calls": 3, "executions": 1, "coalesced": 2}}
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from src.mcp.query_budget import SharedCancelToken, cancel_scope, current_cancel_token
+from src.mcp.resilient_llm import request_deadline
+
+
+class _Call:
+    __slots__ = ("event", "value", "error", "token")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        self.token = SharedCancelToken()
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls sharing a (stage, key).
+
+    Both `do` and `ado` return (value, shared); `shared` is True when the caller
+    received another caller's result.
+
+    Args:
+        enabled: When False every call runs its own work (metrics are still kept).
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, Hashable], _Call] = {}
+        self._tasks: Dict[Tuple[str, Hashable, int], Tuple[asyncio.Future, SharedCancelToken]] = {}
+        self._metrics = defaultdict(lambda: {"calls": 0, "executions": 0, "coalesced": 0})
+
+    def _count(self, stage: str, leader: bool) -> None:
+        metrics = self._metrics[stage]
+        metrics["calls"] += 1
+        metrics["executions" if leader else "coalesced"] += 1
+
+    def do(self, stage: str, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run `fn()` unless an identical call is already running in another thread.
+        """
+        if not self.enabled:
+            with self._lock:
+                self._count(stage, True)
+            return fn(), False
+        flight_key = (stage, key)
+        with self._lock:
+            call = self._calls.get(flight_key)
+            leader = call is None
+            if leader:
+                call = self._calls[flight_key] = _Call()
+            self._count(stage, leader)
+            call.token.join(current_cancel_token())
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            with cancel_scope(call.token), request_deadline(None):
+                call.value = fn()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(flight_key, None)
+            call.event.set()
+        return call.value, False
+
+    async def ado(self, stage: str, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Await `factory()` unless an identical call is already in flight on this loop.
+        """
+        if not self.enabled:
+            with self._lock:
+                self._count(stage, True)
+            return await factory(), False
+        loop = asyncio.get_running_loop()
+        flight_key = (stage, key, id(loop))
+        with self._lock:
+            entry = self._tasks.get(flight_key)
+            leader = entry is None
+            if leader:
+                token = SharedCancelToken()
+                entry = self._tasks[flight_key] = (asyncio.ensure_future(self._shared(factory, token)), token)
+                entry[0].add_done_callback(lambda done: self._forget(flight_key, done))
+            task, token = entry
+            waiter = token.join(current_cancel_token())
+            self._count(stage, leader)
+        try:
+            return await asyncio.shield(task), not leader
+        except asyncio.CancelledError:
+            waiter.cancel()
+            raise
+
+    @staticmethod
+    async def _shared(factory: Callable[[], Awaitable[Any]], token: SharedCancelToken) -> Any:
+        with cancel_scope(token), request_deadline(None):
+            return await factory()
+
+    def _forget(self, flight_key, task) -> None:
+        with self._lock:
+            if self._tasks.get(flight_key, (None,))[0] is task:
+                del self._tasks[flight_key]
+        if not task.cancelled():
+            # Mark the exception retrieved; every waiter re-raises it from the shield.
+            task.exception()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {stage: dict(metrics) for stage, metrics in self._metrics.items()}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._metrics.clear()
@@ -0,0 +1,104 @@
+"""
+SQL History Module
+===============================================================================
+SQLHistory: a compact conversation history for SQL generation.
+
+Each turn is stored as a (question, generated SQL, row count) entry instead of
+the full prompt, and `render()` trims the history to a token budget using a
+local token estimator, newest turns first. This keeps the system prompt small
+no matter how long the conversation runs.
+
+Usage Example:
+    history = SQLHistory(token_budget=400)
+    history.add("how many employees are there", "SELECT COUNT(*) FROM Employee")
+    history.set_row_count("SELECT COUNT(*) FROM Employee", 1)
+    system_context = history.render()
+"""
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src.utils.constant import History_Approach
+
+_WORD = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough BPE token count: one token per punctuation mark and per ~4 characters of each word.
+    """
+    return sum(max(1, (len(piece) + 3) // 4) for piece in _WORD.findall(text or ""))
+
+
+class SQLHistory:
+    """
+    Bounded history of (question, sql, row_count) turns.
+
+    Args:
+        token_budget: Maximum estimated tokens of rendered history (default: History_Approach.HISTORY_TOKEN_BUDGET).
+        max_turns: Maximum turns retained (default: History_Approach.HISTORY_SIZE).
+        entries: Optional initial entries, as produced by `to_list()`.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, max_turns: Optional[int] = None, entries: Optional[Iterable[Dict[str, Any]]] = None):
+        self.token_budget = token_budget or History_Approach.HISTORY_TOKEN_BUDGET
+        self.max_turns = max_turns or History_Approach.HISTORY_SIZE
+        self._entries = deque(maxlen=self.max_turns)
+        for entry in entries or ():
+            self.add(entry.get("question", ""), entry.get("sql"), entry.get("row_count"))
+
+    def add(self, question: str, sql: Optional[str], row_count: Optional[int] = None) -> None:
+        self._entries.append({"question": (question or "").strip(), "sql": sql, "row_count": row_count})
+
+    def set_row_count(self, sql: str, row_count: Optional[int]) -> None:
+        """
+        Record how many rows `sql` returned on the most recent turn that generated it.
+        """
+        for entry in reversed(self._entries):
+            if entry["sql"] == sql:
+                entry["row_count"] = row_count
+                return
+
+    @staticmethod
+    def format_entry(entry: Dict[str, Any]) -> str:
+        lines = [f"Q: {entry['question']}", f"SQL: {entry['sql'] or 'NO_SQL'}"]
+        if entry.get("row_count") is not None:
+            lines.append(f"Rows: {entry['row_count']}")
+        return "\n".join(lines)
+
+    def render(self, max_turns: Optional[int] = None) -> str:
+        """
+        Newest turns (at most `max_turns`) that fit in the token budget, oldest first.
+        """
+        kept, used = [], 0
+        for entry in reversed(self._entries):
+            if max_turns is not None and len(kept) >= max_turns:
+                break
+            text = self.format_entry(entry)
+            cost = estimate_tokens(text)
+            if used + cost > self.token_budget:
+                break
+            kept.append(text)
+            used += cost
+        return "\n\n".join(reversed(kept)) if kept else "(no previous queries)"
+
+    def last_sql(self) -> Optional[str]:
+        """
+        SQL of the most recent turn that generated one.
+        """
+        for entry in reversed(self._entries):
+            if entry["sql"]:
+                return entry["sql"]
+        return None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [dict(entry) for entry in self._entries]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.to_list())
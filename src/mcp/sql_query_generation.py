@@ -8,11 +8,32 @@ MCP Format: Modular, Configurable, Pluggable.
 """
 import re
 import os
+import json
 import logging
-from openai import OpenAI, OpenAIError
-from src.utils.constant import OpenAIConfig, Constants, DbSqlAlchemyConstant, DBConstant
+from openai import OpenAIError
+from src.utils.constant import OpenAIConfig, Constants, DbSqlAlchemyConstant, DBConstant, SchemaRetrievalConfig, FewShotConfig
+from src.mcp.query_cache import schema_fingerprint
+from src.mcp.schema_retrieval import SchemaIndex
+from src.mcp.llm_backend import create_llm_client
+from src.mcp.resilient_llm import guard_async_llm, guard_llm
+from src.mcp.sql_history import SQLHistory
 
 
+FUSED_PLAN_SCHEMA = {
+    "name": "chat_plan",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "intent": {"type": "string", "enum": ["GREETING", "QUESTION"]},
+            "sql": {"type": ["string", "null"]},
+            "output_type": {"type": "string", "enum": ["text", "table", "plot"]},
+        },
+        "required": ["intent", "sql", "output_type"],
+        "additionalProperties": False,
+    },
+}
+
 
 class SQLQueryGenerator:
     """
@@ -25,17 +46,30 @@ class SQLQueryGenerator:
         config=None,
         logger=None,
         chat_history=None,
+        cache=None,
+        async_llm_client=None,
+        prune_schema=None,
+        example_index=None,
     ):
         """
         Args:
-            llm_client: LLM client instance (default: OpenAI with API key from config)
+            llm_client: LLM client instance (default: the configured LLM backend, see src.mcp.llm_backend)
             config: Configuration object (default: OpenAIConfig)
             logger: Logger instance (default: module logger)
-            chat_history: Optional initial chat history (default: empty list)
+            chat_history: Optional initial SQLHistory, or a list of its entries (default: empty history)
+            cache: Optional SQLQueryCache; a hit skips the LLM call (default: no caching)
+            async_llm_client: Async LLM client for the a* methods (default: the configured async backend, created on first use)
+            prune_schema: Send only the tables relevant to the question (default: SchemaRetrievalConfig.ENABLED)
+            example_index: Optional ExampleIndex; similar executed pairs replace most of the history in the prompt (default: none)
         """
         self.config = config or OpenAIConfig
-        self.client = llm_client or OpenAI(api_key=self.config.OpenAI_API_KEY)
-        self.db_chat_history = chat_history if chat_history is not None else []
+        self.client = guard_llm(llm_client or create_llm_client(api_key=self.config.OpenAI_API_KEY))
+        self.db_chat_history = chat_history if isinstance(chat_history, SQLHistory) else SQLHistory(entries=chat_history)
+        self.cache = cache
+        self._async_client = guard_async_llm(async_llm_client)
+        self.prune_schema = SchemaRetrievalConfig.ENABLED if prune_schema is None else prune_schema
+        self._schema_indexes = {}
+        self.example_index = example_index
         self.logger = logger or self._default_logger()
         self.logger.info("SQLQueryGenerator initialized with MCP format.")
 
@@ -55,33 +89,25 @@ class SQLQueryGenerator:
         logging.getLogger("httpx").disabled = True
         return logger
 
-    def generate_sql_query(self, natural_language_query, table_schemas):
+    def generate_sql_query(self, natural_language_query, table_schemas, history=None):
         """
         Generate an SQL query from a natural language query and table schemas.
 
         Args:
             natural_language_query (str): The user's question.
             table_schemas (dict): Mapping of table names to schema strings.
+            history (SQLHistory): Conversation history for this user (default: the generator's own).
 
         Returns:
             str or None: The generated SQL query, or None if not answerable.
         """
-        schema_info = "\n".join([f"Table {name}: {schema}" for name, schema in table_schemas.items()])
-        prompt = self._build_prompt(natural_language_query, schema_info)
-        self.logger.info(f"Natural Language Query: {natural_language_query}")
+        history = self._history(history)
+        prompt, cached_sql = self._prepare(natural_language_query, table_schemas, history)
+        if cached_sql:
+            return cached_sql
         try:
-            response = self.client.chat.completions.create(
-                model=self.config.OpenAI_model,
-                messages=self._build_messages(prompt),
-                max_tokens=self.config.OpenAI_max_tokens,
-                temperature=self.config.OpenAI_temperature,
-                top_p=self.config.OpenAI_top_p,
-                frequency_penalty=self.config.OpenAI_frequency_penalty,
-            )
-            result_response = self.clean_sql_query(response.choices[0].message.content.strip())
-            self.logger.info(f"Generated SQL Query: {result_response}")
-            self._update_history(prompt)
-            return result_response
+            response = self.client.chat.completions.create(**self._sql_request(prompt, history))
+            return self._finish_sql(natural_language_query, table_schemas, response, history)
         except OpenAIError as e:
             print(f"OpenAI API Error: {str(e)}")
             self.logger.error(f"OpenAI API Error: {str(e)}")
@@ -91,19 +117,249 @@ class SQLQueryGenerator:
             self.logger.error(f"Unexpected Error: {str(ex)}")
             return None
 
-    def _build_prompt(self, natural_language_query, schema_info):
+    async def agenerate_sql_query(self, natural_language_query, table_schemas, history=None):
+        """
+        Async variant of generate_sql_query using the AsyncOpenAI client, so the
+        event loop is not blocked while the completion is in flight.
+        """
+        history = self._history(history)
+        prompt, cached_sql = self._prepare(natural_language_query, table_schemas, history)
+        if cached_sql:
+            return cached_sql
+        try:
+            response = await self.async_client.chat.completions.create(**self._sql_request(prompt, history))
+            return self._finish_sql(natural_language_query, table_schemas, response, history)
+        except OpenAIError as e:
+            self.logger.error(f"OpenAI API Error: {str(e)}")
+            return None
+        except Exception as ex:
+            self.logger.error(f"Unexpected Error: {str(ex)}")
+            return None
+
+    def generate_fused_plan(self, natural_language_query, table_schemas, history=None):
+        """
+        Classify the input, generate SQL and pick an output type with a single
+        JSON-schema-constrained completion.
+
+        Args:
+            natural_language_query (str): The user's question.
+            table_schemas (dict): Mapping of table names to schema strings.
+            history (SQLHistory): Conversation history for this user (default: the generator's own).
+
+        Returns:
+            dict or None: {"intent", "sql", "output_type"}, or None if the call or
+            its response is invalid (callers fall back to the multi-call path).
+            On a cache hit, "output_type" is None.
+        """
+        history = self._history(history)
+        prompt, cached_sql = self._prepare(natural_language_query, table_schemas, history)
+        if cached_sql:
+            return {"intent": "QUESTION", "sql": cached_sql, "output_type": None}
+        try:
+            response = self.client.chat.completions.create(**self._fused_request(prompt, history))
+        except OpenAIError as e:
+            self.logger.error(f"OpenAI API Error (fused): {str(e)}")
+            return None
+        except Exception as ex:
+            self.logger.error(f"Unexpected Error (fused): {str(ex)}")
+            return None
+        return self._finish_plan(natural_language_query, table_schemas, response, history)
+
+    async def agenerate_fused_plan(self, natural_language_query, table_schemas, history=None):
+        """
+        Async variant of generate_fused_plan.
+        """
+        history = self._history(history)
+        prompt, cached_sql = self._prepare(natural_language_query, table_schemas, history)
+        if cached_sql:
+            return {"intent": "QUESTION", "sql": cached_sql, "output_type": None}
+        try:
+            response = await self.async_client.chat.completions.create(**self._fused_request(prompt, history))
+        except OpenAIError as e:
+            self.logger.error(f"OpenAI API Error (fused): {str(e)}")
+            return None
+        except Exception as ex:
+            self.logger.error(f"Unexpected Error (fused): {str(ex)}")
+            return None
+        return self._finish_plan(natural_language_query, table_schemas, response, history)
+
+    @property
+    def async_client(self):
+        """
+        Async LLM client, created on first use unless one was injected.
+        """
+        if self._async_client is None:
+            self._async_client = guard_async_llm(create_llm_client(is_async=True, api_key=self.config.OpenAI_API_KEY))
+        return self._async_client
+
+    def _history(self, history):
+        """
+        The explicit per-request history, or the generator's own for single-user use.
+        """
+        return self.db_chat_history if history is None else history
+
+    def _prepare(self, natural_language_query, table_schemas, history=None):
+        """
+        Build the prompt and consult the cache.
+        Returns (prompt, cached_sql); cached_sql is None on a miss.
+        """
+        self.logger.info(f"Natural Language Query: {natural_language_query}")
+        if self.cache is not None:
+            cached_sql = self.cache.get(natural_language_query, table_schemas, self.history_context(history))
+            if cached_sql:
+                self.logger.info(f"Generated SQL Query (cache hit): {cached_sql}")
+                self._update_history(natural_language_query, cached_sql, history)
+                return None, cached_sql
+        relevant_schemas = self.select_schemas(natural_language_query, table_schemas, history)
+        schema_info = "\n".join([f"Table {name}: {schema}" for name, schema in relevant_schemas.items()])
+        prompt = self._build_prompt(natural_language_query, schema_info, self.find_examples(natural_language_query))
+        return prompt, None
+
+    def find_examples(self, natural_language_query):
+        """
+        Past (question, SQL) pairs most similar to the question, from the example index.
+        """
+        if self.example_index is None:
+            return []
+        try:
+            return self.example_index.search(natural_language_query)
+        except Exception as e:
+            self.logger.warning(f"Few-shot example lookup failed: {e}")
+            return []
+
+    def select_schemas(self, natural_language_query, table_schemas, history=None):
+        """
+        Return the tables relevant to the question (plus their foreign-key
+        neighbours and the tables the last turn's SQL read), or all of
+        `table_schemas` when pruning is disabled. An empty mapping falls back
+        to DBConstant.db_schema.
+        """
+        table_schemas = table_schemas or DBConstant.db_schema
+        if not self.prune_schema:
+            return table_schemas
+        key = schema_fingerprint(table_schemas)
+        index = self._schema_indexes.get(key)
+        if index is None:
+            index = self._schema_indexes[key] = SchemaIndex(table_schemas)
+        return index.select(natural_language_query, self._history(history).last_sql())
+
+    def _sql_request(self, prompt, history):
+        """
+        Keyword arguments for the SQL generation completion.
+        """
+        return dict(
+            model=self.config.OpenAI_model,
+            messages=self._build_messages(prompt, history),
+            max_tokens=self.config.OpenAI_max_tokens,
+            temperature=self.config.OpenAI_temperature,
+            top_p=self.config.OpenAI_top_p,
+            frequency_penalty=self.config.OpenAI_frequency_penalty,
+        )
+
+    def _fused_request(self, prompt, history):
+        """
+        Keyword arguments for the fused completion.
+        """
+        return dict(
+            model=getattr(self.config, "OpenAI_fused_model", self.config.OpenAI_model),
+            messages=self._build_fused_messages(prompt, history),
+            max_tokens=self.config.OpenAI_max_tokens,
+            temperature=self.config.OpenAI_temperature,
+            top_p=self.config.OpenAI_top_p,
+            response_format={"type": "json_schema", "json_schema": FUSED_PLAN_SCHEMA},
+        )
+
+    def _finish_sql(self, natural_language_query, table_schemas, response, history):
+        """
+        Clean the completion, then record it in the history and cache.
+        """
+        result_response = self.clean_sql_query(response.choices[0].message.content.strip())
+        self.logger.info(f"Generated SQL Query: {result_response}")
+        if self.cache is not None:
+            self.cache.set(natural_language_query, table_schemas, result_response, self.history_context(history))
+        self._update_history(natural_language_query, result_response, history)
+        return result_response
+
+    def _finish_plan(self, natural_language_query, table_schemas, response, history):
+        """
+        Validate the fused completion, then record it in the history and cache.
+        """
+        plan = self.parse_fused_plan(response.choices[0].message.content)
+        if plan is None:
+            self.logger.warning("Fused plan response was invalid; falling back to the multi-call path.")
+            return None
+
+        self.logger.info(f"Generated SQL Query: {plan['sql']}")
+        if plan["intent"] == "QUESTION":
+            if self.cache is not None:
+                self.cache.set(natural_language_query, table_schemas, plan["sql"], self.history_context(history))
+            self._update_history(natural_language_query, plan["sql"], history)
+        return plan
+
+    def _build_fused_messages(self, prompt, history=None):
+        """
+        Build the message list for the fused call: the SQL messages plus the
+        classification and output-type instructions.
+        """
+        return self._build_messages(prompt, history)[:-1] + [
+            {
+                "role": "system",
+                "content": (
+                    "Respond with a JSON object:\n"
+                    "- intent: GREETING if the input is small talk, otherwise QUESTION\n"
+                    "- sql: the SQL query, or null for a greeting or if not answerable\n"
+                    "- output_type: 'text' for a single value or short answer, 'table' for "
+                    "row listings, 'plot' for trends, comparisons or distributions"
+                )
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
+    @classmethod
+    def parse_fused_plan(cls, content):
+        """
+        Validate the JSON returned by the fused call.
+        Returns the plan dict with a cleaned SQL query, or None if invalid.
+        """
+        try:
+            plan = json.loads(content or "")
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(plan, dict):
+            return None
+        intent = str(plan.get("intent", "")).upper()
+        output_type = str(plan.get("output_type", "")).lower()
+        if intent not in ("GREETING", "QUESTION") or output_type not in ("text", "table", "plot"):
+            return None
+        sql = plan.get("sql")
+        # The schema allows a string or null; anything else is a malformed plan
+        if sql is not None and not isinstance(sql, str):
+            return None
+        sql = cls.clean_sql_query(sql) if intent == "QUESTION" and sql else None
+        return {"intent": intent, "sql": sql, "output_type": output_type}
+
+    def _build_prompt(self, natural_language_query, schema_info, examples=None):
         """
-        Build the prompt for the LLM.
+        Build the prompt for the LLM, with similar past examples when available.
         """
+        example_block = ""
+        if examples:
+            example_block = "Examples of similar questions answered before:\n" + "\n\n".join(
+                f"Q: {example.question}\nSQL: {example.sql}" for example in examples
+            ) + "\n\n"
         return (
             f"You are an expert in SQL and use only {DbSqlAlchemyConstant.db_type} syntax.\n"
             "- If the query cannot be answered based on the schema, respond with \"NO_SQL\".\n"
-            f"Table Schemas:\n{DBConstant.db_schema }\n\n"
+            f"Table Schemas:\n{schema_info}\n\n"
+            f"{example_block}"
             f"Natural Language Query:\n{natural_language_query}\n\n"
             "SQL Query:\n"
         )
 
-    def _build_messages(self, prompt):
+    def _build_messages(self, prompt, history=None):
         """
         Build the message list for the LLM client.
         """
@@ -112,7 +368,7 @@ class SQLQueryGenerator:
                 "role": "system",
                 "content": (
                     "You are a professional SQL query generator. Use the user's input and schema context to generate a correct SQL query. "
-                    f"Use the following previous query history to maintain context:\n{self.db_chat_history}"
+                    f"Use the following previous query history to maintain context:\n{self._render_history(history)}"
                 )
             },
             {
@@ -132,15 +388,53 @@ class SQLQueryGenerator:
             }
         ]
 
-    def _update_history(self, prompt):
+    def _render_history(self, history=None):
+        """
+        Rendered conversation history. With an example index, similar examples
+        go in the prompt instead, so only the latest turns are kept for follow-ups.
+        """
+        if self.example_index is None:
+            return self._history(history).render()
+        return self._history(history).render(max_turns=FewShotConfig.HISTORY_TURNS)
+
+    def history_context(self, history=None):
         """
-        Update the chat history for context.
+        The history the prompt is built with, for the SQL cache key and for
+        coalescing: a follow-up only reuses SQL generated after the same previous turns.
+        Empty for a fresh conversation, so first questions are shared.
         """
-        self.db_chat_history.extend([
-            {"role": "user", "content": prompt},
-        ])
-        if len(self.db_chat_history) > 10:
-            self.db_chat_history = self.db_chat_history[-10:]
+        if not len(self._history(history)):
+            return ""
+        return self._render_history(history)
+
+    def _update_history(self, natural_language_query, sql_query, history=None):
+        """
+        Record the question and generated SQL (not the prompt) for context.
+        """
+        self._history(history).add(natural_language_query, sql_query)
+
+    def record_turn(self, natural_language_query, sql_query, history=None):
+        """
+        Record a turn whose SQL was produced elsewhere, e.g. by a coalesced request.
+        """
+        self._update_history(natural_language_query, sql_query, history)
+
+    def record_row_count(self, sql_query, row_count, history=None):
+        """
+        Attach the number of rows `sql_query` returned to its history entry.
+        """
+        self._history(history).set_row_count(sql_query, row_count)
+
+    def record_success(self, natural_language_query, sql_query):
+        """
+        Add a pair whose SQL executed successfully to the example index.
+        """
+        if self.example_index is None or not sql_query:
+            return
+        try:
+            self.example_index.add(natural_language_query, sql_query)
+        except Exception as e:
+            self.logger.warning(f"Could not index example: {e}")
 
     @staticmethod
     def clean_sql_query(query):
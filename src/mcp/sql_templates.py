@@ -0,0 +1,364 @@
+"""
+SQL Templates Module
+===============================================================================
+TemplateEngine: answers high-frequency questions from parametrized, vetted SQL
+templates without calling the LLM.
+
+Each IntentTemplate has one or more patterns with slots, e.g.
+"how many {invoice_status} invoices are there", and a SQL text with the same
+slots. A question matches when it fits a pattern and every captured slot
+resolves to a known value:
+- ValueIndex slots ("customer", "invoice_status", "sector", ...) resolve
+  against the distinct values of a column, loaded from the database (and the
+  ENUM lists in DBConstant.db_schema), case-insensitively;
+- "month" resolves "march 2024", "2024-03" or "march" (current year) to "YYYY-MM".
+
+The value index is loaded on first use and then refreshed every
+VALUE_REFRESH_SECONDS on a background thread, serving the previous values
+meanwhile, so a match never waits on the DISTINCT scans once loaded.
+
+Resolved values are rendered as escaped SQL literals, so the same question
+always produces the same SQL. Unmatched questions return None and go to the LLM.
+
+Usage Example:
+    engine = TemplateEngine(db_engine)
+    match = engine.match("How many overdue invoices are there?")
+    # TemplateMatch(name='count_invoices_by_status',
+    #               sql="SELECT COUNT(*) AS invoice_count FROM Invoice WHERE status = 'OVERDUE'",
+    #               output_type='text', params={'invoice_status': 'OVERDUE'})
+"""
+import datetime
+import json
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import text
+
+from src.mcp.schema_retrieval import _ENUM, _QUOTED, split_columns
+from src.utils.constant import DBConstant, TemplateConfig
+
+logger = logging.getLogger(__name__)
+
+_SLOT = re.compile(r"\{(\w+)\}")
+_SPACES = re.compile(r"\s+")
+_MONTHS = {
+    name: index
+    for index, names in enumerate(
+        [("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"), ("may",),
+         ("june", "jun"), ("july", "jul"), ("august", "aug"), ("september", "sep", "sept"),
+         ("october", "oct"), ("november", "nov"), ("december", "dec")],
+        start=1,
+    )
+    for name in names
+}
+
+# Slot name -> "Table.column" whose distinct values fill it
+SLOT_COLUMNS = {
+    "customer": "Customer.company_name",
+    "sector": "Customer.sector",
+    "project": "Projects.project_name",
+    "employee": "Employee.employee_name",
+    "department": "Department.department_name",
+    "invoice_status": "Invoice.status",
+    "task_status": "Task.status",
+    "task_priority": "Task.priority",
+    "payment_method": "Payment.payment_method",
+}
+# Everyday words for stored values, per slot
+VALUE_ALIASES = {
+    # "unpaid"/"outstanding" span SENT and OVERDUE; see the *_unpaid_invoices templates
+    "invoice_status": {"late": "OVERDUE", "settled": "PAID"},
+    "task_status": {"done": "COMPLETED", "finished": "COMPLETED", "ongoing": "IN_PROGRESS", "open": "IN_PROGRESS"},
+}
+
+
+class IntentTemplate(NamedTuple):
+    name: str
+    patterns: List[str]
+    sql: str
+    output_type: str = "table"
+
+
+class TemplateMatch(NamedTuple):
+    name: str
+    sql: str
+    output_type: str
+    params: Dict[str, str]
+
+
+DEFAULT_TEMPLATES = [
+    IntentTemplate(
+        "count_unpaid_invoices",
+        ["how many (unpaid|outstanding) invoices (are there|do we have|exist)",
+         "how many invoices are (unpaid|outstanding)",
+         "(number|count) of (unpaid|outstanding) invoices"],
+        "SELECT COUNT(*) AS invoice_count FROM Invoice WHERE status IN ('SENT', 'OVERDUE')",
+        "text",
+    ),
+    IntentTemplate(
+        "list_unpaid_invoices",
+        ["(list|show|show me|get) (all )?(the )?(unpaid|outstanding) invoices",
+         "which invoices are (unpaid|outstanding)"],
+        "SELECT invoice_number, customer_id, total_amount, status, issue_date, due_date FROM Invoice "
+        "WHERE status IN ('SENT', 'OVERDUE') ORDER BY due_date",
+    ),
+    IntentTemplate(
+        "count_invoices_by_status",
+        ["how many {invoice_status} invoices (are there|do we have|exist)",
+         "how many invoices are {invoice_status}",
+         "(number|count) of {invoice_status} invoices"],
+        "SELECT COUNT(*) AS invoice_count FROM Invoice WHERE status = {invoice_status}",
+        "text",
+    ),
+    IntentTemplate(
+        "list_invoices_by_status",
+        ["(list|show|show me|get) (all )?(the )?{invoice_status} invoices",
+         "which invoices are {invoice_status}"],
+        "SELECT invoice_number, customer_id, total_amount, issue_date, due_date FROM Invoice "
+        "WHERE status = {invoice_status} ORDER BY due_date",
+    ),
+    IntentTemplate(
+        "list_customer_invoices",
+        ["(list|show|show me|get) (all )?(the )?invoices (for|of|from) {customer}",
+         "what invoices (does|did) {customer} have"],
+        "SELECT i.invoice_number, i.total_amount, i.status, i.due_date FROM Invoice i "
+        "JOIN Customer c ON c.customer_id = i.customer_id WHERE c.company_name = {customer} ORDER BY i.issue_date",
+    ),
+    IntentTemplate(
+        "total_invoiced_to_customer",
+        ["(what is the )?total (amount )?invoiced (to|for) {customer}",
+         "how much (have we|did we) (invoiced|invoice|bill|billed) {customer}"],
+        "SELECT SUM(i.total_amount) AS total_invoiced FROM Invoice i "
+        "JOIN Customer c ON c.customer_id = i.customer_id WHERE c.company_name = {customer}",
+        "text",
+    ),
+    IntentTemplate(
+        "list_customer_projects",
+        ["(list|show|show me|get) (all )?(the )?projects (for|of|from) {customer}",
+         "what projects (does|did) {customer} have"],
+        "SELECT p.project_name, p.start_of_project, p.end_of_project FROM Projects p "
+        "JOIN Customer c ON c.customer_id = p.customer_id WHERE c.company_name = {customer} ORDER BY p.start_of_project",
+    ),
+    IntentTemplate(
+        "list_customers_in_sector",
+        ["(list|show|show me|get) (all )?(the )?customers in (the )?{sector}( sector)?",
+         "which customers are in (the )?{sector}( sector)?"],
+        "SELECT customer_id, company_name FROM Customer WHERE sector = {sector} ORDER BY company_name",
+    ),
+    IntentTemplate(
+        "count_tasks_by_status",
+        ["how many tasks are {task_status}",
+         "how many {task_status} tasks (are there|do we have)",
+         "(number|count) of {task_status} tasks"],
+        "SELECT COUNT(*) AS task_count FROM Task WHERE status = {task_status}",
+        "text",
+    ),
+    IntentTemplate(
+        "list_tasks_by_priority",
+        ["(list|show|show me|get) (all )?(the )?{task_priority} priority tasks",
+         "which tasks (are|have) {task_priority} priority"],
+        "SELECT task_id, title, status, due_date FROM Task WHERE priority = {task_priority} ORDER BY due_date",
+    ),
+    IntentTemplate(
+        "count_department_employees",
+        ["how many employees (are there |work )?in (the )?{department}( department)?"],
+        "SELECT COUNT(*) AS employee_count FROM Employee e "
+        "JOIN Department d ON d.department_id = e.department_id WHERE d.department_name = {department}",
+        "text",
+    ),
+    IntentTemplate(
+        "payments_in_month",
+        ["(list|show|show me|get) (all )?(the )?payments (received |made )?in {month}",
+         "which payments (were )?(received |made )?in {month}"],
+        "SELECT payment_id, invoice_id, amount, payment_date, payment_method FROM Payment "
+        "WHERE strftime('%Y-%m', payment_date) = {month} ORDER BY payment_date",
+    ),
+    IntentTemplate(
+        "total_payments_in_month",
+        ["(what is the )?total (amount of )?payments (received )?in {month}",
+         "how much (was|did we get) paid in {month}"],
+        "SELECT SUM(amount) AS total_payments FROM Payment WHERE strftime('%Y-%m', payment_date) = {month}",
+        "text",
+    ),
+]
+
+
+def normalize_text(value: str) -> str:
+    """
+    Lower-case, drop surrounding punctuation and collapse whitespace.
+    """
+    return _SPACES.sub(" ", (value or "").lower().replace("_", " ")).strip(" \t\n?.!,;:'\"")
+
+
+def sql_literal(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def parse_month(value: str, today: Optional[datetime.date] = None) -> Optional[str]:
+    """
+    "march 2024", "mar 2024", "2024-03" or "march" (current year) -> "2024-03".
+    """
+    value = normalize_text(value)
+    iso = re.fullmatch(r"(\d{4})-(\d{1,2})", value)
+    if iso and 1 <= int(iso.group(2)) <= 12:
+        return f"{int(iso.group(1)):04d}-{int(iso.group(2)):02d}"
+    named = re.fullmatch(r"([a-z]+)(?:,? (\d{4}))?", value)
+    if named and named.group(1) in _MONTHS:
+        year = int(named.group(2)) if named.group(2) else (today or datetime.date.today()).year
+        return f"{year:04d}-{_MONTHS[named.group(1)]:02d}"
+    return None
+
+
+class ValueIndex:
+    """
+    Normalized value -> stored value, per slot, from ENUM lists and the database.
+
+    Args:
+        engine: SQLAlchemy engine to read distinct values from (optional).
+        config: Configuration object (default: TemplateConfig).
+    """
+
+    def __init__(self, engine: Any = None, config: Optional[Any] = None):
+        self.engine = engine
+        self.config = config or TemplateConfig
+        self._values: Dict[str, Dict[str, str]] = {}
+        self._loaded_at = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """
+        True once values were read; later refreshes happen in the background.
+        """
+        return self._loaded_at is not None
+
+    def resolve(self, slot: str, value: str) -> Optional[str]:
+        if slot == "month":
+            return parse_month(value)
+        key = normalize_text(value)
+        if key.startswith("the "):
+            key = key[4:]
+        values = self._slot_values(slot)
+        return values.get(key) or values.get(VALUE_ALIASES.get(slot, {}).get(key, "").lower().replace("_", " "))
+
+    def refresh(self) -> None:
+        values = {}
+        for slot, column in SLOT_COLUMNS.items():
+            table, name = column.split(".")
+            stored = self._enum_values(table, name) + self._database_values(table, name)
+            values[slot] = {normalize_text(value): value for value in stored if value}
+        with self._lock:
+            self._values, self._loaded_at = values, time.monotonic()
+
+    def _slot_values(self, slot: str) -> Dict[str, str]:
+        """
+        Values for `slot`; the first call loads them, a stale index keeps serving while it refreshes.
+        """
+        with self._lock:
+            loaded = self._loaded_at is not None
+            stale = loaded and time.monotonic() - self._loaded_at >= self.config.VALUE_REFRESH_SECONDS
+            start = stale and not self._refreshing
+            if start:
+                self._refreshing = True
+        if not loaded:
+            self.refresh()
+        elif start:
+            threading.Thread(target=self._background_refresh, name="value-index-refresh", daemon=True).start()
+        return self._values.get(slot, {})
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    @staticmethod
+    def _enum_values(table: str, column: str) -> List[str]:
+        for definition in split_columns(DBConstant.db_schema.get(table, "")):
+            if definition.split() and definition.split()[0] == column:
+                return [value for body in _ENUM.findall(definition) for value in _QUOTED.findall(body)]
+        return []
+
+    def _database_values(self, table: str, column: str) -> List[str]:
+        if self.engine is None:
+            return []
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    text(f'SELECT DISTINCT "{column}" FROM "{table}" WHERE "{column}" IS NOT NULL LIMIT :limit'),
+                    {"limit": self.config.MAX_VALUES_PER_COLUMN},
+                ).fetchall()
+            return [str(row[0]) for row in rows]
+        except Exception as e:
+            logger.debug(f"Value index skipped {table}.{column}: {e}")
+            return []
+
+
+class TemplateEngine:
+    """
+    Matches questions against IntentTemplates and renders their SQL.
+
+    Args:
+        engine: SQLAlchemy engine for the value index (optional).
+        templates: Templates to use (default: DEFAULT_TEMPLATES plus config.TEMPLATES_PATH).
+        value_index: Shared ValueIndex (default: one built on `engine`).
+        config: Configuration object (default: TemplateConfig).
+    """
+
+    def __init__(
+        self,
+        engine: Any = None,
+        templates: Optional[List[IntentTemplate]] = None,
+        value_index: Optional[ValueIndex] = None,
+        config: Optional[Any] = None,
+    ):
+        self.config = config or TemplateConfig
+        self.templates = list(templates) if templates is not None else DEFAULT_TEMPLATES + self._load_templates()
+        self.values = value_index or ValueIndex(engine, self.config)
+        self._compiled = [
+            (template, re.compile(self._pattern_regex(pattern)))
+            for template in self.templates
+            for pattern in template.patterns
+        ]
+
+    def match(self, question: str) -> Optional[TemplateMatch]:
+        """
+        The first template whose pattern and slots all match, or None.
+        """
+        normalized = normalize_text(question)
+        for template, regex in self._compiled:
+            found = regex.fullmatch(normalized)
+            if not found:
+                continue
+            params = {}
+            for slot, raw in found.groupdict().items():
+                resolved = self.values.resolve(slot, raw)
+                if resolved is None:
+                    break
+                params[slot] = resolved
+            else:
+                sql = _SLOT.sub(lambda slot: sql_literal(params[slot.group(1)]), template.sql)
+                return TemplateMatch(template.name, sql, template.output_type, params)
+        return None
+
+    @staticmethod
+    def _pattern_regex(pattern: str) -> str:
+        """
+        "{slot}" becomes a named lazy group; the rest is a lower-case regex.
+        """
+        pattern = _SPACES.sub(" ", pattern.lower()).strip()
+        return _SLOT.sub(lambda slot: f"(?P<{slot.group(1)}>.+?)", pattern)
+
+    def _load_templates(self) -> List[IntentTemplate]:
+        """
+        Extra templates from config.TEMPLATES_PATH: [{"name", "patterns", "sql", "output_type"}].
+        """
+        if not self.config.TEMPLATES_PATH:
+            return []
+        with open(self.config.TEMPLATES_PATH, encoding="utf-8") as handle:
+            return [IntentTemplate(**template) for template in json.load(handle)]
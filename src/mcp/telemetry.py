@@ -0,0 +1,187 @@
+"""
+Telemetry Module
+===============================================================================
+Per-request telemetry for the chat pipeline, written as one JSON line per request.
+
+- `trace(kind, **fields)` opens the request record (a context variable, so it
+  follows the request into worker threads and tasks). Nested calls reuse the
+  open record; the outermost one emits it.
+- `stage(name)` times a block; repeated stages accumulate. LLM calls made
+  inside a stage add their prompt/completion tokens (from the OpenAI `usage`
+  field, recorded by the resilient LLM wrapper) to that stage.
+- `annotate(**fields)` attaches values such as row_count or result_bytes.
+
+Record:
+    {"request_id": "...", "kind": "chat.get", "started_at": 1700000000.0,
+     "total_ms": 812.4,
+     "stages": {"classify": {"ms": 3.1}, "sql": {"ms": 640.2, "llm_calls": 1,
+                "prompt_tokens": 412, "completion_tokens": 38}, "execute": {"ms": 12.9}},
+     "tokens": {"prompt": 412, "completion": 38},
+     "row_count": 17, "result_bytes": 2311, "status": "ok"}
+
+Usage Example:
+    with trace("chat.get", question=question):
+        with stage("sql"):
+            sql = generator.generate_sql_query(question, schemas)
+        annotate(sql=sql)
+"""
+import contextvars
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from src.utils.constant import TelemetryConfig
+
+_TRACE: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("telemetry_trace", default=None)
+_STAGE: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("telemetry_stage", default=None)
+
+_sinks: List[Callable[[Dict[str, Any]], None]] = []
+_logger = None
+
+
+def add_sink(sink: Callable[[Dict[str, Any]], None]) -> None:
+    """
+    Also pass every emitted record to `sink` (e.g. a metrics exporter or a test).
+    """
+    _sinks.append(sink)
+
+
+def remove_sink(sink: Callable[[Dict[str, Any]], None]) -> None:
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def current_trace() -> Optional[Dict[str, Any]]:
+    return _TRACE.get()
+
+
+@contextmanager
+def trace(kind: str, **fields: Any) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Open a request record, or join the one already open in this context.
+    """
+    existing = _TRACE.get()
+    if existing is not None or not TelemetryConfig.ENABLED:
+        yield existing
+        return
+
+    record = {
+        "request_id": uuid.uuid4().hex,
+        "kind": kind,
+        "started_at": round(time.time(), 3),
+        **fields,
+        "stages": {},
+        "tokens": {"prompt": 0, "completion": 0},
+    }
+    token = _TRACE.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+        record.setdefault("status", "ok")
+    except BaseException as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        try:
+            _TRACE.reset(token)
+        except ValueError:
+            _TRACE.set(None)
+        _emit(record)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time the block as stage `name` of the open record (no-op without one).
+    """
+    record = _TRACE.get()
+    if record is None:
+        yield
+        return
+    token = _STAGE.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry = record["stages"].setdefault(name, {"ms": 0.0})
+        entry["ms"] = round(entry["ms"] + (time.perf_counter() - started) * 1000, 2)
+        try:
+            _STAGE.reset(token)
+        except ValueError:
+            _STAGE.set(None)
+
+
+def annotate(**fields: Any) -> None:
+    """
+    Set fields on the open record (no-op without one).
+    """
+    record = _TRACE.get()
+    if record is not None:
+        record.update(fields)
+
+
+def record_usage(response: Any) -> None:
+    """
+    Add an LLM response's token usage to the open record and its current stage.
+    """
+    record = _TRACE.get()
+    if record is None:
+        return
+    usage = getattr(response, "usage", None)
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    record["tokens"]["prompt"] += prompt
+    record["tokens"]["completion"] += completion
+    entry = record["stages"].setdefault(_STAGE.get() or "llm", {"ms": 0.0})
+    entry["llm_calls"] = entry.get("llm_calls", 0) + 1
+    entry["prompt_tokens"] = entry.get("prompt_tokens", 0) + prompt
+    entry["completion_tokens"] = entry.get("completion_tokens", 0) + completion
+
+
+def result_size(result: Any) -> Dict[str, Optional[int]]:
+    """
+    {"row_count", "result_bytes"} of a query result; None for non-DataFrame results.
+    """
+    if isinstance(result, pd.DataFrame):
+        return {"row_count": len(result), "result_bytes": int(result.memory_usage(index=True, deep=True).sum())}
+    return {"row_count": None, "result_bytes": None}
+
+
+def _emit(record: Dict[str, Any]) -> None:
+    line = json.dumps(record, default=str)
+    logger = _get_logger()
+    if logger is not None:
+        logger.info(line)
+    for sink in list(_sinks):
+        try:
+            sink(record)
+        except Exception:
+            logging.getLogger(__name__).exception("Telemetry sink failed")
+
+
+def _get_logger() -> Optional[logging.Logger]:
+    """
+    JSON-lines logger writing to TelemetryConfig.LOG_PATH; None when no path is set.
+    """
+    global _logger
+    if _logger is None and TelemetryConfig.LOG_PATH:
+        log_dir = os.path.dirname(TelemetryConfig.LOG_PATH)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        logger = logging.getLogger("telemetry")
+        if not logger.handlers:
+            handler = logging.FileHandler(TelemetryConfig.LOG_PATH, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        _logger = logger
+    return _logger
@@ -2,6 +2,7 @@
 File contain all the constants used in the project
 ===========================================================
 """
+import json
 import os
 from dotenv import load_dotenv
 
@@ -20,6 +21,23 @@ class DbSqlAlchemyConstant:
     port = os.getenv("DB_PORT", "3306")
     db_path = os.getenv("DB_PATH")
     sqlite_db_name = os.getenv("SQLITE_DB_NAME")
+    # Bounded thread pool used by DatabaseHandler.aexecute_query
+    executor_workers = int(os.getenv("DB_EXECUTOR_WORKERS", "8"))
+
+class SQLitePoolConfig:
+    """
+    Class to hold the constants used by the SQLite reader pool and writer connection
+    """
+    DB_FILE = os.getenv("SQLITE_DB_FILE", os.path.join("Database", "manufacturing_projects.db"))
+    # Persistent read-only connections; sized to the query thread pool
+    READER_POOL_SIZE = int(os.getenv("SQLITE_READER_POOL_SIZE", str(DbSqlAlchemyConstant.executor_workers)))
+    READER_MAX_OVERFLOW = int(os.getenv("SQLITE_READER_MAX_OVERFLOW", "4"))
+    POOL_TIMEOUT = 30
+    # Memory-mapped I/O bytes and page cache (negative: KiB) per connection
+    MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", str(-64 * 1024)))
+    BUSY_TIMEOUT_MS = 5000
+    SYNCHRONOUS = "NORMAL"
 
 class DBConstant:
     db_schema = {
@@ -85,6 +103,250 @@ class OpenAIConfig:
     OpenAI_n = 1
     OpenAI_stop = None
     OpenAI_timeout = 60
+    # Model used for the fused classify + SQL + output type call; must support JSON-schema responses
+    OpenAI_fused_model = os.getenv("OPENAI_FUSED_MODEL", "gpt-4o-mini")
+
+
+class LLMBackendConfig:
+    """
+    Class to hold the constants used to choose and configure the LLM backend
+    """
+    # "openai" (real API, or any OpenAI-compatible server via LLM_BASE_URL) or "stub" (in-process, offline)
+    BACKEND = os.getenv("LLM_BACKEND", "openai")
+    BASE_URL = os.getenv("LLM_BASE_URL")
+    # Stub latency distribution, e.g. "percentiles:0.6,2.0" (see src.mcp.llm_stub)
+    STUB_LATENCY = os.getenv("LLM_STUB_LATENCY", "fixed:0")
+    STUB_RESPONSES_PATH = os.getenv("LLM_STUB_RESPONSES")
+    STUB_SEED = int(os.getenv("LLM_STUB_SEED")) if os.getenv("LLM_STUB_SEED") else None
+
+
+class LLMClientConfig:
+    """
+    Class to hold the constants used by the resilient LLM call wrapper
+    """
+    # Upper bound for a single call; the request deadline can shorten it
+    CALL_TIMEOUT = OpenAIConfig.OpenAI_timeout
+    # Deadline for all LLM calls made while answering one chat request
+    REQUEST_DEADLINE_SECONDS = float(os.getenv("LLM_REQUEST_DEADLINE_SECONDS", "30"))
+    # Calls are not started with less time than this left
+    MIN_CALL_SECONDS = 0.05
+    MAX_RETRIES = 2
+    BACKOFF_BASE = 0.25
+    BACKOFF_MAX = 4.0
+    # Send a duplicate request once a call is slower than the observed p95 latency
+    HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    HEDGE_PERCENTILE = 0.95
+    HEDGE_MIN_SAMPLES = 20
+    HEDGE_WORKERS = 8
+    LATENCY_WINDOW = 200
+    # Consecutive failures (errors, timeouts or slow calls) that open the circuit
+    BREAKER_FAILURE_THRESHOLD = 5
+    BREAKER_RESET_SECONDS = 30
+    SLOW_CALL_SECONDS = 20
+
+
+class IntentClassifierConfig:
+    """
+    Class to hold the constants used by the local intent classifier
+    """
+    # Constants for the naive Bayes model
+    NGRAM_MIN = 2
+    NGRAM_MAX = 4
+    SMOOTHING_ALPHA = 1.0
+    # Below this confidence the LLM is asked to break the tie
+    CONFIDENCE_THRESHOLD = 0.85
+    # Logged questions used as QUESTION training examples
+    TRAINING_LOG_PATH = os.getenv("INTENT_TRAINING_LOG", "logs/sql_query_generator")
+    MODEL_PATH = os.getenv("INTENT_MODEL_PATH")
+    LLM_FALLBACK_MODEL = "gpt-4-turbo"
+
+
+class PipelineConfig:
+    """
+    Class to hold the constants controlling the chat pipeline
+    """
+    # Single structured completion for intent, SQL and output type
+    FUSED_MODE = os.getenv("PIPELINE_FUSED_MODE", "false").lower() == "true"
+    # Concurrent identical questions (per tenant) share one pipeline execution
+    SINGLE_FLIGHT = os.getenv("PIPELINE_SINGLE_FLIGHT", "true").lower() == "true"
+
+
+class TelemetryConfig:
+    """
+    Class to hold the constants used by the per-request pipeline telemetry
+    """
+    ENABLED = os.getenv("TELEMETRY_ENABLED", "true").lower() == "true"
+    # JSON-lines file, one record per request; empty disables the file
+    LOG_PATH = os.getenv("TELEMETRY_LOG_PATH", "logs/telemetry.jsonl")
+
+
+class BatchConfig:
+    """
+    Class to hold the constants used by the batch question runner
+    """
+    # Questions in flight at once; LLM and database pools bound the real parallelism
+    CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+
+class VisualizationConfig:
+    """
+    Class to hold the constants used to choose between text, table and plot output
+    """
+    # Ask the LLM only when the rules are not confident (opt-in)
+    LLM_TIEBREAK = os.getenv("OUTPUT_TYPE_LLM_TIEBREAK", "false").lower() == "true"
+    # Results with at least this many columns are shown as tables
+    WIDE_COLUMNS = 5
+    # Results with more rows than this are never summarized as text
+    MAX_TEXT_ROWS = 1
+    MAX_TEXT_COLUMNS = 3
+    # Categorical results with more rows than this are shown as tables, not charts
+    MAX_PLOT_CATEGORIES = 30
+
+
+class SchemaRetrievalConfig:
+    """
+    Class to hold the constants used to prune the schema sent to the LLM
+    """
+    ENABLED = os.getenv("SCHEMA_PRUNING_ENABLED", "true").lower() == "true"
+    # Below this best score the question is too vague and the full schema is sent
+    MIN_SCORE = 3.0
+    # Tables scoring below this fraction of the best match are dropped
+    MIN_SCORE_RATIO = 0.5
+    # Maximum directly-matched tables before FK neighbours are added
+    MAX_TABLES = 3
+    TABLE_NAME_WEIGHT = 5
+
+
+class SQLCacheConfig:
+    """
+    Class to hold the constants used by the question-to-SQL cache
+    """
+    ENABLED = os.getenv("SQL_CACHE_ENABLED", "true").lower() == "true"
+    MAX_ENTRIES = 1024
+    TTL_SECONDS = 24 * 60 * 60
+    # Persistent tier; set SQL_CACHE_DB_PATH to an empty string for memory-only
+    DB_PATH = os.getenv("SQL_CACHE_DB_PATH", "Database/sql_cache.db")
+    DISK_MAX_ENTRIES = 50000
+
+
+class ResultCacheConfig:
+    """
+    Class to hold the constants used by the query result cache
+    """
+    ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    # Total bytes of cached results, and the largest single result worth caching
+    MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    MAX_ENTRY_BYTES = 8 * 1024 * 1024
+
+
+class RollupConfig:
+    """
+    Class to hold the constants used by the rollup tables and the query rewrite
+    """
+    ENABLED = os.getenv("ROLLUPS_ENABLED", "true").lower() == "true"
+    # Create missing rollup tables and triggers when the database is first opened
+    AUTO_INSTALL = os.getenv("ROLLUPS_AUTO_INSTALL", "true").lower() == "true"
+    # How long the list of installed rollups is trusted before sqlite_master is read again
+    CHECK_SECONDS = 60
+
+
+class ResultPageConfig:
+    """
+    Class to hold the constants used for bounded reads and paginated results
+    """
+    PAGE_SIZE = int(os.getenv("RESULT_PAGE_SIZE", "50"))
+    # Result handles expire after this long without a page request
+    TTL_SECONDS = 15 * 60
+    MAX_HANDLES = 1000
+    # Open cursors for later pages; each holds a reader connection and its read snapshot
+    MAX_CURSORS = int(os.getenv("RESULT_MAX_CURSORS", "32"))
+    # An idle cursor's read snapshot blocks WAL checkpoints, so it is closed after this long unused
+    CURSOR_IDLE_SECONDS = float(os.getenv("RESULT_CURSOR_IDLE_SECONDS", "30"))
+    # A query's rows are read in chunks and kept up to MAX_ROWS (for charts and summaries);
+    # table replies show one page of them and read later rows through a cursor
+    CHUNK_ROWS = 1000
+    MAX_ROWS = int(os.getenv("QUERY_MAX_ROWS", "5000"))
+
+
+class TemplateConfig:
+    """
+    Class to hold the constants used by the parametrized SQL templates
+    """
+    ENABLED = os.getenv("SQL_TEMPLATES_ENABLED", "true").lower() == "true"
+    # Optional JSON list of extra templates: [{"name", "patterns", "sql", "output_type"}]
+    TEMPLATES_PATH = os.getenv("SQL_TEMPLATES_PATH")
+    # Slot values are re-read from the database this often
+    VALUE_REFRESH_SECONDS = 600
+    MAX_VALUES_PER_COLUMN = 50000
+
+
+class QueryGuardConfig:
+    """
+    Class to hold the constants used by the pre-execution query cost guard
+    """
+    ENABLED = os.getenv("QUERY_GUARD_ENABLED", "true").lower() == "true"
+    # Cost thresholds (estimated rows examined), chosen by the largest table in the
+    # query; ordered by max_rows, null meaning any size. Override with a JSON list.
+    TIERS = json.loads(os.getenv("QUERY_GUARD_TIERS", "null")) or [
+        {"max_rows": 100_000, "limit": 2_000_000, "background": 20_000_000, "reject": 200_000_000},
+        {"max_rows": 5_000_000, "limit": 1_000_000, "background": 10_000_000, "reject": 100_000_000},
+        {"max_rows": None, "limit": 500_000, "background": 5_000_000, "reject": 50_000_000},
+    ]
+    # LIMIT added to expensive queries that can stop early
+    ROW_LIMIT = int(os.getenv("QUERY_GUARD_ROW_LIMIT", "1000"))
+    # Assumed rows matched per outer row by an equality index search
+    INDEX_FAN_OUT = 10
+    # Assumed fraction of a table matched by an index range search
+    RANGE_SELECTIVITY = 0.1
+    UNKNOWN_TABLE_ROWS = 1000
+    ROW_COUNT_TTL_SECONDS = 300
+    BACKGROUND_WORKERS = int(os.getenv("QUERY_GUARD_BACKGROUND_WORKERS", "1"))
+    MAX_BACKGROUND_JOBS = 100
+
+
+class QueryBudgetConfig:
+    """
+    Class to hold the constants used to stop runaway queries inside SQLite
+    """
+    # Inline queries; background jobs get BACKGROUND_TIMEOUT_SECONDS and no step limit
+    TIMEOUT_SECONDS = float(os.getenv("QUERY_TIMEOUT_SECONDS", "10"))
+    MAX_VM_STEPS = int(os.getenv("QUERY_MAX_VM_STEPS", "500000000"))
+    BACKGROUND_TIMEOUT_SECONDS = float(os.getenv("QUERY_BACKGROUND_TIMEOUT_SECONDS", "300"))
+    # VM instructions between progress-handler checks
+    PROGRESS_INTERVAL = 10000
+    DISCONNECT_POLL_SECONDS = 0.5
+
+
+class IndexAdvisorConfig:
+    """
+    Class to hold the constants used by the offline index advisor
+    """
+    LOG_PATH = os.getenv("INDEX_ADVISOR_LOG_PATH", "logs/sql_query_generator")
+    INDEX_PREFIX = "idx_advisor_"
+    MAX_INDEX_COLUMNS = 3
+    # Timed runs per query (best is kept) and the time limit of each run
+    REPEATS = 3
+    REPLAY_TIMEOUT_SECONDS = 30.0
+    # Recommend an index when the queries using it get this much faster
+    MIN_SPEEDUP = float(os.getenv("INDEX_ADVISOR_MIN_SPEEDUP", "1.2"))
+    # Below this much (weighted) query time, timing noise dominates and the estimate decides
+    MIN_MEASURABLE_MS = 5.0
+
+
+class FewShotConfig:
+    """
+    Class to hold the constants used by the few-shot example index
+    """
+    ENABLED = os.getenv("FEW_SHOT_ENABLED", "true").lower() == "true"
+    DB_PATH = os.getenv("FEW_SHOT_DB_PATH", "Database/sql_examples.db")
+    # Nearest executed (question, SQL) pairs injected into the SQL prompt
+    TOP_K = 3
+    MIN_SCORE = 1.0
+    MAX_EXAMPLES = 5000
+    # Raw history turns still sent for follow-up questions when examples are used
+    HISTORY_TURNS = 1
+    BM25_K1 = 1.2
+    BM25_B = 0.75
 
 
 class History_Approach:
@@ -94,12 +356,54 @@ class History_Approach:
     # Constants for history approach
     HISTORY_APPROACH = "history_approach"
     HISTORY_SIZE = 10
+    # Estimated tokens of SQL history sent with each generation request
+    HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "400"))
     HISTORY_TYPE = "list"
     HISTORY_FILE = "history.json"
     HISTORY_FILE_PATH = "history/"
 
 
 
+class SessionConfig:
+    """
+    Class to hold the constants used by the per-user conversation store
+    """
+    MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+    IDLE_TTL_SECONDS = int(os.getenv("SESSION_IDLE_TTL_SECONDS", str(30 * 60)))
+    # Optional SQLite file so conversations survive restarts; empty keeps them in memory only
+    DB_PATH = os.getenv("SESSION_DB_PATH", "")
+
+
+class ResultDigestConfig:
+    """
+    Class to hold the constants used to digest query results for the summary LLM call
+    """
+    # Payload cap; MAX_TOKENS (estimated) takes precedence over MAX_BYTES when set
+    MAX_BYTES = int(os.getenv("RESULT_DIGEST_MAX_BYTES", "4000"))
+    MAX_TOKENS = int(os.getenv("RESULT_DIGEST_MAX_TOKENS", "0")) or None
+    # Top categories reported per text column
+    TOP_K = 5
+    # Results up to this many rows are sent in full when they fit the cap
+    FULL_ROWS_MAX = 200
+    # Upper bound on sampled rows; the sample shrinks further to fit the cap
+    SAMPLE_ROWS = 10
+    # Stratify the sample on a text column with at most this many distinct values
+    STRATIFY_MAX_GROUPS = 10
+    MAX_VALUE_CHARS = 60
+
+
+class SummaryConfig:
+    """
+    Class to hold the constants used to phrase simple results without the LLM
+    """
+    LOCAL_ENABLED = os.getenv("LOCAL_SUMMARY_ENABLED", "true").lower() == "true"
+    # Single-row results with at most this many columns are phrased locally
+    MAX_ROW_COLUMNS = 4
+    # Single-column lists and two-column grouped results up to this many rows
+    MAX_LIST_ROWS = 10
+    MAX_GROUP_ROWS = 10
+
+
 class UI_constants:
     """
     Class to hold all the constants used in the project
@@ -84,10 +84,91 @@ function appendMessage(name, img, side, text) {
   `;
   msgerChat.insertAdjacentHTML("beforeend", msgHTML);
   msgerChat.scrollTop = msgerChat.scrollHeight; // Ensure always scrolls to bottom
+  return msgerChat.lastElementChild.querySelector(".msg-text");
 }
 
-// Modify botResponse to use fetch and POST to Python backend
+// Status shown in the bot bubble while the pipeline stages complete
+const STAGE_TEXT = {
+  classified: "Understanding your question...",
+  sql_ready: "Running the query...",
+  rows_ready: "Preparing the answer..."
+};
+
+// Parse one Server-Sent Events frame into {event, data}
+function parseSseFrame(frame) {
+  let event = "message";
+  const dataLines = [];
+  frame.split("\n").forEach(line => {
+    if (line.startsWith("event:")) {
+      event = line.slice(6).trim();
+    } else if (line.startsWith("data:")) {
+      dataLines.push(line.slice(5).trim());
+    }
+  });
+  let data = {};
+  try {
+    data = dataLines.length ? JSON.parse(dataLines.join("\n")) : {};
+  } catch (err) {
+    data = {};
+  }
+  return { event, data };
+}
+
+// Stream the reply from /stream, rendering stage updates and summary tokens as they arrive
+async function streamBotResponse(rawText) {
+  const response = await fetch("/stream", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json"
+    },
+    body: JSON.stringify({ msg: rawText })
+  });
+  if (!response.ok || !response.body) {
+    throw new Error("Streaming not available");
+  }
+
+  const bubble = appendMessage(BOT_NAME, BOT_IMG, "left", "...");
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let summary = "";
+
+  try {
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const { event, data } = parseSseFrame(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+
+        if (STAGE_TEXT[event] && !summary) {
+          bubble.textContent = STAGE_TEXT[event];
+        } else if (event === "token") {
+          summary += data.text || "";
+          bubble.textContent = summary;
+        } else if (event === "reply") {
+          bubble.innerHTML = data.reply !== undefined ? data.reply : "No response";
+          appendPager(bubble, data);
+        }
+        msgerChat.scrollTop = msgerChat.scrollHeight;
+      }
+    }
+  } catch (err) {
+    // The bubble already exists, so report the error in place instead of retrying
+    bubble.textContent = summary || "Sorry, there was an error.";
+  }
+}
+
+// Prefer the streaming endpoint; fall back to the single JSON reply from /get
 function botResponse(rawText) {
+  streamBotResponse(rawText).catch(() => jsonBotResponse(rawText));
+}
+
+// Modify botResponse to use fetch and POST to Python backend
+function jsonBotResponse(rawText) {
   fetch("/get", {
     method: "POST",
     headers: {
@@ -106,7 +187,8 @@ function botResponse(rawText) {
       const reply = (typeof data === "object" && data.reply !== undefined)
         ? data.reply
         : (typeof data === "string" ? data : "No response");
-      appendMessage(BOT_NAME, BOT_IMG, "left", reply);
+      const bubble = appendMessage(BOT_NAME, BOT_IMG, "left", reply);
+      appendPager(bubble, data);
     })
     .catch((err) => {
       appendMessage(BOT_NAME, BOT_IMG, "left", "Sorry, there was an error.");
@@ -115,6 +197,34 @@ function botResponse(rawText) {
     });
 }
 
+// Table replies with more rows carry a result_id; "Show more" fetches the next page from /results
+function appendPager(bubble, data) {
+  if (!data || !data.result_id || !data.has_more) return;
+  const button = document.createElement("button");
+  button.className = "show-more-btn";
+  button.textContent = "Show more";
+  let page = data.page || 1;
+  button.onclick = async function() {
+    button.disabled = true;
+    try {
+      const response = await fetch(`/results/${encodeURIComponent(data.result_id)}?page=${page + 1}`);
+      if (!response.ok) throw new Error("Page not available");
+      const next = await response.json();
+      page = next.page;
+      button.insertAdjacentHTML("beforebegin", `<div class="result-page">${next.reply}</div>`);
+      if (!next.has_more) {
+        button.remove();
+        return;
+      }
+    } catch (err) {
+      button.textContent = "Results expired, ask again";
+      return;
+    }
+    button.disabled = false;
+  };
+  bubble.appendChild(button);
+}
+
 function formatDate(date) {
   const h = "0" + date.getHours();
   const m = "0" + date.getMinutes();
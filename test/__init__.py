@@ -0,0 +1,6 @@
+import os
+
+# Tests never talk to the real OpenAI API: default clients come from the offline stub backend
+os.environ.setdefault("LLM_BACKEND", "stub")
+# Telemetry records go to sinks only, not to logs/telemetry.jsonl
+os.environ.setdefault("TELEMETRY_LOG_PATH", "")
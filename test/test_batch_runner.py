@@ -0,0 +1,85 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import pandas as pd
+
+from src.mcp.batch_runner import chatbot_runner, outcome_record, read_questions, run_batch, sync_runner
+
+
+class FakeChatBot:
+    def __init__(self):
+        self.histories = []
+
+    async def astream_run(self, question, history=None):
+        self.histories.append(history)
+        yield "classified", {"intent": "QUESTION"}
+        await asyncio.sleep(0.01)
+        yield "sql_ready", {"sql": "SELECT 1"}
+        yield "result", ("SELECT 1", pd.DataFrame({"x": [1, 2]}), "table")
+
+
+class TestBatchRunner(unittest.TestCase):
+    def test_read_questions_jsonl_and_csv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            jsonl = os.path.join(directory, "q.jsonl")
+            with open(jsonl, "w") as handle:
+                handle.write('{"id": "a", "question": "how many invoices"}\n"list customers"\n\n{"question": " "}\n')
+            self.assertEqual(read_questions(jsonl), [
+                {"id": "a", "question": "how many invoices"}, {"id": 2, "question": "list customers"},
+            ])
+            csv_path = os.path.join(directory, "q.csv")
+            with open(csv_path, "w") as handle:
+                handle.write("question\nhow many tasks\n")
+            self.assertEqual(read_questions(csv_path), [{"id": 1, "question": "how many tasks"}])
+
+    def test_outcome_record(self):
+        self.assertEqual(outcome_record("SELECT 1", pd.DataFrame({"x": [1]}))["row_count"], 1)
+        self.assertEqual(outcome_record("N/A", {"message": "Hello!"})["status"], "message")
+        failed = outcome_record("SELECT x", {"error": "boom"})
+        self.assertEqual((failed["status"], failed["error"], failed["sql"]), ("error", "boom", "SELECT x"))
+
+    def test_chatbot_runner_streams_records_with_stage_latency(self):
+        bot = FakeChatBot()
+        output = io.StringIO()
+        items = [{"id": i, "question": f"q{i}"} for i in range(5)]
+        counts = asyncio.run(run_batch(items, chatbot_runner(bot, history_factory=list), output, concurrency=2))
+
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(counts, {"ok": 5})
+        self.assertEqual(sorted(record["id"] for record in records), list(range(5)))
+        self.assertEqual(records[0]["row_count"], 2)
+        self.assertEqual(set(records[0]["latency_ms"]), {"classify", "sql", "execute", "total"})
+        self.assertGreaterEqual(records[0]["latency_ms"]["sql"], 5)
+        self.assertEqual(len({id(history) for history in bot.histories}), 5)
+
+    def test_concurrency_is_bounded_and_errors_are_recorded(self):
+        lock, state = threading.Lock(), {"running": 0, "peak": 0}
+
+        def work(question):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+            if question == "bad":
+                raise ValueError("broken")
+            return {"status": "ok", "sql": "SELECT 1"}
+
+        output = io.StringIO()
+        items = [{"id": i, "question": "bad" if i == 3 else "good"} for i in range(8)]
+        counts = asyncio.run(run_batch(items, sync_runner(work), output, concurrency=3))
+        self.assertEqual(counts, {"ok": 7, "error": 1})
+        self.assertLessEqual(state["peak"], 3)
+        failed = [json.loads(line) for line in output.getvalue().splitlines() if '"error"' in line]
+        self.assertEqual(failed[0]["error"], "ValueError: broken")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from src.mcp.example_index import ExampleIndex
+from src.mcp.sql_history import SQLHistory
+from src.mcp.sql_query_generation import SQLQueryGenerator
+from src.utils.constant import FewShotConfig
+
+
+class SmallIndexConfig(FewShotConfig):
+    MAX_EXAMPLES = 3
+    MIN_SCORE = 0.0
+
+
+class TestExampleIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ExampleIndex(":memory:", config=SmallIndexConfig)
+        self.index.add("how many invoices are overdue", "SELECT COUNT(*) FROM Invoice WHERE status = 'OVERDUE'")
+        self.index.add("list customers in the retail sector", "SELECT * FROM Customer WHERE sector = 'Retail'")
+        self.index.add("total budget per department", "SELECT department, SUM(budget) FROM Department GROUP BY department")
+
+    def test_search_ranks_most_similar_first(self):
+        examples = self.index.search("count overdue invoices", k=2)
+        self.assertEqual(examples[0].sql, "SELECT COUNT(*) FROM Invoice WHERE status = 'OVERDUE'")
+        self.assertGreater(examples[0].score, 0)
+
+    def test_search_without_shared_terms_is_empty(self):
+        self.assertEqual(self.index.search("weather tomorrow"), [])
+
+    def test_repeated_question_keeps_latest_sql(self):
+        self.index.add("How many invoices are overdue?", "SELECT COUNT(1) FROM Invoice WHERE status = 'OVERDUE'")
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.search("overdue invoices", k=1)[0].sql, "SELECT COUNT(1) FROM Invoice WHERE status = 'OVERDUE'")
+
+    def test_oldest_examples_are_evicted(self):
+        self.index.add("employees hired this year", "SELECT * FROM Employee WHERE hire_year = 2024")
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.search("overdue invoices"), [])
+
+    def test_persists_across_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "examples.db")
+            ExampleIndex(path, config=SmallIndexConfig).add("list all employees", "SELECT * FROM Employee")
+            self.assertEqual(ExampleIndex(path, config=SmallIndexConfig).search("employees")[0].sql, "SELECT * FROM Employee")
+
+
+class TestGeneratorFewShot(unittest.TestCase):
+    def test_examples_replace_raw_history(self):
+        index = ExampleIndex(":memory:", config=SmallIndexConfig)
+        generator = SQLQueryGenerator(llm_client=None, example_index=index, prune_schema=False)
+        generator.record_success("how many invoices are overdue", "SELECT COUNT(*) FROM Invoice WHERE status = 'OVERDUE'")
+        history = SQLHistory()
+        history.add("first question", "SELECT 1")
+        history.add("second question", "SELECT 2")
+
+        prompt, _ = generator._prepare("count overdue invoices", {"Invoice": "id INTEGER, status TEXT"}, history)
+        system_message = generator._build_messages(prompt, history)[0]["content"]
+
+        self.assertIn("SQL: SELECT COUNT(*) FROM Invoice WHERE status = 'OVERDUE'", prompt)
+        self.assertIn("Q: second question", system_message)
+        self.assertNotIn("Q: first question", system_message)
+
+    def test_without_index_prompt_has_no_examples(self):
+        generator = SQLQueryGenerator(llm_client=None, prune_schema=False)
+        prompt, _ = generator._prepare("count overdue invoices", {"Invoice": "id INTEGER, status TEXT"})
+        self.assertNotIn("Examples of similar questions", prompt)
+
+
+if __name__ == '__main__':
+    unittest.main()
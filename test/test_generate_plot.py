@@ -1,7 +1,7 @@
 import unittest
 import pandas as pd
 
-from src.mcp.generate_plot import VisualizationEngine
+from src.mcp.generate_plot import VisualizationEngine, heuristic_output_type
 
 class TestVisualizationEngine(unittest.TestCase):
     def setUp(self):
@@ -67,5 +67,46 @@ class TestVisualizationEngine(unittest.TestCase):
         chart = self.engine.generate_chart(df, chart_type='line')
         self.assertIsNotNone(chart)
 
+
+class TestHeuristicOutputType(unittest.TestCase):
+    def test_scalar_is_text(self):
+        df = pd.DataFrame({'total_employees': [42]})
+        self.assertEqual(heuristic_output_type(df, "how many employees are there"), ('text', True))
+
+    def test_empty_is_text(self):
+        self.assertEqual(heuristic_output_type(pd.DataFrame(), "anything")[0], 'text')
+
+    def test_datetime_and_numeric_is_plot(self):
+        df = pd.DataFrame({
+            'date': pd.date_range('2023-01-01', periods=6),
+            'value': range(6)
+        })
+        self.assertEqual(heuristic_output_type(df, "payments received"), ('plot', True))
+
+    def test_sqlite_date_strings_are_temporal(self):
+        df = pd.DataFrame({
+            'issue_date': ['2024-01-01', '2024-02-01', '2024-03-01'],
+            'total_amount': [10.0, 20.0, 15.0]
+        })
+        self.assertEqual(heuristic_output_type(df, "invoice totals")[0], 'plot')
+
+    def test_wide_result_is_table(self):
+        df = pd.DataFrame({c: [1, 2, 3] for c in 'abcdef'})
+        self.assertEqual(heuristic_output_type(df, "show details"), ('table', True))
+
+    def test_compare_keyword_is_plot(self):
+        df = pd.DataFrame({'sector': ['A', 'B', 'C'], 'customers': [3, 5, 2]})
+        self.assertEqual(heuristic_output_type(df, "compare customers by sector"), ('plot', True))
+
+    def test_ambiguous_grouping_is_not_confident(self):
+        df = pd.DataFrame({'sector': ['A', 'B', 'C'], 'customers': [3, 5, 2]})
+        self.assertEqual(heuristic_output_type(df, "customers in each sector"), ('table', False))
+
+    def test_engine_uses_rules_without_llm(self):
+        engine = VisualizationEngine(llm_client=None, use_llm_tiebreak=False)
+        df = pd.DataFrame({'sector': ['A', 'B'], 'customers': [3, 5]})
+        self.assertEqual(engine.suggest_output_type(df, "customers in each sector"), 'table')
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from src.mcp.index_advisor import EQUALITY, JOIN, RANGE, IndexAdvisor, extract_predicates, read_workload
+
+COLUMNS = {
+    "Customer": ["customer_id", "company_name", "sector"],
+    "Invoice": ["invoice_id", "customer_id", "amount", "issue_date", "due_date", "status"],
+}
+
+LOG = """2025-05-01 10:00:00,000 - sql_query_generation - INFO - Natural Language Query: invoices of customer 17
+2025-05-01 10:00:00,500 - sql_query_generation - INFO - Generated SQL Query: SELECT * FROM Invoice
+WHERE customer_id = 17;
+2025-05-01 10:00:01,000 - sql_query_generation - INFO - Generated SQL Query (cache hit): select * from invoice where customer_id = 17
+2025-05-01 10:00:02,000 - sql_query_generation - INFO - Generated SQL Query: None
+2025-05-01 10:00:03,000 - sql_query_generation - INFO - Generated SQL Query: ```sql
+SELECT COUNT(*) FROM Customer
+```
+"""
+
+
+class TestIndexAdvisor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.tmp.name, "sql_query_generator")
+        with open(self.log_path, "w") as handle:
+            handle.write(LOG)
+        self.db_path = os.path.join(self.tmp.name, "test.db")
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE Customer (customer_id INTEGER PRIMARY KEY, company_name TEXT, sector TEXT)")
+        conn.execute("CREATE TABLE Invoice (invoice_id INTEGER PRIMARY KEY, customer_id INT, amount FLOAT, "
+                     "issue_date DATE, due_date DATE, status TEXT)")
+        conn.execute(
+            "WITH RECURSIVE g(v) AS (SELECT 1 UNION ALL SELECT v + 1 FROM g WHERE v < 50000) "
+            "INSERT INTO Invoice (customer_id, amount, issue_date, due_date, status) "
+            "SELECT v % 1000, v * 1.5, '2024-01-01', '2024-02-01', 'PAID' FROM g"
+        )
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_workload_joins_lines_and_counts_repeats(self):
+        workload = list(read_workload(self.log_path).values())
+        self.assertEqual(workload[0], {"sql": "SELECT * FROM Invoice\nWHERE customer_id = 17", "count": 2})
+        self.assertEqual(workload[1]["sql"], "SELECT COUNT(*) FROM Customer")
+        self.assertEqual(len(workload), 2)
+
+    def test_extract_predicates(self):
+        sql = ("SELECT c.company_name, SUM(i.amount) FROM Invoice AS i JOIN Customer c ON c.customer_id = i.customer_id "
+               "WHERE i.status IN ('OVERDUE', 'SENT') AND due_date < '2024-03-01' AND strftime('%Y', issue_date) = '2024' "
+               "AND amount IS NOT NULL GROUP BY c.company_name")
+        self.assertEqual(sorted(extract_predicates(sql, COLUMNS)), [
+            ("Customer", "customer_id", JOIN),
+            ("Invoice", "customer_id", JOIN),
+            ("Invoice", "due_date", RANGE),
+            ("Invoice", "status", EQUALITY),
+        ])
+
+    def test_advise_and_apply(self):
+        advisor = IndexAdvisor(self.db_path)
+        report = advisor.advise(read_workload(self.log_path))
+        by_name = {index["name"]: index for index in report["indexes"]}
+        index = by_name["idx_advisor_invoice_customer_id"]
+        self.assertTrue(index["recommended"])
+        self.assertEqual((index["queries"], index["executions"]), (1, 2))
+        self.assertGreater(index["estimated_speedup"], 1)
+        self.assertGreater(index["measured_speedup"], 1)
+
+        # The real database is untouched until apply
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index'").fetchone()[0], 0)
+        self.assertIn(index["sql"], advisor.apply(report))
+        names = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+        self.assertIn("idx_advisor_invoice_customer_id", names)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()[0], 1)
+        conn.close()
+
+
+    def test_candidates_are_measured_alone(self):
+        workload = {
+            "a": {"sql": "SELECT * FROM Invoice WHERE customer_id = 17 AND status = 'PAID'", "count": 3},
+            "b": {"sql": "SELECT COUNT(*) FROM Invoice WHERE status = 'PAID'", "count": 1},
+        }
+        report = IndexAdvisor(self.db_path).advise(workload)
+        self.assertEqual((report["combined"]["queries"], report["combined"]["executions"]), (2, 4))
+        by_name = {index["name"]: index for index in report["indexes"]}
+        # Shadowed by the composite index when all candidates exist, but useful on its own
+        single = by_name["idx_advisor_invoice_customer_id"]
+        self.assertEqual((single["queries"], single["executions"]), (1, 3))
+        self.assertTrue(single["recommended"])
+        self.assertTrue(by_name["idx_advisor_invoice_customer_id_status"]["recommended"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+from src.mcp.intent_classifier import (
+    IntentClassifier,
+    NaiveBayesIntentModel,
+    GREETING,
+    QUESTION,
+    load_logged_questions,
+)
+
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content):
+        self.message = _Message(content)
+
+
+class _Response:
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+
+
+class _FakeCompletions:
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return _Response(self.content)
+
+
+class _FakeLLM:
+    def __init__(self, content):
+        self.completions = _FakeCompletions(content)
+        self.chat = self
+
+
+class TestIntentClassifier(unittest.TestCase):
+    def setUp(self):
+        self.classifier = IntentClassifier(llm_client=None)
+
+    def test_greeting_rule(self):
+        prediction = self.classifier.classify("Hello there!")
+        self.assertEqual(prediction.label, GREETING)
+        self.assertEqual(prediction.source, "rule")
+
+    def test_question_rule(self):
+        prediction = self.classifier.classify("hi, how many invoices are overdue?")
+        self.assertEqual(prediction.label, QUESTION)
+        self.assertEqual(prediction.source, "rule")
+
+    def test_model_classifies_unseen_text(self):
+        prediction = self.classifier.classify("can you provide their names please")
+        self.assertEqual(prediction.label, QUESTION)
+        self.assertEqual(prediction.source, "model")
+
+    def test_llm_fallback_only_when_unsure(self):
+        llm = _FakeLLM("GREETING")
+        model = NaiveBayesIntentModel().fit(["hey", "which tasks"], [GREETING, QUESTION])
+        config = type("Config", (), {
+            "CONFIDENCE_THRESHOLD": 1.1, "LLM_FALLBACK_MODEL": "test-model",
+        })
+        classifier = IntentClassifier(llm_client=llm, config=config, model=model)
+        prediction = classifier.classify("zzz")
+        self.assertEqual(prediction, (GREETING, 1.0, "llm"))
+        self.assertEqual(llm.completions.calls, 1)
+        classifier.classify("good morning")
+        self.assertEqual(llm.completions.calls, 1)
+
+    def test_invalid_llm_answer_keeps_local_label(self):
+        model = NaiveBayesIntentModel().fit(["hey", "which tasks"], [GREETING, QUESTION])
+        config = type("Config", (), {
+            "CONFIDENCE_THRESHOLD": 1.1, "LLM_FALLBACK_MODEL": "test-model",
+        })
+        classifier = IntentClassifier(llm_client=_FakeLLM("MAYBE"), config=config, model=model)
+        self.assertEqual(classifier.classify("zzz").source, "model")
+
+    def test_save_and_load_round_trip(self):
+        model = NaiveBayesIntentModel.from_seed()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.json")
+            model.save(path)
+            loaded = NaiveBayesIntentModel.load(path)
+        self.assertEqual(model.predict("list the payments"), loaded.predict("list the payments"))
+
+    def test_load_logged_questions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "log")
+            with open(path, "w") as handle:
+                handle.write("2025-04-14 - sql - INFO - Natural Language Query: how many employees\n")
+                handle.write("2025-04-14 - sql - INFO - Generated SQL Query: SELECT 1\n")
+            self.assertEqual(load_logged_questions(path), ["how many employees"])
+        self.assertEqual(load_logged_questions("/nonexistent/log"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
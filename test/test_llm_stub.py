@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+from openai import OpenAI
+
+from src.mcp.llm_backend import create_llm_client
+from src.mcp.llm_stub import LatencyModel, StubLLM, StubResponder
+from src.mcp.llm_stub_server import create_app
+from src.mcp.sql_query_generation import SQLQueryGenerator
+
+
+class TestLatencyModel(unittest.TestCase):
+    def test_fixed_and_uniform(self):
+        self.assertEqual(LatencyModel("fixed:0.2").sample(), 0.2)
+        sample = LatencyModel("uniform:0.1,0.3", seed=1).sample()
+        self.assertTrue(0.1 <= sample <= 0.3)
+
+    def test_percentiles_fit(self):
+        model = LatencyModel("percentiles:0.5,2.0", seed=7)
+        samples = sorted(model.sample() for _ in range(4000))
+        self.assertAlmostEqual(samples[2000], 0.5, delta=0.05)
+        self.assertAlmostEqual(samples[int(0.95 * 4000)], 2.0, delta=0.3)
+
+    def test_unknown_distribution(self):
+        with self.assertRaises(ValueError):
+            LatencyModel("zipf:1")
+
+
+class TestStubResponder(unittest.TestCase):
+    def test_rules_file_and_defaults(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "responses.json")
+            with open(path, "w") as handle:
+                json.dump({"rules": [{"pattern": "overdue", "response": "SELECT 42"}]}, handle)
+            responder = StubResponder(responses_path=path, latency="fixed:0")
+        self.assertEqual(responder.respond({"messages": [{"role": "user", "content": "how many overdue?"}]})[0], "SELECT 42")
+        self.assertEqual(
+            responder.respond({"messages": [{"role": "user", "content": "Respond with GREETING or QUESTION only."}]})[0],
+            "QUESTION",
+        )
+        plan = json.loads(responder.respond({"messages": [], "response_format": {"type": "json_schema"}})[0])
+        self.assertEqual(plan["intent"], "QUESTION")
+
+
+class TestStubLLM(unittest.IsolatedAsyncioTestCase):
+    def test_default_generator_uses_stub_backend(self):
+        generator = SQLQueryGenerator(llm_client=None)
+        sql = generator.generate_sql_query("list customers", {"Customer": "customer_id INT PRIMARY KEY, company_name TEXT"})
+        self.assertTrue(sql.startswith("SELECT"))
+
+    def test_timeout_raises(self):
+        client = StubLLM(latency="fixed:0.2")
+        with self.assertRaises(TimeoutError):
+            client.chat.completions.create(model="m", messages=[], timeout=0.01)
+
+    async def test_async_stream(self):
+        client = create_llm_client(is_async=True, backend="stub")
+        stream = await client.chat.completions.create(
+            model="m", stream=True, messages=[{"role": "user", "content": "Provide a simple summary"}]
+        )
+        text = "".join([chunk.choices[0].delta.content or "" async for chunk in stream])
+        self.assertEqual(text, "The query returned the requested records.")
+
+
+class TestStubServer(unittest.TestCase):
+    def test_openai_client_against_server(self):
+        http_client = TestClient(create_app(StubResponder(latency="fixed:0")))
+        client = OpenAI(api_key="stub", base_url="http://testserver/v1", http_client=http_client)
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo", messages=[{"role": "user", "content": "Suggest output type: 'text', 'table', or 'plot'."}]
+        )
+        self.assertEqual(response.choices[0].message.content, "table")
+        self.assertGreater(response.usage.prompt_tokens, 0)
+
+        stream = client.chat.completions.create(
+            model="gpt-3.5-turbo", stream=True, messages=[{"role": "user", "content": "Provide a simple summary"}]
+        )
+        self.assertEqual("".join(chunk.choices[0].delta.content or "" for chunk in stream),
+                         "The query returned the requested records.")
+
+
+if __name__ == "__main__":
+    unittest.main()
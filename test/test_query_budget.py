@@ -0,0 +1,134 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from sqlalchemy import text
+
+from src.mcp.query_budget import CancelToken, QueryBudget, cancel_on_disconnect, cancel_scope
+from src.mcp.resilient_llm import request_deadline
+from src.mcp.run_query import DatabaseHandler, create_sqlite_engines
+from src.mcp.single_flight import SingleFlight
+
+ENDLESS = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT MAX(x) AS m FROM c"
+SLOW = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1500000) SELECT MAX(x) AS m FROM c"
+
+
+class TestQueryBudget(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.reader, self.writer = create_sqlite_engines(os.path.join(self.tmp.name, "test.db"))
+        self.handler = DatabaseHandler(engine=self.reader, guard=False, result_cache=False)
+
+    def tearDown(self):
+        self.reader.dispose()
+        self.writer.dispose()
+        self.tmp.cleanup()
+
+    def test_wall_clock_limit(self):
+        started = time.monotonic()
+        result = self.handler._read(ENDLESS, QueryBudget(seconds=0.2, vm_steps=0))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(result["code"], "query_too_expensive")
+        self.assertIn("longer than 0.2 s", result["message"])
+        # The pooled connection is usable afterwards
+        self.assertEqual(self.handler.execute_query("SELECT 1 AS x")["x"].iloc[0], 1)
+
+    def test_vm_step_limit(self):
+        result = self.handler._read(ENDLESS, QueryBudget(seconds=0, vm_steps=100_000))
+        self.assertEqual(result["code"], "query_too_expensive")
+        self.assertIn("steps", result["message"])
+
+    def test_request_deadline_shortens_the_budget(self):
+        with request_deadline(0.2):
+            result = self.handler.execute_query(ENDLESS)
+        self.assertIn("request deadline", result["message"])
+
+    def test_cancel_token_from_another_thread(self):
+        with cancel_scope() as token:
+            threading.Timer(0.1, token.cancel).start()
+            result = self.handler.execute_query(ENDLESS)
+        self.assertEqual(result["code"], "query_cancelled")
+
+    async def test_cancelling_the_awaiting_task_stops_the_query(self):
+        budgets = []
+
+        class RecordingBudget(QueryBudget):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                budgets.append(self)
+
+        with mock.patch("src.mcp.run_query.QueryBudget", RecordingBudget):
+            task = asyncio.ensure_future(self.handler.aexecute_query(ENDLESS))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            for _ in range(100):
+                if budgets and budgets[0].reason:
+                    break
+                await asyncio.sleep(0.02)
+        self.assertEqual(budgets[0].reason, "cancelled")
+
+    async def test_client_disconnect_cancels(self):
+        calls = []
+
+        async def is_disconnected():
+            calls.append(1)
+            return len(calls) > 1
+
+        async with cancel_on_disconnect(is_disconnected, poll_seconds=0.05):
+            result = await self.handler.aexecute_query(ENDLESS)
+        self.assertEqual(result["code"], "query_cancelled")
+
+    async def _coalesced(self, sql, leader_leaves, follower_leaves):
+        """
+        Run `sql` for a leader and a follower sharing one flight; each disconnects when its flag is set.
+        """
+        flight = SingleFlight()
+
+        async def caller(leaves, delay):
+            await asyncio.sleep(delay)
+
+            async def is_disconnected():
+                return leaves.is_set()
+
+            async with cancel_on_disconnect(is_disconnected, poll_seconds=0.02):
+                result, _ = await flight.ado("execute", sql, lambda: self.handler.aexecute_query(sql))
+                return result
+
+        return await asyncio.gather(caller(leader_leaves, 0), caller(follower_leaves, 0.01))
+
+    async def test_leader_disconnect_does_not_cancel_followers(self):
+        leader_leaves, follower_leaves = asyncio.Event(), asyncio.Event()
+        asyncio.get_running_loop().call_later(0.05, leader_leaves.set)
+        leader, follower = await self._coalesced(SLOW, leader_leaves, follower_leaves)
+        self.assertEqual(follower["m"].iloc[0], 1500000)
+        self.assertEqual(leader["m"].iloc[0], 1500000)
+
+    async def test_shared_query_stops_when_every_caller_disconnects(self):
+        leader_leaves, follower_leaves = asyncio.Event(), asyncio.Event()
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, leader_leaves.set)
+        loop.call_later(0.1, follower_leaves.set)
+        results = await self._coalesced(ENDLESS, leader_leaves, follower_leaves)
+        self.assertEqual([result["code"] for result in results], ["query_cancelled", "query_cancelled"])
+
+    def test_child_token_follows_parent(self):
+        parent = CancelToken()
+        child = CancelToken(parent)
+        parent.cancel()
+        self.assertTrue(child.cancelled)
+
+    def test_fast_queries_are_unaffected(self):
+        with self.writer.begin() as conn:
+            conn.execute(text("CREATE TABLE Invoice (invoice_id INTEGER PRIMARY KEY, status TEXT)"))
+            conn.execute(text("INSERT INTO Invoice (status) VALUES ('PAID')"))
+        self.assertEqual(len(self.handler.execute_query("SELECT * FROM Invoice")), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src.mcp.query_cache import SQLQueryCache, normalize_question, schema_fingerprint
+from src.mcp.sql_history import SQLHistory
+from src.mcp.sql_query_generation import SQLQueryGenerator
+
+
+class TestNormalizeQuestion(unittest.TestCase):
+    def test_case_whitespace_and_punctuation(self):
+        self.assertEqual(normalize_question("  Total   UNPAID invoices?! "), "total unpaid invoices")
+
+    def test_number_formatting_folded(self):
+        self.assertEqual(
+            normalize_question("invoices over 1,000.00"),
+            normalize_question("Invoices over 1000"),
+        )
+
+    def test_distinct_numbers_stay_distinct(self):
+        self.assertNotEqual(normalize_question("invoices over 500"), normalize_question("invoices over 1000"))
+
+    def test_schema_fingerprint_is_order_independent(self):
+        self.assertEqual(schema_fingerprint({"a": "x", "b": "y"}), schema_fingerprint({"b": "y", "a": "x"}))
+
+
+class TestSQLQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "cache.db")
+        self.schemas = {"Invoice": "invoice_id INT, status TEXT"}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hit_and_miss_counters(self):
+        cache = SQLQueryCache(db_path="")
+        self.assertIsNone(cache.get("total unpaid invoices", self.schemas))
+        cache.set("total unpaid invoices", self.schemas, "SELECT 1")
+        self.assertEqual(cache.get("Total unpaid invoices.", self.schemas), "SELECT 1")
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_schema_change_misses(self):
+        cache = SQLQueryCache(db_path="")
+        cache.set("q", self.schemas, "SELECT 1")
+        self.assertIsNone(cache.get("q", {"Invoice": "invoice_id INT"}))
+
+    def test_lru_eviction(self):
+        cache = SQLQueryCache(max_entries=2, db_path="")
+        cache.set("a", None, "SELECT 1")
+        cache.set("b", None, "SELECT 2")
+        cache.get("a", None)
+        cache.set("c", None, "SELECT 3")
+        self.assertIsNone(cache.get("b", None))
+        self.assertEqual(cache.get("a", None), "SELECT 1")
+
+    def test_ttl_expiry(self):
+        cache = SQLQueryCache(ttl_seconds=0.01, db_path=self.db_path)
+        cache.set("q", None, "SELECT 1")
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("q", None))
+
+    def test_persistent_tier_survives_restart(self):
+        SQLQueryCache(db_path=self.db_path).set("projects overdue", self.schemas, "SELECT 2")
+        restarted = SQLQueryCache(db_path=self.db_path)
+        self.assertEqual(restarted.get("projects overdue", self.schemas), "SELECT 2")
+        self.assertEqual(restarted.stats()["disk_hits"], 1)
+
+    def test_generator_hit_skips_llm(self):
+        cache = SQLQueryCache(db_path="")
+        cache.set("how many employees", self.schemas, "SELECT COUNT(*) FROM Employee")
+
+        class _ExplodingLLM:
+            @property
+            def chat(self):
+                raise AssertionError("LLM should not be called on a cache hit")
+
+        generator = SQLQueryGenerator(llm_client=_ExplodingLLM(), cache=cache)
+        self.assertEqual(
+            generator.generate_sql_query("How many employees?", self.schemas),
+            "SELECT COUNT(*) FROM Employee",
+        )
+
+    def test_follow_ups_are_keyed_by_history(self):
+        answers = iter(["SELECT 1 FROM Invoice", "SELECT 2 FROM Invoice", "SELECT 3 FROM Invoice"])
+
+        class _LLM:
+            def __init__(self):
+                self.chat = self
+                self.completions = self
+
+            def create(self, **kwargs):
+                message = type("Message", (), {"content": next(answers)})
+                return type("Response", (), {"choices": [type("Choice", (), {"message": message})]})
+
+        generator = SQLQueryGenerator(llm_client=_LLM(), cache=SQLQueryCache(db_path=""))
+        first, second = SQLHistory(), SQLHistory()
+        first.add("unpaid invoices", "SELECT * FROM Invoice WHERE status <> 'PAID'")
+        second.add("invoices of customer 7", "SELECT * FROM Invoice WHERE customer_id = 7")
+        self.assertEqual(generator.generate_sql_query("only last month", self.schemas, first), "SELECT 1 FROM Invoice")
+        self.assertEqual(generator.generate_sql_query("only last month", self.schemas, second), "SELECT 2 FROM Invoice")
+
+        # The same follow-up after the same turns is reused
+        replay = SQLHistory(entries=first.to_list()[:1])
+        self.assertEqual(generator.generate_sql_query("Only last month?", self.schemas, replay), "SELECT 1 FROM Invoice")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import time
+import unittest
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from src.mcp.query_guard import ALLOW, BACKGROUND, LIMIT, REJECT, BackgroundJobs, QueryGuard, job_owner
+from src.mcp.run_query import DatabaseHandler
+from src.utils.constant import QueryGuardConfig
+
+
+class SmallTierConfig(QueryGuardConfig):
+    TIERS = [
+        {"max_rows": 10, "limit": 10_000, "background": 100_000, "reject": 1_000_000},
+        {"max_rows": None, "limit": 1_000, "background": 5_000, "reject": 20_000},
+    ]
+    ROW_LIMIT = 5
+
+
+class TestQueryGuard(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'test.db')}")
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE Task (task_id INTEGER PRIMARY KEY, title TEXT)"))
+            conn.execute(text("CREATE TABLE TimeEntry (time_entry_id INTEGER PRIMARY KEY, task_id INT, hours FLOAT)"))
+            conn.execute(text("CREATE INDEX time_entry_task ON TimeEntry(task_id)"))
+            conn.execute(text("INSERT INTO Task (title) VALUES " + ", ".join(f"('task {i}')" for i in range(100))))
+            conn.execute(text(
+                "INSERT INTO TimeEntry (task_id, hours) VALUES "
+                + ", ".join(f"({i % 100 + 1}, 1.5)" for i in range(400))
+            ))
+        self.guard = QueryGuard(self.engine, config=SmallTierConfig)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_indexed_lookup_is_allowed(self):
+        decision = self.guard.check("SELECT * FROM Task WHERE task_id = 3")
+        self.assertEqual(decision.action, ALLOW)
+        self.assertLess(decision.cost, 100)
+
+    def test_cross_join_is_rejected(self):
+        decision = self.guard.check("SELECT * FROM TimeEntry, Task")
+        self.assertEqual(decision.action, REJECT)
+        self.assertGreaterEqual(decision.cost, 400 * 100)
+
+    def test_index_join_uses_aliases(self):
+        decision = self.guard.check(
+            "SELECT t.title, e.hours FROM TimeEntry e JOIN Task t ON t.task_id = e.task_id WHERE e.hours > 1"
+        )
+        self.assertLess(decision.cost, 5_000)
+        self.assertNotEqual(decision.action, REJECT)
+
+    def test_streamable_query_gets_limit(self):
+        decision = self.guard.check("SELECT * FROM Task t JOIN Task u ON u.title LIKE t.title")
+        self.assertEqual(decision.action, LIMIT)
+        self.assertTrue(decision.sql.endswith("LIMIT 5"))
+
+    def test_bounded_paging_query_is_allowed(self):
+        for tail in ("LIMIT 5", "LIMIT 5 OFFSET 10", "limit 10, 5;"):
+            sql = f"SELECT * FROM Task t JOIN Task u ON u.title LIKE t.title {tail}"
+            decision = self.guard.check(sql)
+            self.assertEqual((decision.action, decision.sql), (ALLOW, sql))
+
+    def test_limit_wraps_sql_ending_in_a_comment(self):
+        decision = self.guard.check("SELECT * FROM Task t JOIN Task u ON u.title LIKE t.title; -- '--' titles")
+        self.assertEqual(decision.sql, "SELECT * FROM (SELECT * FROM Task t JOIN Task u ON u.title LIKE t.title) LIMIT 5")
+        with self.engine.connect() as conn:
+            conn.execute(text(decision.sql)).fetchall()
+
+    def test_aggregate_over_expensive_join_goes_to_background(self):
+        decision = self.guard.check("SELECT COUNT(*) FROM Task t JOIN Task u ON u.title LIKE t.title")
+        self.assertEqual(decision.action, BACKGROUND)
+
+    def test_tier_follows_largest_table(self):
+        self.assertEqual(self.guard.tier(5)["limit"], 10_000)
+        self.assertEqual(self.guard.tier(10_000_000)["limit"], 1_000)
+
+    def test_unexplainable_sql_is_allowed(self):
+        self.assertEqual(self.guard.check("SELECT * FROM Missing").action, ALLOW)
+
+    def test_handler_applies_decisions(self):
+        handler = DatabaseHandler(engine=self.engine, guard=self.guard)
+        self.assertIn("too expensive", handler.execute_query("SELECT * FROM TimeEntry, Task")["message"])
+        limited = handler.execute_query("SELECT * FROM Task t JOIN Task u ON u.title LIKE t.title")
+        self.assertIsInstance(limited, pd.DataFrame)
+        self.assertEqual(len(limited), 5)
+        self.assertEqual(limited.attrs["row_limit"], 5)
+        unguarded = DatabaseHandler(engine=self.engine, guard=False)
+        self.assertIsNone(unguarded.guard)
+
+
+class TestBackgroundJobs(unittest.TestCase):
+    def test_job_result_is_kept_for_polling(self):
+        jobs = BackgroundJobs(workers=1, max_jobs=2)
+        job_id = jobs.submit("SELECT 1", lambda: {"message": "done"})
+        for _ in range(100):
+            if jobs.get(job_id)["status"] != "running":
+                break
+            time.sleep(0.01)
+        self.assertEqual(jobs.get(job_id)["status"], "done")
+        self.assertEqual(jobs.get(job_id)["result"], {"message": "done"})
+        jobs.submit("SELECT 2", lambda: None)
+        jobs.submit("SELECT 3", lambda: None)
+        self.assertIsNone(jobs.get(job_id))
+
+
+    def test_job_is_visible_to_its_owner_only(self):
+        jobs = BackgroundJobs(workers=1)
+        with job_owner("a@example.com"):
+            job_id = jobs.submit("SELECT 1", lambda: None)
+        self.assertIsNotNone(jobs.get(job_id, owner="a@example.com"))
+        self.assertIsNone(jobs.get(job_id, owner="b@example.com"))
+        jobs.share(job_id, "b@example.com")
+        self.assertIsNotNone(jobs.get(job_id, owner="b@example.com"))
+        self.assertIsNone(jobs.get(job_id, owner=""))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import asyncio
+import time
+import unittest
+
+from src.mcp.resilient_llm import (
+    CircuitBreaker,
+    LLMHealth,
+    LLMUnavailableError,
+    guard_async_llm,
+    guard_llm,
+    request_deadline,
+)
+
+
+class _Config:
+    CALL_TIMEOUT = 5.0
+    MIN_CALL_SECONDS = 0.05
+    MAX_RETRIES = 2
+    BACKOFF_BASE = 0.001
+    BACKOFF_MAX = 0.002
+    HEDGE_ENABLED = False
+    HEDGE_PERCENTILE = 0.95
+    HEDGE_MIN_SAMPLES = 3
+    HEDGE_WORKERS = 4
+    LATENCY_WINDOW = 50
+    BREAKER_FAILURE_THRESHOLD = 2
+    BREAKER_RESET_SECONDS = 60
+    SLOW_CALL_SECONDS = 10
+
+
+class _HedgeConfig(_Config):
+    HEDGE_ENABLED = True
+
+
+class _Completions:
+    def __init__(self, outcomes, delays=None):
+        self.outcomes = list(outcomes)
+        self.delays = list(delays or [])
+        self.calls = []
+
+    def _next(self, kwargs):
+        self.calls.append(kwargs)
+        delay = self.delays.pop(0) if self.delays else 0
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        return delay, outcome
+
+    def create(self, **kwargs):
+        delay, outcome = self._next(kwargs)
+        time.sleep(delay)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, **kwargs):
+        delay, outcome = self._next(kwargs)
+        await asyncio.sleep(delay)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+class _Client:
+    def __init__(self, completions):
+        self.chat = type("Chat", (), {"completions": completions})()
+
+
+class TestResilientLLM(unittest.TestCase):
+    def setUp(self):
+        self.health = LLMHealth(_Config)
+
+    def test_retries_transient_errors(self):
+        completions = _Completions([TimeoutError("slow"), "ok"])
+        client = guard_llm(_Client(completions), config=_Config, health=self.health)
+        self.assertEqual(client.chat.completions.create(model="m"), "ok")
+        self.assertEqual(len(completions.calls), 2)
+        self.assertEqual(self.health.counters["retries"], 1)
+
+    def test_non_retryable_error_raised_immediately(self):
+        completions = _Completions([ValueError("bad request")])
+        client = guard_llm(_Client(completions), config=_Config, health=self.health)
+        with self.assertRaises(ValueError):
+            client.chat.completions.create(model="m")
+        self.assertEqual(len(completions.calls), 1)
+
+    def test_timeout_derived_from_deadline(self):
+        completions = _Completions(["ok"])
+        client = guard_llm(_Client(completions), config=_Config, health=self.health)
+        with request_deadline(1.0):
+            client.chat.completions.create(model="m")
+        self.assertLessEqual(completions.calls[0]["timeout"], 1.0)
+        client.chat.completions.create(model="m")
+        self.assertEqual(completions.calls[1]["timeout"], _Config.CALL_TIMEOUT)
+
+    def test_expired_deadline_fails_fast(self):
+        completions = _Completions(["ok"])
+        client = guard_llm(_Client(completions), config=_Config, health=self.health)
+        with request_deadline(0.01):
+            time.sleep(0.02)
+            with self.assertRaises(LLMUnavailableError):
+                client.chat.completions.create(model="m")
+        self.assertEqual(completions.calls, [])
+
+    def test_circuit_opens_and_short_circuits(self):
+        completions = _Completions([TimeoutError("slow")])
+        client = guard_llm(_Client(completions), config=_Config, health=self.health)
+        # The retry after the second failure finds the circuit already open
+        with self.assertRaises(LLMUnavailableError):
+            client.chat.completions.create(model="m")
+        self.assertEqual(self.health.breaker.state, "open")
+        calls = len(completions.calls)
+        self.assertEqual(calls, _Config.BREAKER_FAILURE_THRESHOLD)
+        with self.assertRaises(LLMUnavailableError):
+            client.chat.completions.create(model="m")
+        self.assertEqual(len(completions.calls), calls)
+        self.assertEqual(self.health.counters["short_circuits"], 2)
+
+    def test_sync_hedge_wins_over_slow_call(self):
+        health = LLMHealth(_HedgeConfig)
+        for _ in range(5):
+            health.record_latency(0.01)
+        completions = _Completions(["slow", "fast"], delays=[0.5, 0.0])
+        client = guard_llm(_Client(completions), config=_HedgeConfig, health=health)
+        started = time.monotonic()
+        self.assertEqual(client.chat.completions.create(model="m"), "fast")
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(health.counters["hedges"], 1)
+
+    def test_guard_is_idempotent(self):
+        client = guard_llm(_Client(_Completions(["ok"])))
+        self.assertIs(guard_llm(client), client)
+        self.assertIsNone(guard_llm(None))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_half_open_after_reset(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        time.sleep(0.02)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+
+class TestAsyncResilientLLM(unittest.IsolatedAsyncioTestCase):
+    async def test_async_retry_and_timeout(self):
+        health = LLMHealth(_Config)
+        completions = _AsyncCompletions(["late", "ok"], delays=[0.3, 0.0])
+        client = guard_async_llm(_Client(completions), config=_Config, health=health)
+        with request_deadline(0.2):
+            with self.assertRaises(asyncio.TimeoutError):
+                await client.chat.completions.create(model="m")
+        self.assertEqual(health.counters["timeouts"], 1)
+        self.assertEqual(await client.chat.completions.create(model="m"), "ok")
+
+    async def test_async_hedge_wins_over_slow_call(self):
+        health = LLMHealth(_HedgeConfig)
+        for _ in range(5):
+            health.record_latency(0.01)
+        completions = _AsyncCompletions(["slow", "fast"], delays=[1.0, 0.0])
+        client = guard_async_llm(_Client(completions), config=_HedgeConfig, health=health)
+        self.assertEqual(await client.chat.completions.create(model="m"), "fast")
+        self.assertEqual(health.counters["hedges"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.mcp.result_cache import ResultCache, canonical_sql
+from src.mcp.run_query import DatabaseHandler, create_sqlite_engines
+
+
+class TestCanonicalSql(unittest.TestCase):
+    def test_equivalent_spellings_share_a_key(self):
+        self.assertEqual(
+            canonical_sql("SELECT status FROM Invoice\n  WHERE amount >  10.50 -- overdue\n;"),
+            canonical_sql("SELECT status from invoice where AMOUNT > 10.5"),
+        )
+        self.assertEqual(canonical_sql("select  a ,  b  FROM t"), canonical_sql("select a , b from T"))
+
+    def test_meaningful_differences_are_kept(self):
+        self.assertNotEqual(canonical_sql("SELECT * FROM t WHERE s = 'PAID'"), canonical_sql("SELECT * FROM t WHERE s = 'paid'"))
+        self.assertNotEqual(canonical_sql("SELECT * FROM t WHERE x > 1"), canonical_sql("SELECT * FROM t WHERE x > 1.0"))
+        # Unaliased select-list text is the column label
+        self.assertNotEqual(canonical_sql("SELECT COUNT(*) FROM t"), canonical_sql("SELECT count(*) FROM t"))
+
+    def test_nested_select_lists_and_aliases_are_kept(self):
+        # An outer SELECT * takes its labels from the subquery's or CTE's select list
+        self.assertNotEqual(canonical_sql("SELECT * FROM (SELECT Name FROM t)"), canonical_sql("SELECT * FROM (SELECT name FROM t)"))
+        self.assertNotEqual(
+            canonical_sql("WITH c AS (SELECT Name FROM t) SELECT * FROM c"),
+            canonical_sql("WITH c AS (SELECT name FROM t) SELECT * FROM c"),
+        )
+        self.assertNotEqual(canonical_sql("WITH c(Name) AS (SELECT 1) SELECT * FROM c"), canonical_sql("WITH c(name) AS (SELECT 1) SELECT * FROM c"))
+        self.assertEqual(
+            canonical_sql("SELECT * FROM (SELECT Name FROM T  WHERE X = 1.50)"),
+            canonical_sql("select * from (SELECT Name from t where x = 1.5)"),
+        )
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.reader, self.writer = create_sqlite_engines(os.path.join(self.tmp.name, "test.db"))
+        with self.writer.begin() as conn:
+            conn.execute(text("CREATE TABLE Invoice (invoice_id INTEGER PRIMARY KEY, status TEXT, amount FLOAT)"))
+            conn.execute(text("INSERT INTO Invoice (status, amount) VALUES ('PAID', 10.0), ('OVERDUE', 5.5), ('PAID', 2.0)"))
+        self.handler = DatabaseHandler(engine=self.reader, guard=False)
+
+    def tearDown(self):
+        self.reader.dispose()
+        self.writer.dispose()
+        self.tmp.cleanup()
+
+    def test_hit_returns_an_independent_copy(self):
+        first = self.handler.execute_query("SELECT status, amount FROM Invoice ORDER BY invoice_id")
+        first.loc[0, "amount"] = -1
+        second = self.handler.execute_query("select status, amount from invoice  order by INVOICE_ID")
+        self.assertEqual(self.handler.result_cache.stats()["hits"], 1)
+        self.assertEqual(second["amount"].tolist(), [10.0, 5.5, 2.0])
+        self.assertEqual(second["status"].tolist(), ["PAID", "OVERDUE", "PAID"])
+        self.assertEqual(list(second.dtypes), list(pd.read_sql("SELECT status, amount FROM Invoice", self.reader).dtypes))
+
+    def test_writes_invalidate(self):
+        query = "SELECT COUNT(*) AS n FROM Invoice"
+        self.assertEqual(self.handler.execute_query(query)["n"].iloc[0], 3)
+        with self.writer.begin() as conn:
+            conn.execute(text("INSERT INTO Invoice (status, amount) VALUES ('PAID', 1.0)"))
+        self.assertEqual(self.handler.execute_query(query)["n"].iloc[0], 4)
+        self.assertEqual(self.handler.result_cache.stats()["hits"], 0)
+
+    def test_result_read_during_a_write_is_not_cached(self):
+        cache = self.handler.result_cache
+        version = cache.data_version()
+        with self.writer.begin() as conn:
+            conn.execute(text("DELETE FROM Invoice"))
+        cache.put("SELECT * FROM Invoice", pd.DataFrame({"x": [1]}), version)
+        self.assertIsNone(cache.get("SELECT * FROM Invoice"))
+
+    def test_byte_bound_evicts_least_recently_used(self):
+        frame = pd.DataFrame({"x": range(1000)})
+        cache = ResultCache(self.reader, max_bytes=frame["x"].array.nbytes * 2)
+        for name in ("a", "b"):
+            cache.put(f"SELECT {name}", frame, cache.data_version())
+        cache.get("SELECT a")
+        cache.put("SELECT c", frame, cache.data_version())
+        self.assertIsNotNone(cache.get("SELECT a"))
+        self.assertIsNone(cache.get("SELECT b"))
+        self.assertLessEqual(cache.stats()["bytes"], cache.max_bytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
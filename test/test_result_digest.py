@@ -0,0 +1,72 @@
+import json
+import unittest
+
+import pandas as pd
+
+from src.mcp.result_digest import digest_result, stratified_sample
+from src.mcp.sql_history import estimate_tokens
+
+
+class TestDigestResult(unittest.TestCase):
+    def setUp(self):
+        rows = 50000
+        self.large = pd.DataFrame({
+            "status": ["Paid", "Unpaid", "Overdue", "Paid"] * (rows // 4),
+            "amount": [float(i % 997) for i in range(rows)],
+            "invoice_date": pd.date_range("2023-01-01", periods=rows, freq="h").strftime("%Y-%m-%d"),
+            "note": [f"free text note number {i}" for i in range(rows)],
+        })
+
+    def test_row_limit_is_reported(self):
+        cut = self.large.head(5000).copy()
+        cut.attrs["row_limit"] = 5000
+        digest = json.loads(digest_result(cut))
+        self.assertEqual((digest["truncated"], digest["row_limit"], digest["row_count"]), (True, 5000, 5000))
+        small = pd.DataFrame({"n": [1, 2]})
+        small.attrs["row_limit"] = 2
+        self.assertTrue(json.loads(digest_result(small))["truncated"])
+        self.assertNotIn("truncated", json.loads(digest_result(pd.DataFrame({"n": [1, 2]}))))
+
+    def test_small_result_sent_in_full(self):
+        df = pd.DataFrame({"status": ["Paid", "Unpaid"], "total": [10, 20]})
+        payload = json.loads(digest_result(df))
+        self.assertEqual(payload["rows"], [{"status": "Paid", "total": 10}, {"status": "Unpaid", "total": 20}])
+
+    def test_large_result_within_byte_cap(self):
+        text = digest_result(self.large, max_bytes=2000)
+        self.assertLessEqual(len(text.encode("utf-8")), 2000)
+        payload = json.loads(text)
+        self.assertEqual(payload["row_count"], 50000)
+        self.assertNotIn("rows", payload)
+        self.assertEqual(payload["stats"]["amount"]["max"], 996.0)
+        self.assertEqual(payload["stats"]["invoice_date"]["min"], "2023-01-01T00:00:00")
+        self.assertEqual(payload["stats"]["status"]["top"][0], ["Paid", 25000])
+
+    def test_token_cap(self):
+        text = digest_result(self.large, max_tokens=300)
+        self.assertLessEqual(estimate_tokens(text), 300)
+        self.assertEqual(json.loads(text)["row_count"], 50000)
+
+    def test_tiny_cap_still_valid_or_truncated(self):
+        text = digest_result(self.large, max_bytes=120)
+        self.assertLessEqual(len(text.encode("utf-8")), 120)
+
+    def test_non_dataframe_passthrough(self):
+        self.assertEqual(json.loads(digest_result({"message": "hi"})), {"message": "hi"})
+
+
+class TestStratifiedSample(unittest.TestCase):
+    def test_every_group_represented(self):
+        df = pd.DataFrame({"region": ["north"] * 95 + ["south"] * 4 + ["east"], "value": range(100)})
+        sample = stratified_sample(df, 10)
+        self.assertLessEqual(len(sample), 10)
+        self.assertEqual(set(sample["region"]), {"north", "south", "east"})
+
+    def test_even_spacing_without_categories(self):
+        df = pd.DataFrame({"value": range(100)})
+        sample = stratified_sample(df, 5)
+        self.assertEqual(list(sample["value"]), [0, 25, 50, 74, 99])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.mcp.query_guard import BACKGROUND, GuardDecision, background_jobs
+from src.mcp.result_pages import ResultPages
+from src.mcp.run_query import DatabaseHandler, create_sqlite_engines
+from src.utils.constant import ResultPageConfig
+
+SQL = "SELECT n FROM Numbers ORDER BY n"
+
+
+class TestResultPages(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.reader, self.writer = create_sqlite_engines(os.path.join(self.tmp.name, "test.db"))
+        with self.writer.begin() as conn:
+            conn.execute(text("CREATE TABLE Numbers (n INTEGER PRIMARY KEY)"))
+            conn.execute(text(
+                "WITH RECURSIVE g(v) AS (SELECT 1 UNION ALL SELECT v + 1 FROM g WHERE v < 25) "
+                "INSERT INTO Numbers SELECT v FROM g"
+            ))
+        self.handler = DatabaseHandler(engine=self.reader)
+        self.pages = ResultPages(self.handler, page_size=10)
+
+    def tearDown(self):
+        self.reader.dispose()
+        self.writer.dispose()
+        self.tmp.cleanup()
+
+    def test_first_page_comes_from_fetched_rows(self):
+        first = self.pages.first_page(SQL, self.handler.execute_query(SQL), owner="a")
+        self.assertEqual(first["rows"]["n"].tolist(), list(range(1, 11)))
+        self.assertTrue(first["has_more"])
+        self.assertEqual(first["total_rows"], 25)
+        self.assertIsNotNone(first["result_id"])
+
+        small = self.pages.first_page("SELECT 1 AS n", pd.DataFrame({"n": [1]}), owner="a")
+        self.assertEqual((small["has_more"], small["result_id"]), (False, None))
+
+    async def test_later_pages_are_fetched_by_handle(self):
+        first = self.pages.first_page(SQL + ";", self.handler.execute_query(SQL), owner="a")
+        second = self.pages.page(first["result_id"], 2, owner="a")
+        self.assertEqual(second["rows"]["n"].tolist(), list(range(11, 21)))
+        self.assertTrue(second["has_more"])
+        last = await self.pages.apage(first["result_id"], 3, owner="a")
+        self.assertEqual(last["rows"]["n"].tolist(), list(range(21, 26)))
+        self.assertFalse(last["has_more"])
+        beyond = self.pages.page(first["result_id"], 4, owner="a")
+        self.assertIn("message", beyond["rows"])
+
+    def test_pages_come_from_one_cursor_and_stay_stable(self):
+        sql = SQL + " -- every number"
+        first = self.pages.first_page(sql, self.handler.execute_query(sql), owner="a")
+        with mock.patch.object(self.handler, "open_cursor", wraps=self.handler.open_cursor) as open_cursor:
+            self.assertEqual(self.pages.page(first["result_id"], 2, owner="a")["rows"]["n"].tolist(), list(range(11, 21)))
+            # Rows written after the cursor opened do not shift later pages
+            with self.writer.begin() as conn:
+                conn.execute(text("INSERT INTO Numbers VALUES (0), (-1), (-2)"))
+            self.assertEqual(self.pages.page(first["result_id"], 3, owner="a")["rows"]["n"].tolist(), list(range(21, 26)))
+            self.assertEqual(open_cursor.call_count, 1)
+            # An earlier page reopens the cursor on current data
+            self.assertEqual(self.pages.page(first["result_id"], 2, owner="a")["rows"]["n"].tolist(), list(range(8, 18)))
+            self.assertEqual(open_cursor.call_count, 2)
+        self.pages.close()
+
+    def test_job_result_pages_without_rerunning(self):
+        decision = GuardDecision(BACKGROUND, SQL, 1e9, "test")
+        with mock.patch.object(self.handler.guard, "check", return_value=decision):
+            job_id = self.handler.execute_query(SQL)["job_id"]
+            for _ in range(500):
+                job = background_jobs.get(job_id)
+                if job["status"] != "running":
+                    break
+                time.sleep(0.01)
+            first = self.pages.first_page(job["sql"], job["result"], owner="a", materialized=True)
+            # Re-running the SQL would go to the background again
+            self.assertIn("job_id", self.handler.execute_query(SQL))
+            with mock.patch.object(self.handler, "open_cursor") as open_cursor:
+                second = self.pages.page(first["result_id"], 2, owner="a")
+                last = self.pages.page(first["result_id"], 3, owner="a")
+            open_cursor.assert_not_called()
+        self.assertEqual(second["rows"]["n"].tolist(), list(range(11, 21)))
+        self.assertTrue(second["has_more"])
+        self.assertEqual(last["rows"]["n"].tolist(), list(range(21, 26)))
+        self.assertFalse(last["has_more"])
+        self.assertIn("message", self.pages.page(first["result_id"], 4, owner="a")["rows"])
+
+    def test_open_cursors_are_capped(self):
+        with mock.patch.object(ResultPageConfig, "MAX_CURSORS", 1):
+            ids = [self.pages.first_page(SQL, self.handler.execute_query(SQL), owner="a")["result_id"] for _ in range(2)]
+            for result_id in ids:
+                self.pages.page(result_id, 2, owner="a")
+            self.assertEqual([handle["cursor"] is not None for handle in self.pages._handles.values()], [False, True])
+            # A closed cursor is reopened at the requested page
+            self.assertEqual(self.pages.page(ids[0], 3, owner="a")["rows"]["n"].tolist(), list(range(21, 26)))
+        self.pages.close()
+
+    def test_idle_cursors_are_closed(self):
+        with mock.patch.object(ResultPageConfig, "CURSOR_IDLE_SECONDS", 0.05):
+            first = self.pages.first_page(SQL, self.handler.execute_query(SQL), owner="a")
+            self.pages.page(first["result_id"], 2, owner="a")
+            handle = self.pages._handles[first["result_id"]]
+            self.assertIsNotNone(handle["cursor"])
+            deadline = time.monotonic() + 5
+            while handle["cursor"] is not None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertIsNone(handle["cursor"])
+            # The snapshot is gone: a checkpoint can reset the whole WAL
+            with self.writer.connect() as conn:
+                busy = conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+            self.assertEqual(busy, 0)
+            # The next page reopens the cursor
+            self.assertEqual(self.pages.page(first["result_id"], 3, owner="a")["rows"]["n"].tolist(), list(range(21, 26)))
+        self.pages.close()
+
+    def test_handles_are_owner_scoped_and_expire(self):
+        first = self.pages.first_page(SQL, self.handler.execute_query(SQL), owner="a")
+        self.assertIsNone(self.pages.page(first["result_id"], 2, owner="b"))
+        self.assertIsNone(self.pages.page("missing", 2, owner="a"))
+        with mock.patch("src.mcp.result_pages.time.time", return_value=time.time() + ResultPageConfig.TTL_SECONDS + 1):
+            self.assertIsNone(self.pages.page(first["result_id"], 2, owner="a"))
+
+    def test_reads_are_bounded(self):
+        with mock.patch.object(ResultPageConfig, "MAX_ROWS", 12), mock.patch.object(ResultPageConfig, "CHUNK_ROWS", 5):
+            result = DatabaseHandler(engine=self.reader, guard=False, result_cache=False).execute_query(SQL)
+        self.assertEqual(result["n"].tolist(), list(range(1, 13)))
+        self.assertEqual(result.attrs["row_limit"], 12)
+        self.assertIsNone(self.pages.first_page(SQL, result)["total_rows"])
+
+
+if __name__ == '__main__':
+    unittest.main()
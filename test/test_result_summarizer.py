@@ -0,0 +1,70 @@
+import unittest
+
+import pandas as pd
+
+from src.mcp.result_summarizer import format_value, humanize_column, summarize_locally
+
+
+class TestHelpers(unittest.TestCase):
+    def test_humanize_column(self):
+        self.assertEqual(humanize_column("COUNT(*)"), "count")
+        self.assertEqual(humanize_column("total_amount"), "total amount")
+        self.assertEqual(humanize_column("SUM(i.total_amount)"), "total of total amount")
+        self.assertEqual(humanize_column("avg(hours)"), "average of hours")
+
+    def test_format_value(self):
+        self.assertEqual(format_value(1234567), "1,234,567")
+        self.assertEqual(format_value(1234.5), "1,234.50")
+        self.assertEqual(format_value(12.0), "12")
+        self.assertEqual(format_value(None), "no value")
+
+
+class TestSummarizeLocally(unittest.TestCase):
+    def test_how_many_with_predicate(self):
+        df = pd.DataFrame({"COUNT(*)": [42]})
+        self.assertEqual(summarize_locally("how many invoices are overdue?", df), "42 invoices are overdue.")
+
+    def test_row_limited_result_goes_to_llm(self):
+        df = pd.DataFrame({"status": ["PAID", "SENT"], "COUNT(*)": [3, 4]})
+        self.assertIsNotNone(summarize_locally("invoices per status", df))
+        df.attrs["row_limit"] = 2
+        self.assertIsNone(summarize_locally("invoices per status", df))
+
+    def test_how_many_existence(self):
+        df = pd.DataFrame({"COUNT(*)": [1]})
+        self.assertEqual(summarize_locally("How many customers are there", df), "There is 1 customer.")
+
+    def test_scalar_uses_column_label(self):
+        df = pd.DataFrame({"SUM(total_amount)": [15230.5]})
+        self.assertEqual(summarize_locally("total billed this year", df), "The total of total amount is 15,230.50.")
+
+    def test_single_row(self):
+        df = pd.DataFrame({"company_name": ["Acme"], "total_amount": [1200.0]})
+        self.assertEqual(
+            summarize_locally("top customer", df),
+            "The company name is Acme and the total amount is 1,200.",
+        )
+
+    def test_grouped(self):
+        df = pd.DataFrame({"status": ["PAID", "SENT", "OVERDUE"], "COUNT(*)": [10, 4, 2]})
+        self.assertEqual(
+            summarize_locally("invoices by status", df),
+            "The count by status is PAID: 10; SENT: 4; OVERDUE: 2. "
+            "The highest is PAID (10) and the lowest is OVERDUE (2).",
+        )
+
+    def test_list(self):
+        df = pd.DataFrame({"department_name": ["Sales", "Ops"]})
+        self.assertEqual(summarize_locally("departments", df), "There are 2 results for department name: Sales and Ops.")
+
+    def test_empty(self):
+        self.assertEqual(summarize_locally("overdue invoices", pd.DataFrame({"a": []})), "No matching records were found.")
+
+    def test_complex_shape_defers_to_llm(self):
+        df = pd.DataFrame({"a": range(50), "b": range(50), "c": ["x"] * 50})
+        self.assertIsNone(summarize_locally("everything", df))
+        self.assertIsNone(summarize_locally("hello", {"message": "hi"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.mcp.rollups import RollupManager, RollupRewriter
+from src.mcp.run_query import DatabaseHandler, create_sqlite_engines
+
+REWRITTEN = [
+    "SELECT customer_id, strftime('%Y-%m', issue_date) AS month, SUM(total_amount) AS total "
+    "FROM Invoice GROUP BY customer_id, month ORDER BY customer_id, month",
+    "SELECT COUNT(*), AVG(amount) FROM Invoice WHERE status = 'PAID'",
+    "select i.status, count(*) as n, round(sum(i.tax_amount), 2) from Invoice i "
+    "where strftime('%Y', i.issue_date) = '2024' group by i.status having count(*) > 1 order by n desc, 1",
+    "SELECT COUNT(*) FROM Invoice WHERE customer_id = '99'",
+    "SELECT payment_method, SUM(amount) AS total FROM Payment GROUP BY payment_method ORDER BY total DESC;",
+    "SELECT SUM(amount) AS total_payments FROM Payment WHERE strftime('%Y-%m', payment_date) = '2024-02'",
+    "SELECT project_id, SUM(hours) AS hours FROM TimeEntry WHERE billable = 1 GROUP BY project_id",
+    "SELECT customer_id, COUNT(*) AS n, SUM(amount) AS s_amount FROM Invoice GROUP BY customer_id HAVING n > 42",
+]
+NOT_REWRITTEN = [
+    "SELECT * FROM Invoice",
+    "SELECT status FROM Invoice",
+    "SELECT MAX(amount) FROM Invoice",
+    "SELECT SUM(amount) FROM Invoice WHERE issue_date >= '2024-02-01'",
+    "SELECT COUNT(DISTINCT customer_id) FROM Invoice",
+    "SELECT c.sector, SUM(i.amount) FROM Invoice i JOIN Customer c ON c.customer_id = i.customer_id GROUP BY 1",
+    "SELECT SUM(amount) FROM Invoice WHERE customer_id IN (SELECT customer_id FROM Customer)",
+    "SELECT strftime('%Y-%m-%d', issue_date), COUNT(*) FROM Invoice GROUP BY 1",
+    "SELECT status, COUNT(*) AS issue_month FROM Invoice GROUP BY status HAVING issue_month > 1",
+    "SELECT status, COUNT(*) AS _rollup_n FROM Invoice GROUP BY status HAVING _rollup_n > 1",
+]
+
+
+class TestRollups(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.reader, self.writer = create_sqlite_engines(os.path.join(self.tmp.name, "test.db"))
+        with self.writer.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE Invoice (invoice_id INTEGER PRIMARY KEY, customer_id INT NOT NULL, amount FLOAT NOT NULL, "
+                "tax_amount FLOAT NOT NULL, total_amount FLOAT NOT NULL, issue_date DATE NOT NULL, "
+                "status VARCHAR(10) NOT NULL)"
+            ))
+            conn.execute(text(
+                "CREATE TABLE Payment (payment_id INTEGER PRIMARY KEY, invoice_id INT, amount FLOAT NOT NULL, "
+                "payment_date DATE NOT NULL, payment_method TEXT NOT NULL)"
+            ))
+            conn.execute(text(
+                "CREATE TABLE TimeEntry (time_entry_id INTEGER PRIMARY KEY, employee_id INT, project_id INT, "
+                "date DATE NOT NULL, hours FLOAT NOT NULL, billable BOOLEAN NOT NULL)"
+            ))
+            conn.execute(text("CREATE TABLE Customer (customer_id INTEGER PRIMARY KEY, sector TEXT)"))
+            conn.execute(text(
+                "WITH RECURSIVE g(v) AS (SELECT 1 UNION ALL SELECT v + 1 FROM g WHERE v < 300) "
+                "INSERT INTO Invoice (customer_id, amount, tax_amount, total_amount, issue_date, status) "
+                "SELECT v % 7, v * 10, v, v * 11, date('2024-01-01', '+' || v || ' days'), "
+                "CASE v % 3 WHEN 0 THEN 'DRAFT' WHEN 1 THEN 'SENT' ELSE 'PAID' END FROM g"
+            ))
+            conn.execute(text(
+                "INSERT INTO Payment (invoice_id, amount, payment_date, payment_method) VALUES "
+                "(1, 100, '2024-02-03', 'CASH'), (2, 50.5, '2024-02-20', 'CHECK'), (3, 70, '2024-03-01', 'CASH')"
+            ))
+            conn.execute(text(
+                "INSERT INTO TimeEntry (employee_id, project_id, date, hours, billable) VALUES "
+                "(1, 1, '2024-01-02', 8, 1), (2, 1, '2024-01-03', 4.5, 0), (1, 2, '2024-02-01', 6, 1)"
+            ))
+        self.manager = RollupManager(self.writer)
+        self.rewriter = RollupRewriter(self.reader)
+
+    def tearDown(self):
+        self.reader.dispose()
+        self.writer.dispose()
+        self.tmp.cleanup()
+
+    def assertSameResult(self, sql):
+        rewritten = self.rewriter.rewrite(sql)
+        self.assertIsNotNone(rewritten, sql)
+        with self.reader.connect() as conn:
+            expected = pd.read_sql(text(sql), conn)
+            actual = pd.read_sql(text(rewritten[0]), conn)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, obj=sql)
+
+    def test_install_skips_missing_tables_and_rewrites_match(self):
+        self.assertEqual(self.manager.install(), [
+            "rollup_invoice_monthly", "rollup_payment_monthly", "rollup_timeentry_monthly",
+        ])
+        for sql in REWRITTEN:
+            self.assertSameResult(sql)
+        for sql in NOT_REWRITTEN:
+            self.assertIsNone(self.rewriter.rewrite(sql), sql)
+
+    def test_triggers_keep_rollups_current(self):
+        self.manager.install()
+        with self.writer.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO Invoice (customer_id, amount, tax_amount, total_amount, issue_date, status) "
+                "VALUES (99, 5, 1, 6, '2025-06-01', 'PAID')"
+            ))
+            conn.execute(text("UPDATE Invoice SET status = 'PAID', amount = amount + 1 WHERE invoice_id % 5 = 0"))
+            conn.execute(text("UPDATE Invoice SET issue_date = '2023-12-31' WHERE invoice_id = 7"))
+            conn.execute(text("DELETE FROM Invoice WHERE customer_id = 3"))
+            conn.execute(text("DELETE FROM Payment WHERE payment_method = 'CHECK'"))
+        for sql in REWRITTEN:
+            self.assertSameResult(sql)
+        with self.reader.connect() as conn:
+            empty = conn.execute(text("SELECT COUNT(*) FROM rollup_invoice_monthly WHERE customer_id = 3")).scalar()
+        self.assertEqual(empty, 0)
+
+    def test_real_sums_drift_until_rebuilt(self):
+        self.manager.install()
+        with self.writer.begin() as conn:
+            for _ in range(300):
+                conn.execute(text("UPDATE Payment SET amount = amount + 0.1 WHERE payment_id = 2"))
+        sql = "SELECT SUM(amount) AS total FROM Payment"
+        rewritten = self.rewriter.rewrite(sql)[0]
+        with self.reader.connect() as conn:
+            self.assertAlmostEqual(conn.execute(text(rewritten)).scalar(), conn.execute(text(sql)).scalar(), places=6)
+        self.manager.rebuild()
+        with self.reader.connect() as conn:
+            self.assertEqual(conn.execute(text(rewritten)).scalar(), conn.execute(text(sql)).scalar())
+
+    def test_rebuild_matches_incremental_state(self):
+        self.manager.install()
+        with self.writer.begin() as conn:
+            conn.execute(text("DELETE FROM Invoice WHERE invoice_id < 100"))
+            before = conn.execute(text("SELECT * FROM rollup_invoice_monthly ORDER BY 1, 2, 3")).fetchall()
+        self.manager.rebuild()
+        with self.reader.connect() as conn:
+            after = conn.execute(text("SELECT * FROM rollup_invoice_monthly ORDER BY 1, 2, 3")).fetchall()
+        self.assertEqual(before, after)
+
+    def test_handler_reads_from_rollup(self):
+        self.manager.install()
+        handler = DatabaseHandler(engine=self.reader, guard=False, result_cache=False)
+        result = handler.execute_query("SELECT COUNT(*) FROM Invoice WHERE status = 'PAID'")
+        self.assertEqual(list(result.columns), ["COUNT(*)"])
+        self.assertEqual(result.iloc[0, 0], 100)
+        self.manager.drop()
+        # Without the rollups the query is run as written
+        self.assertIsNone(RollupRewriter(self.reader).rewrite("SELECT COUNT(*) FROM Invoice"))
+
+
+if __name__ == '__main__':
+    unittest.main()
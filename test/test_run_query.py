@@ -0,0 +1,98 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from src.mcp.run_query import DatabaseHandler, DynamicDatabase, create_sqlite_engines
+
+
+class TestDatabaseHandler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'test.db')}")
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE Invoice (invoice_id INTEGER PRIMARY KEY, status TEXT, amount FLOAT)"))
+            conn.execute(text("INSERT INTO Invoice (status, amount) VALUES ('PAID', 10.0), ('OVERDUE', 5.5)"))
+        self.handler = DatabaseHandler(engine=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_execute_query_returns_dataframe(self):
+        result = self.handler.execute_query("SELECT status FROM Invoice ORDER BY invoice_id")
+        self.assertIsInstance(result, pd.DataFrame)
+        self.assertEqual(result["status"].tolist(), ["PAID", "OVERDUE"])
+
+    def test_execute_query_empty_and_invalid(self):
+        self.assertIn("message", self.handler.execute_query("SELECT * FROM Invoice WHERE 1 = 0"))
+        self.assertIn("message", self.handler.execute_query(""))
+        failed = self.handler.execute_query("SELECT * FROM Missing")
+        self.assertTrue({"message", "error"} & set(failed))
+
+    async def test_aexecute_query_matches_sync(self):
+        result = await self.handler.aexecute_query("SELECT SUM(amount) AS total FROM Invoice")
+        self.assertEqual(result["total"].iloc[0], 15.5)
+
+
+class TestSQLiteEngines(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.reader, self.writer = create_sqlite_engines(os.path.join(self.tmp.name, 'test.db'))
+        with self.writer.begin() as conn:
+            conn.execute(text("CREATE TABLE Task (task_id INTEGER PRIMARY KEY, name TEXT)"))
+            conn.execute(text("INSERT INTO Task (name) VALUES ('a'), ('b')"))
+
+    def tearDown(self):
+        self.reader.dispose()
+        self.writer.dispose()
+        self.tmp.cleanup()
+
+    def test_reader_sees_writer_commits_and_cannot_write(self):
+        handler = DatabaseHandler(engine=self.reader)
+        self.assertEqual(len(handler.execute_query("SELECT * FROM Task")), 2)
+        with self.writer.begin() as conn:
+            conn.execute(text("INSERT INTO Task (name) VALUES ('c')"))
+        self.assertEqual(len(handler.execute_query("SELECT * FROM Task")), 3)
+        with self.assertRaises(Exception):
+            with self.reader.begin() as conn:
+                conn.execute(text("DELETE FROM Task"))
+
+    def test_pragmas(self):
+        with self.reader.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA query_only")).scalar(), 1)
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(conn.execute(text("PRAGMA temp_store")).scalar(), 2)
+        self.assertEqual(self.writer.pool.size(), 1)
+
+
+class TestDynamicDatabase(unittest.TestCase):
+    def test_concurrent_first_use_connects_once(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(DynamicDatabase, "_instance", None), \
+                mock.patch("src.mcp.run_query.SQLitePoolConfig.DB_FILE", os.path.join(directory, "app.db")), \
+                mock.patch("src.mcp.run_query.create_sqlite_engines", wraps=create_sqlite_engines) as factory:
+            engines, barrier = [], threading.Barrier(8)
+
+            def first_use():
+                barrier.wait()
+                engines.append(DynamicDatabase().get_engine())
+
+            threads = [threading.Thread(target=first_use) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(factory.call_count, 1)
+            self.assertEqual(len({id(engine) for engine in engines}), 1)
+            database = DynamicDatabase()
+            database.get_engine().dispose()
+            database.get_writer_engine().dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
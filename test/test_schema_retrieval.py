@@ -0,0 +1,65 @@
+import unittest
+
+from src.mcp.schema_retrieval import SchemaIndex, split_columns, tokenize
+from src.mcp.sql_history import SQLHistory
+from src.mcp.sql_query_generation import SQLQueryGenerator
+from src.utils.constant import DBConstant
+
+
+class TestSchemaRetrieval(unittest.TestCase):
+    def setUp(self):
+        self.index = SchemaIndex(DBConstant.db_schema)
+
+    def test_split_columns_keeps_enum_lists_together(self):
+        columns = split_columns("id INT, status ENUM('A', 'B', 'C') NOT NULL, note TEXT")
+        self.assertEqual(len(columns), 3)
+        self.assertTrue(columns[1].startswith("status ENUM"))
+
+    def test_tokenize_splits_and_stems(self):
+        self.assertEqual(tokenize("TimeEntry invoices due_date"), ["time", "entry", "invoice", "due", "date"])
+
+    def test_foreign_keys_are_detected(self):
+        self.assertIn("Customer", self.index.neighbours["Invoice"])
+        self.assertIn("Department", self.index.neighbours["Employee"])
+        self.assertIn("Employee", self.index.neighbours["Department"])
+
+    def test_enum_value_selects_table(self):
+        selected = self.index.select("which tasks are blocked")
+        self.assertIn("Task", selected)
+        self.assertNotIn("Payment", selected)
+
+    def test_referenced_tables_are_included(self):
+        selected = self.index.select("how many employees are there")
+        self.assertEqual(set(selected), {"Employee", "Department", "Projects", "TimeEntry"})
+
+    def test_referencing_tables_are_included(self):
+        selected = self.index.select("list employees with their department")
+        self.assertIn("Employee", selected)
+        self.assertIn("Department", selected)
+
+    def test_previous_sql_tables_are_kept(self):
+        previous = "SELECT c.name, SUM(i.amount) FROM Invoice i JOIN Customer c ON c.customer_id = i.customer_id"
+        selected = self.index.select("which tasks are blocked", previous)
+        self.assertTrue({"Task", "Invoice", "Customer"} <= set(selected))
+        self.assertNotIn("Payment", selected)
+
+    def test_vague_question_keeps_full_schema(self):
+        self.assertEqual(self.index.select("can you provide their names"), DBConstant.db_schema)
+
+    def test_generator_prompt_contains_only_selected_tables(self):
+        generator = SQLQueryGenerator(llm_client=None)
+        prompt, _ = generator._prepare("department budget", DBConstant.db_schema)
+        self.assertIn("Table Department:", prompt)
+        self.assertNotIn("Table Invoice:", prompt)
+
+    def test_generator_keeps_last_turn_tables(self):
+        generator = SQLQueryGenerator(llm_client=None)
+        history = SQLHistory()
+        history.add("total invoiced per client", "SELECT customer_id, SUM(amount) FROM Invoice GROUP BY customer_id")
+        prompt, _ = generator._prepare("department budget", DBConstant.db_schema, history)
+        self.assertIn("Table Department:", prompt)
+        self.assertIn("Table Invoice:", prompt)
+
+
+if __name__ == '__main__':
+    unittest.main()
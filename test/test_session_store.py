@@ -0,0 +1,78 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from src.mcp.session_store import SessionStore
+from src.mcp.sql_history import SQLHistory
+from src.mcp.sql_query_generation import SQLQueryGenerator
+
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "sessions.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sessions_are_isolated(self):
+        store = SessionStore(db_path="")
+        alice = store.get("alice@example.com")
+        alice.add("how many employees", "SELECT COUNT(*) FROM Employee")
+        self.assertEqual(len(store.get("alice@example.com")), 1)
+        self.assertEqual(len(store.get("bob@example.com")), 0)
+
+    def test_lru_eviction_bounds_memory(self):
+        store = SessionStore(max_sessions=2, db_path="")
+        store.get("a")
+        store.get("b")
+        store.get("a")
+        store.get("c")
+        self.assertEqual(len(store), 2)
+        self.assertEqual(list(store._sessions), ["a", "c"])
+
+    def test_idle_sessions_expire(self):
+        store = SessionStore(idle_ttl_seconds=60, db_path="")
+        store.get("a").add("q", "SELECT 1")
+        with mock.patch("src.mcp.session_store.time.time", return_value=time.time() + 120):
+            self.assertEqual(len(store.get("a")), 0)
+
+    def test_evicted_session_restored_from_disk(self):
+        store = SessionStore(max_sessions=1, db_path=self.db_path)
+        store.get("a").add("q", "SELECT 1")
+        store.get("b")
+        self.assertEqual(store.get("a").to_list()[0]["sql"], "SELECT 1")
+
+    def test_saved_session_survives_restart(self):
+        store = SessionStore(db_path=self.db_path)
+        history = store.get("a")
+        history.add("q", "SELECT 1")
+        store.save("a", history)
+        restored = SessionStore(db_path=self.db_path).get("a")
+        self.assertEqual(restored.to_list(), history.to_list())
+
+    def test_drop_forgets_session(self):
+        store = SessionStore(db_path=self.db_path)
+        history = store.get("a")
+        history.add("q", "SELECT 1")
+        store.save("a", history)
+        store.drop("a")
+        self.assertEqual(len(SessionStore(db_path=self.db_path).get("a")), 0)
+
+
+class TestGeneratorUsesSessionHistory(unittest.TestCase):
+    def test_explicit_history_used_instead_of_shared(self):
+        generator = SQLQueryGenerator(llm_client=object(), logger=mock.Mock())
+        history = SQLHistory()
+        history.add("how many customers", "SELECT COUNT(*) FROM Customer")
+        messages = generator._build_messages("prompt", history)
+        self.assertIn("FROM Customer", messages[0]["content"])
+        generator._update_history("list employees", "SELECT * FROM Employee", history)
+        self.assertEqual(len(history), 2)
+        self.assertEqual(len(generator.db_chat_history), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
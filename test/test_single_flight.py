@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.mcp.single_flight import SingleFlight
+
+
+class TestSingleFlightThreads(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        executions = []
+        started = threading.Event()
+
+        def work():
+            executions.append(1)
+            started.set()
+            time.sleep(0.1)
+            return "SELECT 1"
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            first = pool.submit(flight.do, "sql", "q", work)
+            started.wait()
+            others = [pool.submit(flight.do, "sql", "q", work) for _ in range(4)]
+            results = [first.result()] + [future.result() for future in others]
+
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(results[0], ("SELECT 1", False))
+        self.assertTrue(all(result == ("SELECT 1", True) for result in results[1:]))
+        self.assertEqual(flight.stats()["sql"], {"calls": 5, "executions": 1, "coalesced": 4})
+
+    def test_sequential_calls_run_again(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do("sql", "q", lambda: 1), (1, False))
+        self.assertEqual(flight.do("sql", "q", lambda: 2), (2, False))
+
+    def test_exception_reaches_caller(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do("execute", "q", lambda: (_ for _ in ()).throw(ValueError("boom")))
+        self.assertEqual(flight.do("execute", "q", lambda: 3), (3, False))
+
+
+class TestSingleFlightAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_tasks_share_one_execution(self):
+        flight = SingleFlight()
+        executions = []
+
+        async def work():
+            executions.append(1)
+            await asyncio.sleep(0.05)
+            return "42"
+
+        results = await asyncio.gather(*(flight.ado("summarize", "k", work) for _ in range(3)))
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True])
+        self.assertEqual(flight.stats()["summarize"]["coalesced"], 2)
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leader = asyncio.ensure_future(flight.ado("sql", "k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.ado("sql", "k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        self.assertEqual(await follower, ("done", True))
+
+    async def test_different_keys_not_coalesced(self):
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            return 1
+
+        await asyncio.gather(flight.ado("sql", ("tenant-a", "q"), work), flight.ado("sql", ("tenant-b", "q"), work))
+        self.assertEqual(flight.stats()["sql"], {"calls": 2, "executions": 2, "coalesced": 0})
+
+    async def test_disabled_runs_every_call(self):
+        flight = SingleFlight(enabled=False)
+
+        async def work():
+            await asyncio.sleep(0.01)
+            return 1
+
+        await asyncio.gather(flight.ado("sql", "q", work), flight.ado("sql", "q", work))
+        self.assertEqual(flight.stats()["sql"]["executions"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
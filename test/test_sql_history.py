@@ -0,0 +1,51 @@
+import unittest
+
+from src.mcp.sql_history import SQLHistory, estimate_tokens
+from src.mcp.sql_query_generation import SQLQueryGenerator
+
+
+class TestSQLHistory(unittest.TestCase):
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("SELECT *"), 3)
+        self.assertGreater(estimate_tokens("a much longer sentence"), estimate_tokens("short"))
+
+    def test_render_includes_question_sql_and_rows(self):
+        history = SQLHistory()
+        history.add("how many employees", "SELECT COUNT(*) FROM Employee")
+        history.set_row_count("SELECT COUNT(*) FROM Employee", 1)
+        self.assertEqual(
+            history.render(),
+            "Q: how many employees\nSQL: SELECT COUNT(*) FROM Employee\nRows: 1",
+        )
+
+    def test_render_respects_token_budget_keeping_newest(self):
+        history = SQLHistory(token_budget=30)
+        for i in range(10):
+            history.add(f"question {i}", f"SELECT {i} FROM Employee")
+        rendered = history.render()
+        self.assertIn("question 9", rendered)
+        self.assertNotIn("question 0", rendered)
+        self.assertLessEqual(estimate_tokens(rendered), 30 + 10)
+
+    def test_max_turns(self):
+        history = SQLHistory(max_turns=2)
+        for i in range(5):
+            history.add(f"q{i}", "SELECT 1")
+        self.assertEqual([entry["question"] for entry in history], ["q3", "q4"])
+
+    def test_round_trip_through_list(self):
+        history = SQLHistory()
+        history.add("q", "SELECT 1", 3)
+        self.assertEqual(SQLHistory(entries=history.to_list()).to_list(), history.to_list())
+
+    def test_generator_history_excludes_schema(self):
+        generator = SQLQueryGenerator(llm_client=None)
+        generator._update_history("how many employees", "SELECT COUNT(*) FROM Employee")
+        system_message = generator._build_messages("prompt")[0]["content"]
+        self.assertIn("Q: how many employees", system_message)
+        self.assertNotIn("Table Schemas", system_message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,5 +27,51 @@ class TestSQLQueryGenerator(unittest.TestCase):
         sql = "no_sql"
         self.assertIsNone(self.generator.clean_sql_query(sql))
 
+    def test_parse_fused_plan_valid(self):
+        content = '{"intent": "QUESTION", "sql": "SELECT * FROM sales;", "output_type": "table"}'
+        self.assertEqual(
+            self.generator.parse_fused_plan(content),
+            {"intent": "QUESTION", "sql": "SELECT * FROM sales;", "output_type": "table"},
+        )
+
+    def test_parse_fused_plan_greeting_drops_sql(self):
+        content = '{"intent": "GREETING", "sql": "SELECT 1", "output_type": "text"}'
+        self.assertIsNone(self.generator.parse_fused_plan(content)["sql"])
+
+    def test_parse_fused_plan_invalid(self):
+        self.assertIsNone(self.generator.parse_fused_plan("not json"))
+        self.assertIsNone(self.generator.parse_fused_plan('{"intent": "QUESTION", "sql": null, "output_type": "chart"}'))
+        self.assertIsNone(self.generator.parse_fused_plan('{"intent": "QUESTION", "sql": 42, "output_type": "table"}'))
+        self.assertIsNone(self.generator.parse_fused_plan('{"intent": "QUESTION", "sql": ["SELECT 1"], "output_type": "table"}'))
+        self.assertIsNone(self.generator.parse_fused_plan('{"intent": "QUESTION", "sql": {"q": 1}, "output_type": "text"}'))
+
+class _AsyncCompletions:
+    def __init__(self, content):
+        self.content = content
+
+    async def create(self, **kwargs):
+        message = type("Message", (), {"content": self.content})
+        choice = type("Choice", (), {"message": message})
+        return type("Response", (), {"choices": [choice]})
+
+
+class _AsyncLLM:
+    def __init__(self, content):
+        self.completions = _AsyncCompletions(content)
+        self.chat = self
+
+
+class TestAsyncSQLQueryGenerator(unittest.IsolatedAsyncioTestCase):
+    async def test_agenerate_sql_query(self):
+        generator = SQLQueryGenerator(llm_client=None, async_llm_client=_AsyncLLM("```sql\nSELECT 1;\n```"))
+        sql = await generator.agenerate_sql_query("how many", {"sales": "id INT"})
+        self.assertEqual(sql, "SELECT 1;")
+        self.assertEqual(len(generator.db_chat_history), 1)
+
+    async def test_agenerate_fused_plan_invalid_returns_none(self):
+        generator = SQLQueryGenerator(llm_client=None, async_llm_client=_AsyncLLM("nonsense"))
+        self.assertIsNone(await generator.agenerate_fused_plan("how many", {"sales": "id INT"}))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,113 @@
+import datetime
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from src.mcp.sql_templates import IntentTemplate, TemplateEngine, ValueIndex, parse_month
+
+
+class TestSQLTemplates(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'test.db')}")
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE Customer (customer_id INTEGER PRIMARY KEY, company_name TEXT, sector TEXT)"))
+            conn.execute(text("INSERT INTO Customer (company_name, sector) VALUES ('Acme Corp', 'Retail'), ('O''Brien Steel', 'Metal Fabrication')"))
+        self.templates = TemplateEngine(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_enum_slot_from_schema(self):
+        match = self.templates.match("How many overdue invoices are there?")
+        self.assertEqual(match.name, "count_invoices_by_status")
+        self.assertEqual(match.sql, "SELECT COUNT(*) AS invoice_count FROM Invoice WHERE status = 'OVERDUE'")
+        self.assertEqual(match.output_type, "text")
+
+    def test_value_aliases_and_underscored_enums(self):
+        self.assertEqual(self.templates.match("how many late invoices do we have").params, {"invoice_status": "OVERDUE"})
+        self.assertEqual(self.templates.match("how many tasks are in progress").params, {"task_status": "IN_PROGRESS"})
+
+    def test_unpaid_excludes_draft_and_cancelled(self):
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE Invoice (invoice_id INTEGER PRIMARY KEY, invoice_number TEXT, customer_id INT, "
+                "total_amount FLOAT, status TEXT, issue_date DATE, due_date DATE)"
+            ))
+            conn.execute(text(
+                "INSERT INTO Invoice (invoice_number, customer_id, total_amount, status, issue_date, due_date) VALUES "
+                "('INV-1', 1, 10, 'SENT', '2024-01-01', '2024-02-01'), ('INV-2', 1, 20, 'OVERDUE', '2024-01-01', '2024-01-15'), "
+                "('INV-3', 1, 30, 'PAID', '2024-01-01', '2024-02-01'), ('INV-4', 1, 40, 'CANCELLED', '2024-01-01', '2024-02-01'), "
+                "('INV-5', 1, 50, 'DRAFT', '2024-01-01', '2024-02-01')"
+            ))
+        count = self.templates.match("how many unpaid invoices do we have")
+        self.assertEqual(count.name, "count_unpaid_invoices")
+        listed = self.templates.match("show outstanding invoices")
+        self.assertEqual(listed.name, "list_unpaid_invoices")
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text(count.sql)).scalar(), 2)
+            statuses = [row.status for row in conn.execute(text(listed.sql))]
+        self.assertEqual(statuses, ["OVERDUE", "SENT"])
+
+    def test_database_value_is_escaped(self):
+        match = self.templates.match("show invoices for o'brien steel")
+        self.assertEqual(match.params, {"customer": "O'Brien Steel"})
+        self.assertIn("c.company_name = 'O''Brien Steel'", match.sql)
+
+    def test_unknown_value_falls_through(self):
+        self.assertIsNone(self.templates.match("show invoices for Globex"))
+        self.assertIsNone(self.templates.match("which employee logged the most hours"))
+
+    def test_month_slot(self):
+        self.assertEqual(parse_month("March 2024"), "2024-03")
+        self.assertEqual(parse_month("2024-3"), "2024-03")
+        self.assertEqual(parse_month("sept", today=datetime.date(2025, 1, 1)), "2025-09")
+        self.assertIsNone(parse_month("someday"))
+        match = self.templates.match("list payments received in march 2024")
+        self.assertIn("strftime('%Y-%m', payment_date) = '2024-03'", match.sql)
+
+    def test_match_is_deterministic_and_fast(self):
+        question = "list all customers in the retail sector"
+        first = self.templates.match(question)
+        started = time.perf_counter()
+        for _ in range(100):
+            self.assertEqual(self.templates.match(question), first)
+        self.assertLess((time.perf_counter() - started) / 100, 0.01)
+
+    def test_stale_values_refresh_in_background(self):
+        class Config:
+            VALUE_REFRESH_SECONDS = 0
+            MAX_VALUES_PER_COLUMN = 100
+
+        values = ValueIndex(self.engine, Config)
+        self.assertFalse(values.loaded)
+        self.assertIsNone(values.resolve("customer", "Globex"))
+        self.assertTrue(values.loaded)
+        with self.engine.begin() as conn:
+            conn.execute(text("INSERT INTO Customer (company_name, sector) VALUES ('Globex', 'Energy')"))
+        # The stale index answers from the previous values and refreshes on a thread
+        release, refresh = threading.Event(), values.refresh
+        values.refresh = lambda: release.wait(5) and refresh()
+        self.assertIsNone(values.resolve("customer", "Globex"))
+        release.set()
+        deadline = time.monotonic() + 5
+        while values.resolve("customer", "Globex") is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(values.resolve("customer", "Globex"), "Globex")
+
+    def test_custom_templates(self):
+        templates = TemplateEngine(
+            templates=[IntentTemplate("customers", ["customers in {sector}"], "SELECT * FROM Customer WHERE sector = {sector}")],
+            value_index=ValueIndex(self.engine),
+        )
+        self.assertEqual(templates.match("Customers in Retail").sql, "SELECT * FROM Customer WHERE sector = 'Retail'")
+        self.assertIsNone(templates.match("how many overdue invoices are there"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from src.mcp.llm_stub import StubLLM
+from src.mcp.resilient_llm import guard_async_llm, guard_llm
+from src.mcp.run_query import DatabaseHandler
+from src.mcp.telemetry import add_sink, annotate, remove_sink, result_size, stage, trace
+
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.records = []
+        add_sink(self.records.append)
+
+    def tearDown(self):
+        remove_sink(self.records.append)
+
+    def test_stages_accumulate_and_record_is_emitted_once(self):
+        with trace("test", question="q") as record:
+            with trace("nested") as nested:
+                self.assertIs(nested, record)
+            with stage("sql"):
+                pass
+            with stage("sql"):
+                pass
+            annotate(row_count=3)
+        self.assertEqual(len(self.records), 1)
+        emitted = self.records[0]
+        self.assertEqual((emitted["kind"], emitted["question"], emitted["status"]), ("test", "q", "ok"))
+        self.assertEqual(set(emitted["stages"]), {"sql"})
+        self.assertEqual(emitted["row_count"], 3)
+        self.assertGreaterEqual(emitted["total_ms"], emitted["stages"]["sql"]["ms"])
+
+    def test_no_trace_is_a_no_op(self):
+        with stage("sql"):
+            annotate(row_count=1)
+        self.assertEqual(self.records, [])
+
+    def test_error_is_recorded(self):
+        with self.assertRaises(ValueError):
+            with trace("test"):
+                raise ValueError("boom")
+        self.assertEqual(self.records[0]["status"], "error")
+        self.assertIn("boom", self.records[0]["error"])
+
+    def test_llm_token_usage_is_attributed_to_stage(self):
+        client = guard_llm(StubLLM())
+        with trace("test"):
+            with stage("summarize"):
+                client.chat.completions.create(model="stub", messages=[{"role": "user", "content": "Provide a simple summary"}])
+        usage = self.records[0]["stages"]["summarize"]
+        self.assertEqual(usage["llm_calls"], 1)
+        self.assertGreater(usage["prompt_tokens"], 0)
+        self.assertGreater(usage["completion_tokens"], 0)
+        self.assertEqual(self.records[0]["tokens"]["prompt"], usage["prompt_tokens"])
+
+    def test_async_usage_follows_the_task_context(self):
+        client = guard_async_llm(StubLLM(is_async=True))
+
+        async def ask():
+            with trace("test"):
+                with stage("sql"):
+                    await client.chat.completions.create(model="stub", messages=[{"role": "user", "content": "SQL Query:\n"}])
+
+        asyncio.run(ask())
+        self.assertEqual(self.records[0]["stages"]["sql"]["llm_calls"], 1)
+
+    def test_database_handler_reports_rows_and_bytes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_engine(f"sqlite:///{os.path.join(directory, 'test.db')}")
+            with engine.begin() as conn:
+                conn.execute(text("CREATE TABLE Invoice (invoice_id INTEGER PRIMARY KEY, status TEXT)"))
+                conn.execute(text("INSERT INTO Invoice (status) VALUES ('PAID'), ('OVERDUE')"))
+            with trace("test"):
+                DatabaseHandler(engine=engine).execute_query("SELECT * FROM Invoice")
+            engine.dispose()
+        record = self.records[0]
+        self.assertEqual(record["row_count"], 2)
+        self.assertGreater(record["result_bytes"], 0)
+        self.assertIn("db_query", record["stages"])
+        self.assertEqual(record["guard_action"], "allow")
+
+    def test_result_size(self):
+        self.assertEqual(result_size({"message": "x"}), {"row_count": None, "result_bytes": None})
+        self.assertEqual(result_size(pd.DataFrame({"a": [1, 2, 3]}))["row_count"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()